@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Admission Control
+Bounded in-flight work per analysis engine, with a short wait queue
+
+A request enters if fewer than max_in_flight requests are running. Otherwise
+it waits in a queue of at most max_queue requests for up to queue_timeout
+seconds. Past either limit it is rejected straight away, and the server answers
+429 with a Retry-After estimate instead of letting every request slow down.
+
+Limits per engine come from the environment, e.g. for engine 'model':
+  ADMISSION_MODEL_MAX_IN_FLIGHT, ADMISSION_MODEL_MAX_QUEUE, ADMISSION_MODEL_QUEUE_TIMEOUT
+falling back to ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT.
+"""
+
+import functools
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from flask import jsonify, request
+
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_REJECTED, ADMISSION_WAIT, ADMISSION_WAITING
+
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', os.cpu_count() or 1))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 32))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 2.0))
+
+class Overloaded(Exception):
+    """Raised when a request is not admitted"""
+
+    def __init__(self, engine: str, reason: str, retry_after: int):
+        super().__init__(f"{engine} engine is saturated ({reason}), retry in {retry_after}s")
+        self.engine = engine
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Counting gate with a bounded, timed wait queue"""
+
+    def __init__(self, engine: str, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+                 max_queue: int = ADMISSION_MAX_QUEUE, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.engine = engine
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = max(0.0, queue_timeout)
+
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.service_time = 0.0  # moving average of seconds per admitted request
+        self._in_flight_gauge = ADMISSION_IN_FLIGHT.labels(engine)
+        self._waiting_gauge = ADMISSION_WAITING.labels(engine)
+        self._in_flight_gauge.set_function(lambda: self.in_flight)
+        self._waiting_gauge.set_function(lambda: self.waiting)
+        self._wait_histogram = ADMISSION_WAIT.labels(engine)
+
+    @classmethod
+    def from_env(cls, engine: str, **defaults) -> 'AdmissionController':
+        """Controller with per-engine environment overrides"""
+        prefix = f'ADMISSION_{engine.upper()}_'
+        def setting(name, cast, default):
+            return cast(os.environ.get(prefix + name, defaults.get(name.lower(), default)))
+        return cls(engine,
+                   setting('MAX_IN_FLIGHT', int, ADMISSION_MAX_IN_FLIGHT),
+                   setting('MAX_QUEUE', int, ADMISSION_MAX_QUEUE),
+                   setting('QUEUE_TIMEOUT', float, ADMISSION_QUEUE_TIMEOUT))
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from queue length and service time"""
+        backlog = (self.waiting + 1) / self.max_in_flight
+        return max(1, math.ceil(backlog * max(self.service_time, 0.1)))
+
+    def acquire(self) -> float:
+        """Take a slot, waiting in the queue if allowed; returns seconds waited"""
+        with self._condition:
+            if self.in_flight < self.max_in_flight and not self.waiting:
+                self.in_flight += 1
+                self.admitted += 1
+                self._wait_histogram.observe(0.0)
+                return 0.0
+
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                ADMISSION_REJECTED.labels(self.engine, 'queue full').inc()
+                raise Overloaded(self.engine, 'queue full', self.retry_after())
+
+            started = time.monotonic()
+            deadline = started + self.queue_timeout
+            self.waiting += 1
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        self.timed_out += 1
+                        ADMISSION_REJECTED.labels(self.engine, 'queue timeout').inc()
+                        raise Overloaded(self.engine, 'queue timeout', self.retry_after())
+                    self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            waited = time.monotonic() - started
+            self.in_flight += 1
+            self.admitted += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self._wait_histogram.observe(waited)
+            return waited
+
+    def release(self, service_seconds: Optional[float] = None):
+        """Free a slot; service_seconds feeds the Retry-After estimate"""
+        with self._condition:
+            self.in_flight -= 1
+            if service_seconds is not None:
+                self.service_time = service_seconds if not self.service_time else 0.9 * self.service_time + 0.1 * service_seconds
+            self._condition.notify()
+
+    def stats(self) -> Dict:
+        """Limits, occupancy and queue wait metrics for status reporting"""
+        with self._condition:
+            return {
+                'engine': self.engine,
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'queue_timeout_seconds': self.queue_timeout,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'mean_queue_wait_ms': round(self.total_wait / self.admitted * 1000.0, 3) if self.admitted else 0.0,
+                'max_queue_wait_ms': round(self.max_wait * 1000.0, 3),
+                'mean_service_ms': round(self.service_time * 1000.0, 3)
+            }
+
+def overloaded_response(error: Overloaded):
+    """429 with Retry-After for a rejected request"""
+    response = jsonify({
+        'success': False,
+        'error': str(error),
+        'retry_after': error.retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def admitted(controller: AdmissionController):
+    """Route decorator: run the view inside the controller, 429 when saturated
+
+    OPTIONS preflights are never queued.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == 'OPTIONS':
+                return view(*args, **kwargs)
+            try:
+                controller.acquire()
+            except Overloaded as e:
+                return overloaded_response(e)
+            started = time.monotonic()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release(time.monotonic() - started)
+        return wrapper
+    return decorator
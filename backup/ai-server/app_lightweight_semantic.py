@@ -8,11 +8,36 @@ from flask import Flask, request, jsonify
 import os
 import logging
 import re
-from typing import Dict, List, Tuple
+import hashlib
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, FrozenSet, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
+from programme_data import CurriculumLookupError, get_clos, get_course, get_mlos, get_plos, preload_programmes
+from job_queue import JobNotFoundError, JobQueue
+from admission import AdmissionController, admitted
+from metrics import cache_lookup, instrument_app, stage, timed
+from profiling import install_profiling, profiled
+from domain_terms import get_domain_matcher
+
+# NumPy enables the vectorized matrix mode
+try:
+    from alignment_matrix import AlignmentMatrixEngine
+    MATRIX_ENGINE_AVAILABLE = True
+except ImportError:
+    MATRIX_ENGINE_AVAILABLE = False
+
+try:
+    from outcome_retrieval import ConceptProfileEncoder, OutcomeRetrievalIndex
+    RETRIEVAL_AVAILABLE = True
+except ImportError:
+    RETRIEVAL_AVAILABLE = False
 
 app = Flask(__name__)
+instrument_app(app)
+install_profiling(app)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -27,7 +52,19 @@ class BloomLevel(Enum):
     EVALUATE = 5
     CREATE = 6
 
-@dataclass
+# Maximum number of memoized text profiles per analyzer
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 4096))
+
+# Decimal places of each matrix score, matching analyze_alignment
+MATRIX_ROUNDING = {
+    'enhanced_score': 1,
+    'confidence': 2,
+    'semantic_similarity': 3,
+    'concept_alignment': 3,
+    'cognitive_coherence': 3
+}
+
+@dataclass(frozen=True)
 class ConceptMatch:
     """Represents a matched educational concept"""
     concept: str
@@ -35,6 +72,140 @@ class ConceptMatch:
     bloom_level: BloomLevel
     weight: float
 
+@dataclass(frozen=True)
+class TextProfile:
+    """Everything the analyzer derives from one text, computed once and reused"""
+    text: str
+    text_lower: str
+    concepts: Tuple[ConceptMatch, ...]
+    concept_names: FrozenSet[str]
+    concept_mask: int                       # bitset of concept ids (see ConceptGraph)
+    concept_confidences: Tuple[float, ...]  # confidence by concept id, 0.0 when absent
+    bloom_scores: Tuple[Tuple[BloomLevel, float], ...]
+    bloom_level: BloomLevel
+    bloom_confidence: float
+    relationships: Tuple[str, ...]
+
+class ConceptScanner:
+    """Single-pass matcher for word-anchored regex patterns and literal phrases
+
+    Patterns starting with ``\\b`` are dispatched on their literal prefix, so each
+    word start in the text only tries the few patterns that can begin there.
+    Match counts follow ``re.findall`` (non-overlapping per pattern). Phrases are
+    found anywhere in the text with one lookahead alternation, longest first,
+    and each hit also marks the shorter phrases it starts with.
+    """
+
+    PREFIX_LENGTH = 3
+    _word_start = re.compile(r'\b\w')
+
+    def __init__(self, patterns: List[str], phrases: List[str]):
+        self.patterns = list(dict.fromkeys(patterns))
+        self.phrases = list(dict.fromkeys(phrase.lower() for phrase in phrases))
+        self._compiled = [re.compile(pattern) for pattern in self.patterns]
+
+        self._dispatch: Dict[str, List[int]] = {}
+        self._undispatched: List[int] = []
+        self._unanchored: List[int] = []
+        for index, pattern in enumerate(self.patterns):
+            if not pattern.startswith(r'\b') or '|' in pattern:
+                self._unanchored.append(index)
+                continue
+            prefix = self._literal_prefix(pattern)
+            if len(prefix) >= self.PREFIX_LENGTH:
+                self._dispatch.setdefault(prefix[:self.PREFIX_LENGTH], []).append(index)
+            else:
+                self._undispatched.append(index)
+
+        self._phrase_regex = None
+        self._phrase_closure: Dict[str, List[int]] = {}
+        if self.phrases:
+            longest_first = sorted(self.phrases, key=len, reverse=True)
+            self._phrase_regex = re.compile(
+                '(?=(' + '|'.join(re.escape(phrase) for phrase in longest_first) + '))'
+            )
+            self._phrase_closure = {
+                phrase: [i for i, other in enumerate(self.phrases) if phrase.startswith(other)]
+                for phrase in self.phrases
+            }
+
+    @staticmethod
+    def _literal_prefix(pattern: str) -> str:
+        """Return the literal characters a ``\\b``-anchored pattern must start with"""
+        body = pattern[2:]
+        length = 0
+        while length < len(body) and body[length].isalnum():
+            length += 1
+        # A quantifier makes the preceding character optional
+        if length < len(body) and body[length] in '?*{':
+            length -= 1
+        return body[:max(length, 0)]
+
+    def scan(self, text: str) -> Tuple[List[int], List[bool]]:
+        """Return per-pattern match counts and per-phrase presence for ``text``"""
+        counts = [0] * len(self.patterns)
+        ends = [0] * len(self.patterns)
+        width = self.PREFIX_LENGTH
+
+        for word in self._word_start.finditer(text):
+            start = word.start()
+            candidates = self._dispatch.get(text[start:start + width], ())
+            for index in chain(candidates, self._undispatched):
+                if start < ends[index]:
+                    continue
+                match = self._compiled[index].match(text, start)
+                if match:
+                    counts[index] += 1
+                    ends[index] = match.end()
+
+        for index in self._unanchored:
+            counts[index] = len(self._compiled[index].findall(text))
+
+        phrase_hits = [False] * len(self.phrases)
+        if self._phrase_regex is not None:
+            for match in self._phrase_regex.finditer(text):
+                for index in self._phrase_closure[match.group(1)]:
+                    phrase_hits[index] = True
+
+        return counts, phrase_hits
+
+class ConceptGraph:
+    """Concept knowledge base compiled to integer ids and adjacency bitsets
+    
+    Concept ``i`` is bit ``1 << i``. ``related_masks[i]`` holds the concepts
+    listed as related to concept ``i`` (excluding itself and names that are not
+    concepts), so direct and related overlap between two texts are bit
+    operations rather than nested loops over concept lists.
+    """
+    
+    def __init__(self, concept_patterns: Dict[str, Dict]):
+        self.names = list(concept_patterns)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.weights = tuple(concept_patterns[name]['weight'] for name in self.names)
+        self.related_masks = tuple(
+            self.mask(r for r in concept_patterns[name].get('related', []) if r != name)
+            for name in self.names
+        )
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def mask(self, names) -> int:
+        """Bitset of the known concepts among ``names``"""
+        mask = 0
+        for name in names:
+            if name in self.ids:
+                mask |= 1 << self.ids[name]
+        return mask
+    
+    @staticmethod
+    def bits(mask: int):
+        """Yield the concept ids set in ``mask``, lowest first"""
+        while mask:
+            lowest = mask & -mask
+            yield lowest.bit_length() - 1
+            mask ^= lowest
+
 class LightweightSemanticAnalyzer:
     """Lightweight semantic analyzer using advanced pattern matching"""
     
@@ -43,6 +214,12 @@ class LightweightSemanticAnalyzer:
         self._init_concept_patterns()
         self._init_bloom_patterns()
         self._init_relationship_patterns()
+        self._init_concept_scanner()
+        self.concept_graph = ConceptGraph(self.concept_patterns)
+        self.domain_terms = get_domain_matcher()
+        self._profile_cache: 'OrderedDict[bytes, TextProfile]' = OrderedDict()
+        self._profile_lock = threading.Lock()
+        self._matrix_engine = None
         
     def _init_concept_patterns(self):
         """Initialize educational concept patterns with weights and relationships"""
@@ -223,28 +400,121 @@ class LightweightSemanticAnalyzer:
             'optimization': [r'\boptimiz[ei]', r'\bimprov[ei]', r'\benhance', r'\bmaximiz[ei]', r'\bminimiz[ei]']
         }
 
-    def extract_concepts(self, text: str) -> List[ConceptMatch]:
-        """Extract educational concepts from text with confidence scores"""
+    def _init_concept_scanner(self):
+        """Compile concept, Bloom and relationship patterns into a single-pass scanner"""
+        patterns = []
+        phrases = []
+        for concept_data in self.concept_patterns.values():
+            patterns.extend(concept_data['patterns'])
+            phrases.extend(concept_data.get('synonyms', []))
+        for bloom_data in self.bloom_patterns.values():
+            patterns.extend(bloom_data['patterns'])
+            phrases.extend(bloom_data['indicators'])
+        for relationship_patterns in self.relationship_patterns.values():
+            patterns.extend(relationship_patterns)
+        
+        self.concept_scanner = ConceptScanner(patterns, phrases)
+        pattern_ids = {pattern: i for i, pattern in enumerate(self.concept_scanner.patterns)}
+        phrase_ids = {phrase: i for i, phrase in enumerate(self.concept_scanner.phrases)}
+        
+        # Per concept: its pattern ids, synonym ids and the pattern ids of each related concept
+        self._concept_plan = []
+        for concept_name, concept_data in self.concept_patterns.items():
+            related_ids = [
+                [pattern_ids[p] for p in self.concept_patterns.get(related, {}).get('patterns', [])]
+                for related in concept_data.get('related', [])
+            ]
+            self._concept_plan.append((
+                concept_name,
+                concept_data,
+                [pattern_ids[p] for p in concept_data['patterns']],
+                [phrase_ids[s.lower()] for s in concept_data.get('synonyms', [])],
+                related_ids
+            ))
+        
+        self._bloom_plan = [
+            (level, [pattern_ids[p] for p in data['patterns']], [phrase_ids[i.lower()] for i in data['indicators']])
+            for level, data in self.bloom_patterns.items()
+        ]
+        self._relationship_plan = [
+            (name, [pattern_ids[p] for p in patterns])
+            for name, patterns in self.relationship_patterns.items()
+        ]
+
+    def get_profile(self, text: str) -> TextProfile:
+        """Return the memoized analysis profile for ``text``"""
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        with self._profile_lock:
+            profile = self._profile_cache.get(key)
+            if profile is not None:
+                self._profile_cache.move_to_end(key)
+                cache_lookup('text_profile', hits=1)
+                return profile
+        
+        cache_lookup('text_profile', misses=1)
+        profile = self._build_profile(text)
+        
+        with self._profile_lock:
+            self._profile_cache[key] = profile
+            if len(self._profile_cache) > PROFILE_CACHE_SIZE:
+                self._profile_cache.popitem(last=False)
+        return profile
+
+    def _build_profile(self, text: str) -> TextProfile:
+        """Scan ``text`` once and derive concepts, Bloom scores and relationships"""
         text_lower = text.lower()
+        with stage('concept_extraction'):
+            counts, phrase_hits = self.concept_scanner.scan(text_lower)
+            concepts = self._score_concepts(counts, phrase_hits)
+        confidences = [0.0] * len(self.concept_graph)
+        for match in concepts:
+            confidences[self.concept_graph.ids[match.concept]] = match.confidence
+        with stage('bloom_detection'):
+            bloom_scores = self._score_bloom_levels(counts, phrase_hits)
+            bloom_level, bloom_confidence = self._select_bloom_level(bloom_scores)
+        relationships = tuple(
+            name for name, ids in self._relationship_plan
+            if any(counts[index] for index in ids)
+        )
+        
+        return TextProfile(
+            text=text,
+            text_lower=text_lower,
+            concepts=tuple(concepts),
+            concept_names=frozenset(c.concept for c in concepts),
+            concept_mask=self.concept_graph.mask(c.concept for c in concepts),
+            concept_confidences=tuple(confidences),
+            bloom_scores=tuple(bloom_scores.items()),
+            bloom_level=bloom_level,
+            bloom_confidence=bloom_confidence,
+            relationships=relationships
+        )
+
+    def _as_profile(self, text_or_profile) -> TextProfile:
+        """Accept raw text where a profile is expected"""
+        if isinstance(text_or_profile, TextProfile):
+            return text_or_profile
+        return self.get_profile(text_or_profile)
+
+    def _score_concepts(self, counts: List[int], phrase_hits: List[bool]) -> List[ConceptMatch]:
+        """Turn scanner hits into concept matches with confidence scores"""
         found_concepts = []
         
-        for concept_name, concept_data in self.concept_patterns.items():
+        for concept_name, concept_data, pattern_ids, synonym_ids, related_ids in self._concept_plan:
             confidence = 0.0
             
             # Check main patterns
-            for pattern in concept_data['patterns']:
-                matches = len(re.findall(pattern, text_lower))
-                if matches > 0:
-                    confidence = max(confidence, min(1.0, matches * 0.3))
+            for index in pattern_ids:
+                if counts[index] > 0:
+                    confidence = max(confidence, min(1.0, counts[index] * 0.3))
             
             # Check synonyms for additional confidence
-            for synonym in concept_data.get('synonyms', []):
-                if synonym.lower() in text_lower:
-                    confidence = max(confidence, 0.7)
+            if any(phrase_hits[index] for index in synonym_ids):
+                confidence = max(confidence, 0.7)
             
             # Context boost for related terms
-            for related in concept_data.get('related', []):
-                if any(re.search(pattern, text_lower) for pattern in self.concept_patterns.get(related, {}).get('patterns', [])):
+            for ids in related_ids:
+                if any(counts[index] for index in ids):
                     confidence = min(1.0, confidence + 0.2)
             
             if confidence > 0:
@@ -257,26 +527,29 @@ class LightweightSemanticAnalyzer:
         
         return sorted(found_concepts, key=lambda x: x.confidence * x.weight, reverse=True)
 
-    def detect_bloom_level(self, text: str) -> Tuple[BloomLevel, float]:
-        """Detect Bloom's taxonomy level with confidence"""
-        text_lower = text.lower()
+    def _score_bloom_levels(self, counts: List[int], phrase_hits: List[bool]) -> Dict[BloomLevel, float]:
+        """Score each Bloom level from scanner hits"""
         level_scores = {}
         
-        for level, data in self.bloom_patterns.items():
+        for level, pattern_ids, indicator_ids in self._bloom_plan:
             score = 0.0
             
-            # Check main patterns
-            for pattern in data['patterns']:
-                matches = len(re.findall(pattern, text_lower))
-                score += matches * 2
+            # Main patterns count double
+            for index in pattern_ids:
+                score += counts[index] * 2
             
-            # Check indicators
-            for indicator in data['indicators']:
-                if indicator in text_lower:
+            # Indicators
+            for index in indicator_ids:
+                if phrase_hits[index]:
                     score += 1
             
             level_scores[level] = score
         
+        return level_scores
+
+    @staticmethod
+    def _select_bloom_level(level_scores: Dict[BloomLevel, float]) -> Tuple[BloomLevel, float]:
+        """Pick the dominant Bloom level and its confidence"""
         if not any(level_scores.values()):
             return BloomLevel.UNDERSTAND, 0.3
         
@@ -285,65 +558,93 @@ class LightweightSemanticAnalyzer:
         
         return best_level[0], confidence
 
-    def calculate_semantic_similarity(self, text1: str, text2: str) -> float:
+    def extract_concepts(self, text: str) -> List[ConceptMatch]:
+        """Extract educational concepts from text with confidence scores"""
+        return list(self.get_profile(text).concepts)
+
+    def detect_bloom_level(self, text: str) -> Tuple[BloomLevel, float]:
+        """Detect Bloom's taxonomy level with confidence"""
+        profile = self.get_profile(text)
+        return profile.bloom_level, profile.bloom_confidence
+
+    @timed('similarity')
+    def calculate_semantic_similarity(self, profile1: TextProfile, profile2: TextProfile) -> float:
         """Calculate semantic similarity using concept overlap"""
-        concepts1 = self.extract_concepts(text1)
-        concepts2 = self.extract_concepts(text2)
+        profile1 = self._as_profile(profile1)
+        profile2 = self._as_profile(profile2)
+        mask1 = profile1.concept_mask
+        mask2 = profile2.concept_mask
         
-        if not concepts1 or not concepts2:
+        if not mask1 or not mask2:
             return 0.0
         
-        # Direct concept matches
-        concept_names1 = {c.concept for c in concepts1}
-        concept_names2 = {c.concept for c in concepts2}
-        direct_matches = concept_names1.intersection(concept_names2)
+        graph = self.concept_graph
+        confidences1 = profile1.concept_confidences
+        confidences2 = profile2.concept_confidences
         
         # Calculate weighted similarity
         similarity_score = 0.0
         total_weight = 0.0
         
         # Direct matches
-        for concept in direct_matches:
-            c1 = next(c for c in concepts1 if c.concept == concept)
-            c2 = next(c for c in concepts2 if c.concept == concept)
-            weight = (c1.weight + c2.weight) / 2
-            confidence = min(c1.confidence, c2.confidence)
+        for concept_id in graph.bits(mask1 & mask2):
+            weight = graph.weights[concept_id]
+            confidence = min(confidences1[concept_id], confidences2[concept_id])
             similarity_score += weight * confidence
             total_weight += weight
         
         # Related concept matches
-        for c1 in concepts1:
-            for c2 in concepts2:
-                if c1.concept != c2.concept:
-                    c1_data = self.concept_patterns.get(c1.concept, {})
-                    if c2.concept in c1_data.get('related', []):
-                        weight = (c1.weight + c2.weight) / 4  # Reduced weight for related
-                        confidence = min(c1.confidence, c2.confidence)
-                        similarity_score += weight * confidence * 0.6
-                        total_weight += weight * 0.6
+        for id1 in graph.bits(mask1):
+            for id2 in graph.bits(graph.related_masks[id1] & mask2):
+                weight = (graph.weights[id1] + graph.weights[id2]) / 4  # Reduced weight for related
+                confidence = min(confidences1[id1], confidences2[id2])
+                similarity_score += weight * confidence * 0.6
+                total_weight += weight * 0.6
         
         if total_weight > 0:
             return min(1.0, similarity_score / total_weight)
         
         return 0.0
 
-    def analyze_alignment(self, plo_text: str, mlo_text: str, original_score: float = 0.0) -> Dict:
+    @profiled
+    def analyze_alignment(self, plo_text: str, mlo_text: str, original_score: float = 0.0,
+                          programme: Optional[str] = None) -> Dict:
         """Comprehensive semantic alignment analysis"""
         try:
-            # Extract concepts
-            plo_concepts = self.extract_concepts(plo_text)
-            mlo_concepts = self.extract_concepts(mlo_text)
-            
-            # Detect Bloom levels
-            plo_bloom, plo_bloom_conf = self.detect_bloom_level(plo_text)
-            mlo_bloom, mlo_bloom_conf = self.detect_bloom_level(mlo_text)
+            plo_profile = self.get_profile(plo_text)
+            mlo_profile = self.get_profile(mlo_text)
+        except Exception as e:
+            self.logger.error(f"Analysis failed: {e}")
+            return {
+                'success': False,
+                'error': f'Semantic analysis failed: {str(e)}',
+                'enhanced_score': original_score or 1.0,
+                'confidence': 0.0
+            }
+        
+        return self.analyze_profiles(plo_profile, mlo_profile, original_score, programme)
+
+    def analyze_profiles(self, plo_profile: TextProfile, mlo_profile: TextProfile,
+                         original_score: float = 0.0, programme: Optional[str] = None) -> Dict:
+        """Alignment analysis over prebuilt text profiles
+        
+        Domain terms (data/domain_terms.json) that apply to the programme and
+        occur in both texts scale the semantic similarity by their multiplier.
+        """
+        try:
+            plo_concepts = plo_profile.concepts
+            mlo_concepts = mlo_profile.concepts
+            plo_bloom = plo_profile.bloom_level
+            mlo_bloom = mlo_profile.bloom_level
             
             # Calculate semantic similarity
-            semantic_similarity = self.calculate_semantic_similarity(plo_text, mlo_text)
+            semantic_similarity = self.calculate_semantic_similarity(plo_profile, mlo_profile)
+            domain_multiplier, domain_terms = self.domain_terms.alignment(plo_profile.text, mlo_profile.text, programme)
+            semantic_similarity = min(1.0, semantic_similarity * domain_multiplier)
             
             # Calculate concept alignment
-            plo_concept_names = {c.concept for c in plo_concepts}
-            mlo_concept_names = {c.concept for c in mlo_concepts}
+            plo_concept_names = plo_profile.concept_names
+            mlo_concept_names = mlo_profile.concept_names
             aligned_concepts = list(plo_concept_names.intersection(mlo_concept_names))
             missing_concepts = list(plo_concept_names - mlo_concept_names)
             
@@ -392,7 +693,7 @@ class LightweightSemanticAnalyzer:
             
             # Generate suggestions
             suggestions = self._generate_suggestions(
-                plo_text, mlo_text, aligned_concepts, missing_concepts,
+                plo_profile, mlo_profile, aligned_concepts, missing_concepts,
                 plo_bloom, mlo_bloom, enhanced_score
             )
             
@@ -411,7 +712,9 @@ class LightweightSemanticAnalyzer:
                     'aligned_concepts': aligned_concepts,
                     'missing_concepts': missing_concepts[:3],
                     'plo_bloom_level': plo_bloom.name,
-                    'mlo_bloom_level': mlo_bloom.name
+                    'mlo_bloom_level': mlo_bloom.name,
+                    'domain_terms': domain_terms,
+                    'domain_multiplier': domain_multiplier
                 },
                 'original_score': original_score
             }
@@ -425,6 +728,51 @@ class LightweightSemanticAnalyzer:
                 'confidence': 0.0
             }
 
+    @timed('matrix')
+    def analyze_matrix(self, plo_texts: List[str], mlo_texts: List[str], original_scores=None,
+                       programme: Optional[str] = None) -> Dict:
+        """Score every PLO x MLO pair at once
+        
+        Returns row-per-PLO matrices of the scores ``analyze_alignment`` reports,
+        rounded the same way. ``original_scores`` may be a single score or a
+        PLO x MLO matrix.
+        """
+        plo_profiles = [self.get_profile(text) for text in plo_texts]
+        mlo_profiles = [self.get_profile(text) for text in mlo_texts]
+        
+        if MATRIX_ENGINE_AVAILABLE:
+            if self._matrix_engine is None:
+                self._matrix_engine = AlignmentMatrixEngine(self)
+            multipliers = self._matrix_engine.domain_multipliers(
+                self.domain_terms.current(), plo_texts, mlo_texts, programme
+            )
+            matrices = {
+                name: matrix.tolist()
+                for name, matrix in self._matrix_engine.score_profiles(
+                    plo_profiles, mlo_profiles, original_scores, multipliers
+                ).items()
+            }
+        else:
+            # Pairwise fallback without NumPy
+            matrices = {name: [] for name in MATRIX_ROUNDING}
+            for row, plo_profile in enumerate(plo_profiles):
+                for values in matrices.values():
+                    values.append([])
+                for column, mlo_profile in enumerate(mlo_profiles):
+                    original = original_scores or 0.0
+                    if isinstance(original, (list, tuple)):
+                        original = original[row][column]
+                    result = self.analyze_profiles(plo_profile, mlo_profile, float(original), programme)
+                    cell = {**result.get('analysis_details', {}), **result}
+                    for name, values in matrices.items():
+                        values[row].append(cell.get(name, 0.0))
+        
+        return {
+            name: [[round(value, MATRIX_ROUNDING[name]) for value in row] for row in matrices[name]]
+            for name in MATRIX_ROUNDING
+        }
+
+    @timed('reasoning')
     def _generate_reasoning(self, semantic_sim: float, concept_align: float, 
                           cognitive_coh: float, aligned_concepts: List[str],
                           missing_concepts: List[str], plo_bloom: BloomLevel, 
@@ -458,7 +806,8 @@ class LightweightSemanticAnalyzer:
         
         return ". ".join(parts) + "."
 
-    def _generate_suggestions(self, plo_text: str, mlo_text: str, aligned_concepts: List[str],
+    @timed('reasoning')
+    def _generate_suggestions(self, plo_profile: TextProfile, mlo_profile: TextProfile, aligned_concepts: List[str],
                             missing_concepts: List[str], plo_bloom: BloomLevel, 
                             mlo_bloom: BloomLevel, enhanced_score: float) -> List[str]:
         """Generate improvement suggestions"""
@@ -494,7 +843,7 @@ class LightweightSemanticAnalyzer:
         
         # Assessment suggestions
         if 'assessment' not in aligned_concepts and 'evaluation' not in aligned_concepts:
-            if any(term in plo_text.lower() for term in ['assess', 'evaluat', 'measur']):
+            if any(term in plo_profile.text_lower for term in ['assess', 'evaluat', 'measur']):
                 suggestions.append("📋 Add assessment component: Include evaluation criteria or measurement methods")
         
         return suggestions[:5]
@@ -503,6 +852,49 @@ class LightweightSemanticAnalyzer:
 # Initialize analyzer
 semantic_analyzer = LightweightSemanticAnalyzer()
 
+# Build the curriculum store (from the snapshot or the JSON) once, before any worker fork
+logger.info(f"Programme data source: {preload_programmes()}")
+
+# Bounds concurrent analysis work; excess requests get 429 + Retry-After
+admission = AdmissionController.from_env('concepts')
+
+# Top-k retrieval indexes per language, built on first use
+_retrieval_indexes = {}
+_retrieval_lock = threading.Lock()
+
+def get_retrieval_index(language: str) -> 'OutcomeRetrievalIndex':
+    with _retrieval_lock:
+        if language not in _retrieval_indexes:
+            _retrieval_indexes[language] = OutcomeRetrievalIndex(ConceptProfileEncoder(semantic_analyzer), language)
+        return _retrieval_indexes[language]
+
+def analyze_pairs(pairs: List[Dict]) -> List[Dict]:
+    """Job work function: one alignment result per PLO-MLO pair"""
+    results = []
+    for pair in pairs:
+        try:
+            if not isinstance(pair, dict) or not pair.get('plo_text') or not pair.get('mlo_text'):
+                raise ValueError('Both plo_text and mlo_text are required')
+            results.append(semantic_analyzer.analyze_alignment(
+                pair['plo_text'], pair['mlo_text'], float(pair.get('original_score', 0))
+            ))
+        except Exception as e:
+            results.append({'success': False, 'error': str(e)})
+    return results
+
+# Batch job queue, opened on first use (or at startup to resume interrupted jobs)
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+            _job_queue.register('alignment', analyze_pairs)
+        _job_queue.start()
+        return _job_queue
+
 # CORS headers
 @app.after_request
 def after_request(response):
@@ -523,11 +915,16 @@ def status():
             'Educational concept knowledge base',
             'Bloom\'s taxonomy cognitive analysis',
             'Context-specific improvement suggestions',
+            'Programme-wide alignment matrices',
+            'Top-k outcome retrieval',
+            'Persistent batch jobs',
             'No heavy ML dependencies'
-        ]
+        ],
+        'admission': admission.stats()
     })
 
 @app.route('/analyze', methods=['POST', 'OPTIONS'])
+@admitted(admission)
 def analyze():
     """Semantic analysis endpoint"""
     if request.method == 'OPTIONS':
@@ -544,6 +941,7 @@ def analyze():
         plo_text = data.get('plo_text', '')
         mlo_text = data.get('mlo_text', '')
         original_score = float(data.get('original_score', 0))
+        programme = data.get('programme')
         
         if not plo_text or not mlo_text:
             return jsonify({
@@ -554,7 +952,7 @@ def analyze():
         logger.info(f"Analyzing: PLO='{plo_text[:50]}...' MLO='{mlo_text[:50]}...'")
         
         # Perform semantic analysis
-        result = semantic_analyzer.analyze_alignment(plo_text, mlo_text, original_score)
+        result = semantic_analyzer.analyze_alignment(plo_text, mlo_text, original_score, programme)
         
         logger.info(f"Analysis complete: score={result.get('enhanced_score')}, confidence={result.get('confidence')}")
         
@@ -569,6 +967,249 @@ def analyze():
             'confidence': 0.0
         }), 500
 
+def _original_scores_error(original_scores, n_rows: int, n_columns: int) -> Optional[str]:
+    """Why original_scores is neither a number nor a rows x columns matrix of numbers, or None"""
+    def is_number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if original_scores is None or is_number(original_scores):
+        return None
+    if (isinstance(original_scores, list) and len(original_scores) == n_rows
+            and all(isinstance(row, list) and len(row) == n_columns and all(map(is_number, row))
+                    for row in original_scores)):
+        return None
+    return f"original_scores must be a number or a {n_rows} x {n_columns} matrix of numbers (rows x columns)"
+
+@app.route('/analyze-matrix', methods=['POST', 'OPTIONS'])
+@admitted(admission)
+def analyze_matrix():
+    """Score a whole PLO-MLO or CLO-MLO grid of a programme in one request"""
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'})
+    
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No JSON data provided'
+            }), 400
+        
+        programme = str(data.get('programme', '')).lower()
+        direction = str(data.get('direction', 'plo-mlo')).lower()
+        language = str(data.get('language', 'en')).lower()
+        course_code = data.get('course')
+        include_details = bool(data.get('details', False))
+        original_scores = data.get('original_scores')
+        
+        if not programme:
+            return jsonify({
+                'success': False,
+                'error': 'programme is required (e.g. tvtb, majb, makm)'
+            }), 400
+        
+        if direction == 'plo-mlo':
+            rows = get_plos(programme, language)
+            columns = get_mlos(programme, language)
+        elif direction == 'clo-mlo':
+            if not course_code:
+                return jsonify({
+                    'success': False,
+                    'error': 'course is required for clo-mlo direction'
+                }), 400
+            course = get_course(programme, course_code)
+            rows = get_clos(programme, course_code, language)
+            # Same module MLOs as the CLO-MLO page, unless all MLOs are requested
+            module = None if data.get('all_mlos') else course.get('moodulikood')
+            columns = get_mlos(programme, language, module=module)
+        else:
+            return jsonify({
+                'success': False,
+                'error': "direction must be 'plo-mlo' or 'clo-mlo'"
+            }), 400
+        
+        scores_error = _original_scores_error(original_scores, len(rows), len(columns))
+        if scores_error:
+            return jsonify({
+                'success': False,
+                'error': scores_error
+            }), 400
+        
+        logger.info(f"Matrix analysis: {programme} {direction} {len(rows)}x{len(columns)}")
+        
+        row_texts = [outcome.text for outcome in rows]
+        column_texts = [outcome.text for outcome in columns]
+        matrix = semantic_analyzer.analyze_matrix(row_texts, column_texts, original_scores, programme)
+        
+        result = {
+            'success': True,
+            'programme': programme,
+            'direction': direction,
+            'language': language,
+            'rows': [{'code': o.code, 'text': o.text} for o in rows],
+            'columns': [{'code': o.code, 'module': o.module, 'text': o.text} for o in columns],
+            'scores': matrix['enhanced_score'],
+            'confidence': matrix['confidence'],
+            'components': {
+                'semantic_similarity': matrix['semantic_similarity'],
+                'concept_alignment': matrix['concept_alignment'],
+                'cognitive_coherence': matrix['cognitive_coherence']
+            }
+        }
+        if direction == 'clo-mlo':
+            result['course'] = course.get('ainekood')
+        
+        if include_details:
+            result['details'] = [
+                [
+                    semantic_analyzer.analyze_alignment(
+                        row_text, column_text,
+                        float(original_scores[i][j]) if isinstance(original_scores, list) else float(original_scores or 0),
+                        programme
+                    )
+                    for j, column_text in enumerate(column_texts)
+                ]
+                for i, row_text in enumerate(row_texts)
+            ]
+        
+        return jsonify(result)
+        
+    except CurriculumLookupError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f"Matrix analysis error: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': f'Matrix analysis failed: {str(e)}'
+        }), 500
+
+@app.route('/top-matches', methods=['POST', 'OPTIONS'])
+@admitted(admission)
+def top_matches():
+    """Top-k MLOs/CLOs for a PLO, or top-k PLOs for an MLO or CLO"""
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'})
+    
+    if not RETRIEVAL_AVAILABLE:
+        return jsonify({
+            'success': False,
+            'error': 'Retrieval requires NumPy'
+        }), 503
+    
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No JSON data provided'
+            }), 400
+        
+        programme = str(data.get('programme', '')).lower()
+        code = str(data.get('code', ''))
+        kind = str(data.get('kind', 'plo')).lower()
+        target = str(data.get('target', 'mlo' if kind == 'plo' else 'plo')).lower()
+        language = str(data.get('language', 'en')).lower()
+        k = int(data.get('k', 5))
+        
+        if not programme or not code:
+            return jsonify({
+                'success': False,
+                'error': 'programme and code are required'
+            }), 400
+        
+        matches = get_retrieval_index(language).top_k(
+            programme, code, kind=kind, target=target, k=k,
+            course=data.get('course', ''), target_course=data.get('target_course', '')
+        )
+        
+        return jsonify({
+            'success': True,
+            'programme': programme,
+            'query': {'kind': kind, 'code': code, 'course': data.get('course', '')},
+            'target': target,
+            'matches': matches
+        })
+        
+    except CurriculumLookupError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Top matches error: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': f'Retrieval failed: {str(e)}'
+        }), 500
+
+@app.route('/jobs', methods=['POST', 'OPTIONS'])
+def submit_job():
+    """Queue a batch of PLO-MLO pairs for background analysis"""
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'})
+    
+    try:
+        data = request.get_json()
+        if not data or not data.get('pairs'):
+            return jsonify({
+                'success': False,
+                'error': 'pairs is required'
+            }), 400
+        
+        job_id = get_job_queue().submit('alignment', data['pairs'], data.get('chunk_size'))
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': f'/jobs/{job_id}',
+            'results_url': f'/jobs/{job_id}/results'
+        }), 202
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Job submission error: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': f'Job submission failed: {str(e)}'
+        }), 500
+
+@app.route('/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """Progress of a batch job; DELETE cancels it"""
+    try:
+        queue = get_job_queue()
+        job = queue.cancel(job_id) if request.method == 'DELETE' else queue.get(job_id)
+        return jsonify({'success': True, **job})
+    except JobNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """Page through the committed results of a batch job"""
+    try:
+        page = get_job_queue().results(job_id, request.args.get('offset', 0, type=int),
+                                       request.args.get('limit', 100, type=int))
+        return jsonify({'success': True, **page})
+    except JobNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+
 @app.route('/concepts', methods=['GET'])
 def get_concepts():
     """Get available educational concepts"""
@@ -633,6 +1274,10 @@ def home():
             '/status': 'Health check',
             '/analyze': 'POST - Semantic analysis of PLO-MLO alignment',
             '/concepts': 'GET - List available educational concepts',
+            '/analyze-matrix': 'POST - Full PLO-MLO or CLO-MLO score matrix for a programme',
+            '/top-matches': 'POST - Top-k MLOs/CLOs for a PLO or PLOs for an MLO/CLO',
+            '/jobs': 'POST - Queue a large batch of pairs; poll /jobs/<id> and page /jobs/<id>/results',
+            '/metrics': 'GET - Prometheus metrics (request, stage and cache metrics)',
             '/test': 'GET - Test analysis with sample data'
         },
         'improvements_over_keyword_matching': [
@@ -660,4 +1305,5 @@ def home():
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     logger.info(f"Starting Lightweight Semantic Analysis Server on port {port}")
+    get_job_queue()  # resume jobs interrupted by a previous run
     app.run(host='0.0.0.0', port=port, debug=False)
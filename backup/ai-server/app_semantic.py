@@ -4,20 +4,64 @@ Advanced Semantic Analysis Server for Learning Outcomes
 Uses sentence transformers and NLP for true semantic understanding
 """
 
+import time
+PROCESS_START = time.monotonic()
+
 from flask import Flask, request, jsonify
 import os
 import logging
-import asyncio
+import threading
+from async_runtime import run_sync
 from semantic_analyzer import SemanticAnalysisAPI
+from programme_data import CurriculumLookupError, preload_programmes
+from admission import AdmissionController, admitted
+from metrics import COLD_START, instrument_app
+from profiling import install_profiling
+
+try:
+    from outcome_retrieval import EmbeddingEncoder, OutcomeRetrievalIndex
+    RETRIEVAL_AVAILABLE = True
+except ImportError:
+    RETRIEVAL_AVAILABLE = False
 
 app = Flask(__name__)
+instrument_app(app)
+install_profiling(app)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize semantic analyzer
-semantic_api = SemanticAnalysisAPI()
+# Seconds /analyze waits for model warm-up before using the keyword fallback
+MODEL_WAIT_TIMEOUT = float(os.environ.get('MODEL_WAIT_TIMEOUT', 0))
+
+# Initialize semantic analyzer; the model loads in the background so Flask can bind immediately.
+# Warm-up starts with the first request of each process, so workers forked by
+# gunicorn --preload warm up themselves instead of waiting on the parent's thread
+semantic_api = SemanticAnalysisAPI(warm_up=True)
+
+# Build the curriculum store (from the snapshot or the JSON) once, before any worker fork
+logger.info(f"Programme data source: {preload_programmes()}")
+
+# Bounds requests competing for the model; excess requests get 429 + Retry-After
+admission = AdmissionController.from_env('model')
+
+# Cold start to first response byte, recorded once per process
+startup_metrics = {'cold_start_to_first_byte_seconds': None}
+
+# Top-k retrieval indexes per language, built on first use
+_retrieval_indexes = {}
+_retrieval_lock = threading.Lock()
+
+def get_retrieval_index(language: str) -> 'OutcomeRetrievalIndex':
+    with _retrieval_lock:
+        if language not in _retrieval_indexes:
+            _retrieval_indexes[language] = OutcomeRetrievalIndex(EmbeddingEncoder(semantic_api.analyzer), language)
+        return _retrieval_indexes[language]
+
+@app.before_request
+def start_warm_up():
+    semantic_api.start()
 
 # CORS headers
 @app.after_request
@@ -25,6 +69,10 @@ def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    if startup_metrics['cold_start_to_first_byte_seconds'] is None:
+        startup_metrics['cold_start_to_first_byte_seconds'] = round(time.monotonic() - PROCESS_START, 3)
+        COLD_START.labels().set(startup_metrics['cold_start_to_first_byte_seconds'])
+        logger.info(f"Cold start to first byte: {startup_metrics['cold_start_to_first_byte_seconds']}s")
     return response
 
 @app.route('/status', methods=['GET'])
@@ -34,15 +82,21 @@ def status():
         'status': 'online',
         'message': 'Semantic Analysis Server is running',
         'version': '2.0.0',
+        'model': semantic_api.status(),
+        'metrics': startup_metrics,
+        'embeddings': semantic_api.analyzer.embedding_stats(),
+        'admission': admission.stats(),
         'features': [
             'Sentence transformer embeddings',
             'Educational concept mapping',
             'Bloom\'s taxonomy analysis',
-            'Contextual improvement suggestions'
+            'Contextual improvement suggestions',
+            'Top-k outcome retrieval'
         ]
     })
 
 @app.route('/analyze', methods=['POST', 'OPTIONS'])
+@admitted(admission)
 def analyze():
     """Advanced semantic analysis endpoint"""
     if request.method == 'OPTIONS':
@@ -68,15 +122,14 @@ def analyze():
         
         logger.info(f"Analyzing alignment: PLO='{plo_text[:50]}...' MLO='{mlo_text[:50]}...'")
         
+        # During warm-up, wait up to the deadline; after that the keyword engine answers
+        if not semantic_api.wait_until_ready(MODEL_WAIT_TIMEOUT):
+            logger.info("Model still warming up, using keyword similarity")
+        
         # Run semantic analysis
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(
-            semantic_api.analyze_alignment(plo_text, mlo_text, original_score)
-        )
-        loop.close()
+        result = run_sync(semantic_api.analyze_alignment(plo_text, mlo_text, original_score, data.get('programme')))
         
-        logger.info(f"Analysis complete: score={result.get('enhanced_score')}, confidence={result.get('confidence')}")
+        logger.info(f"Analysis complete: score={result.get('enhanced_score')}, confidence={result.get('confidence')}, engine={result.get('engine')}")
         
         return jsonify(result)
         
@@ -89,6 +142,72 @@ def analyze():
             'confidence': 0.0
         }), 500
 
+@app.route('/top-matches', methods=['POST', 'OPTIONS'])
+@admitted(admission)
+def top_matches():
+    """Top-k MLOs/CLOs for a PLO, or top-k PLOs for an MLO or CLO"""
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'})
+    
+    if not RETRIEVAL_AVAILABLE:
+        return jsonify({
+            'success': False,
+            'error': 'Retrieval requires NumPy'
+        }), 503
+    
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No JSON data provided'
+            }), 400
+        
+        programme = str(data.get('programme', '')).lower()
+        code = str(data.get('code', ''))
+        kind = str(data.get('kind', 'plo')).lower()
+        target = str(data.get('target', 'mlo' if kind == 'plo' else 'plo')).lower()
+        language = str(data.get('language', 'en')).lower()
+        k = int(data.get('k', 5))
+        
+        if not programme or not code:
+            return jsonify({
+                'success': False,
+                'error': 'programme and code are required'
+            }), 400
+        
+        index = get_retrieval_index(language)
+        matches = index.top_k(
+            programme, code, kind=kind, target=target, k=k,
+            course=data.get('course', ''), target_course=data.get('target_course', '')
+        )
+        
+        return jsonify({
+            'success': True,
+            'programme': programme,
+            'query': {'kind': kind, 'code': code, 'course': data.get('course', '')},
+            'target': target,
+            'vector_space': index.encoder.space,
+            'matches': matches
+        })
+        
+    except CurriculumLookupError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Top matches error: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': f'Retrieval failed: {str(e)}'
+        }), 500
+
 @app.route('/concepts', methods=['GET'])
 def get_concepts():
     """Get available educational concepts"""
@@ -127,12 +246,7 @@ def test_analysis():
         plo_sample = "Students will analyze environmental sustainability frameworks and evaluate lifecycle assessment methodologies to make informed decisions about resource management"
         mlo_sample = "Apply lifecycle assessment tools and methods to evaluate the environmental impact of products and processes in real-world scenarios"
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(
-            semantic_api.analyze_alignment(plo_sample, mlo_sample, 3.0)
-        )
-        loop.close()
+        result = run_sync(semantic_api.analyze_alignment(plo_sample, mlo_sample, 3.0))
         
         return jsonify({
             'test_data': {
@@ -158,9 +272,11 @@ def home():
         'version': '2.0.0',
         'description': 'Uses sentence transformers and educational concept mapping for semantic understanding',
         'endpoints': {
-            '/status': 'Health check',
+            '/status': 'Health check with model warm-up state (warming/ready/degraded)',
             '/analyze': 'POST - Semantic analysis of PLO-MLO alignment',
             '/concepts': 'GET - List available educational concepts',
+            '/top-matches': 'POST - Top-k MLOs/CLOs for a PLO or PLOs for an MLO/CLO',
+            '/metrics': 'GET - Prometheus metrics (request, stage and cache metrics)',
             '/test': 'GET - Test analysis with sample data'
         },
         'features': [
@@ -184,7 +300,8 @@ def home():
                     'confidence': 'Analysis confidence 0-1',
                     'reasoning': 'Detailed explanation',
                     'suggestions': 'List of improvement suggestions',
-                    'analysis_details': 'Detailed breakdown'
+                    'analysis_details': 'Detailed breakdown',
+                    'engine': "Similarity engine used: 'embedding' or 'keyword' during warm-up"
                 }
             }
         }
@@ -193,4 +310,5 @@ def home():
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     logger.info(f"Starting Semantic Analysis Server on port {port}")
+    semantic_api.start()
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Shared Async Runtime
+One long-lived event loop per process, plus an executor for CPU-bound scoring
+
+Flask request threads submit coroutines with run_sync(); the coroutines hand
+their CPU-bound work to offload(), which runs it on a thread or process pool
+behind a semaphore. With ANALYSIS_EXECUTOR=process the work function and its
+arguments must be picklable (use module-level functions); worker_initializer
+runs once in every pool process before it takes work. offload_thread() runs
+work on a thread of this process in either mode, under the same semaphore.
+
+Context variables set by the caller (e.g. an active request profile) are
+visible in the coroutine and in thread-pool work, as with asyncio.to_thread.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+# 'thread' (default) or 'process'; processes sidestep the GIL for pure-Python scoring
+ANALYSIS_EXECUTOR = os.environ.get('ANALYSIS_EXECUTOR', 'thread')
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', os.cpu_count() or 1))
+
+# Scoring jobs allowed in the executor at once; the rest wait on the loop
+ANALYSIS_CONCURRENCY = int(os.environ.get('ANALYSIS_CONCURRENCY', ANALYSIS_WORKERS * 2))
+
+class AsyncRuntime:
+    """Event loop on a daemon thread and the executor that does the work"""
+
+    def __init__(self, executor: str = ANALYSIS_EXECUTOR, workers: int = ANALYSIS_WORKERS,
+                 concurrency: int = ANALYSIS_CONCURRENCY):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"ANALYSIS_EXECUTOR must be 'thread' or 'process', got '{executor}'")
+        self.executor_kind = executor
+        self.workers = max(1, workers)
+        self.concurrency = max(1, concurrency)
+        self.logger = logging.getLogger(__name__)
+        self.worker_initializer: Optional[Callable] = None  # process pool only; set before start()
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.executor: Optional[Executor] = None
+        self.thread_executor: Optional[ThreadPoolExecutor] = None  # self.executor unless it is a process pool
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def process_pool(self) -> bool:
+        return self.executor_kind == 'process'
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread (again after a fork, e.g. gunicorn --preload)"""
+        with self._lock:
+            if self.loop is not None and self._pid == os.getpid():
+                return self.loop
+
+            self.thread_executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analysis')
+            if self.process_pool:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=self.worker_initializer)
+            else:
+                self.executor = self.thread_executor
+
+            loop = asyncio.new_event_loop()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            threading.Thread(target=run, name='async-runtime', daemon=True).start()
+            ready.wait()
+
+            self.loop = loop
+            self._pid = os.getpid()
+            self.logger.info(f"Async runtime started: {self.workers} {self.executor_kind} workers, concurrency {self.concurrency}")
+            return loop
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the shared loop from synchronous code and wait for it"""
+        loop = self.start()
+        if threading.current_thread().name == 'async-runtime':
+            coro.close()
+            raise RuntimeError("run() called from the runtime's own loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(_in_context(coro, contextvars.copy_context()), loop).result(timeout)
+
+    async def offload(self, fn: Callable, *args, **kwargs):
+        """Run CPU-bound fn in the executor, at most `concurrency` at a time"""
+        return await self._offload(self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def offload_thread(self, fn: Callable, *args, **kwargs):
+        """Like offload(), but on a thread of this process even when the executor is a process pool"""
+        return await self._offload(self.thread_executor, functools.partial(fn, *args, **kwargs))
+
+    async def _offload(self, executor: Executor, call: Callable):
+        loop = asyncio.get_running_loop()
+        if executor is self.thread_executor:
+            call = functools.partial(contextvars.copy_context().run, call)
+        if loop is not self.loop:
+            # Caller runs its own loop (asyncio.run in scripts): the semaphore belongs to ours
+            return await loop.run_in_executor(executor, call)
+        semaphore = self._semaphore
+        await semaphore.acquire()
+        try:
+            future = executor.submit(call)
+        except BaseException:
+            semaphore.release()
+            raise
+        # A caller that times out is cancelled, but a call already running keeps its
+        # executor slot until it returns, so the slot is released only then
+        future.add_done_callback(lambda _: _release(loop, semaphore))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def warm_workers(self, fn: Callable) -> list:
+        """Spawn the process-pool workers now (running the initializer) and return fn() from each task"""
+        self.start()
+        if not self.process_pool:
+            return []
+        return [future.result() for future in [self.executor.submit(fn) for _ in range(self.workers)]]
+
+    def shutdown(self):
+        with self._lock:
+            if self.loop is None:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            if self.thread_executor is not self.executor:
+                self.thread_executor.shutdown(wait=False, cancel_futures=True)
+            self.loop = None
+            self.executor = None
+            self.thread_executor = None
+
+def _release(loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore):
+    """Free an executor slot from the thread that finished the call"""
+    try:
+        loop.call_soon_threadsafe(semaphore.release)
+    except RuntimeError:  # loop closed by shutdown()
+        pass
+
+async def _in_context(coro, context: contextvars.Context):
+    """Await coro with the submitting thread's context variables"""
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+_runtime: Optional[AsyncRuntime] = None
+_runtime_lock = threading.Lock()
+
+def get_runtime() -> AsyncRuntime:
+    """Process-wide runtime, configured from the environment"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AsyncRuntime()
+        return _runtime
+
+def run_sync(coro, timeout: Optional[float] = None):
+    """Run a coroutine on the shared loop and return its result"""
+    return get_runtime().run(coro, timeout)
+
+async def offload(fn: Callable, *args, **kwargs):
+    """Run CPU-bound work off the event loop"""
+    runtime = get_runtime()
+    runtime.start()
+    return await runtime.offload(fn, *args, **kwargs)
+
+async def offload_thread(fn: Callable, *args, **kwargs):
+    """Run work off the event loop on a thread of this process, within the same concurrency limit"""
+    runtime = get_runtime()
+    runtime.start()
+    return await runtime.offload_thread(fn, *args, **kwargs)
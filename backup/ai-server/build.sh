@@ -1,3 +1,5 @@
 #!/usr/bin/env bash
 # Render build script
 pip install -r requirements.txt
+# Binary snapshot of data/programmes.json, memory-mapped by the servers
+python programme_snapshot.py || echo "No programme snapshot built; servers will read programmes.json"
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Sparse Corpus Index
+TF-IDF cosine and BM25 scoring of a query against every learning outcome text
+
+Postings are stored per term (document ids plus precomputed weights), so one
+query is scored against the whole corpus with a single bincount over the
+postings of its terms.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from programme_data import Outcome, iter_outcomes, iter_tokenized_outcomes
+from programme_snapshot import tokenize as simple_tokenize
+
+SCORING_MODES = ('cosine', 'bm25')
+
+class CorpusIndex:
+    """Inverted index with TF-IDF (cosine) and BM25 weights
+
+    term_weights optionally scales terms on top of IDF, e.g. a hand-written
+    table of educational keywords. tokens, when given, are the texts already
+    split by tokenizer.
+    """
+
+    def __init__(self, texts: Sequence[str], tokenizer: Callable[[str], List[str]] = simple_tokenize,
+                 documents: Optional[Sequence] = None, term_weights: Optional[Dict[str, float]] = None,
+                 k1: float = 1.5, b: float = 0.75, tokens: Optional[Sequence[List[str]]] = None):
+        self.tokenizer = tokenizer
+        self.documents = list(documents) if documents is not None else list(texts)
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+
+        doc_ids, term_ids, counts = [], [], []
+        lengths = np.zeros(len(texts))
+        for doc_id, text in enumerate(texts):
+            text_tokens = tokens[doc_id] if tokens is not None else tokenizer(text)
+            lengths[doc_id] = len(text_tokens)
+            tf: Dict[int, int] = {}
+            for token in text_tokens:
+                term_id = self.vocabulary.setdefault(token, len(self.vocabulary))
+                tf[term_id] = tf.get(term_id, 0) + 1
+            doc_ids.extend([doc_id] * len(tf))
+            term_ids.extend(tf)
+            counts.extend(tf.values())
+
+        n_docs, n_terms = len(texts), len(self.vocabulary)
+        doc_ids = np.array(doc_ids, dtype=np.intp)
+        term_ids = np.array(term_ids, dtype=np.intp)
+        tf = np.array(counts, dtype=np.float64)
+
+        df = np.bincount(term_ids, minlength=n_terms).astype(np.float64)
+        self.idf = np.log((1 + n_docs) / (1 + df)) + 1.0
+        self.bm25_idf = np.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+        self.term_weights = np.ones(n_terms)
+        for term, weight in (term_weights or {}).items():
+            if term in self.vocabulary:
+                self.term_weights[self.vocabulary[term]] = weight
+
+        # TF-IDF document vectors, L2-normalized
+        tfidf = tf * self.idf[term_ids] * self.term_weights[term_ids]
+        norms = np.sqrt(np.bincount(doc_ids, weights=tfidf ** 2, minlength=n_docs))
+        tfidf /= np.maximum(norms[doc_ids], 1e-12)
+
+        # BM25 term saturation with length normalization
+        average_length = lengths.mean() if n_docs else 0.0
+        length_norm = 1 - b + b * lengths[doc_ids] / max(average_length, 1e-12)
+        bm25 = self.bm25_idf[term_ids] * self.term_weights[term_ids] * tf * (k1 + 1) / (tf + k1 * length_norm)
+
+        # Postings sorted by term: term t owns rows indptr[t]:indptr[t+1]
+        order = np.argsort(term_ids, kind='stable')
+        self.postings_docs = doc_ids[order]
+        self.postings = {'cosine': tfidf[order], 'bm25': bm25[order]}
+        self.indptr = np.concatenate([[0], np.cumsum(df.astype(np.intp))])
+        self.n_docs = n_docs
+
+        # Filters by kind and programme, built once so a query only combines arrays
+        self.outcome_mask = np.zeros(n_docs, dtype=bool)
+        self.kind_masks: Dict[str, np.ndarray] = {}
+        self.programme_masks: Dict[str, np.ndarray] = {}
+        for doc_id, document in enumerate(self.documents):
+            if isinstance(document, Outcome):
+                self.outcome_mask[doc_id] = True
+                self.kind_masks.setdefault(document.kind, np.zeros(n_docs, dtype=bool))[doc_id] = True
+                self.programme_masks.setdefault(document.programme, np.zeros(n_docs, dtype=bool))[doc_id] = True
+
+    @classmethod
+    def from_programmes(cls, language: str = 'en', path: Optional[str] = None, **kwargs) -> 'CorpusIndex':
+        """Index every PLO, MLO and CLO in programmes.json"""
+        if kwargs.get('tokenizer', simple_tokenize) is simple_tokenize:
+            # The snapshot stores these tokens, so nothing is re-tokenized
+            tokenized = list(iter_tokenized_outcomes(language, path))
+            outcomes, tokens = [o for o, _ in tokenized], [t for _, t in tokenized]
+            return cls([o.text for o in outcomes], documents=outcomes, tokens=tokens, **kwargs)
+        outcomes = list(iter_outcomes(language, path))
+        return cls([o.text for o in outcomes], documents=outcomes, **kwargs)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def _query_terms(self, query: str, mode: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Known query term ids and their query-side weights"""
+        tf: Dict[int, int] = {}
+        for token in self.tokenizer(query):
+            term_id = self.vocabulary.get(token)
+            if term_id is not None:
+                tf[term_id] = tf.get(term_id, 0) + 1
+        term_ids = np.fromiter(tf, dtype=np.intp, count=len(tf))
+        counts = np.fromiter(tf.values(), dtype=np.float64, count=len(tf))
+
+        if mode == 'cosine':
+            weights = counts * self.idf[term_ids] * self.term_weights[term_ids]
+            return term_ids, weights / max(np.linalg.norm(weights), 1e-12)
+        # BM25 counts repeated query terms once per occurrence
+        return term_ids, counts
+
+    def score(self, query: str, mode: str = 'cosine') -> np.ndarray:
+        """Score of the query against every document"""
+        if mode not in SCORING_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(SCORING_MODES)}")
+        term_ids, query_weights = self._query_terms(query, mode)
+        if not len(term_ids):
+            return np.zeros(self.n_docs)
+
+        starts, ends = self.indptr[term_ids], self.indptr[term_ids + 1]
+        lengths = ends - starts
+        rows = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+        weights = self.postings[mode][rows] * np.repeat(query_weights, lengths)
+        return np.bincount(self.postings_docs[rows], weights=weights, minlength=self.n_docs)
+
+    def score_many(self, queries: Sequence[str], mode: str = 'cosine') -> np.ndarray:
+        """(queries, documents) score matrix"""
+        return np.vstack([self.score(query, mode) for query in queries]) if queries else np.zeros((0, self.n_docs))
+
+    def top_k(self, query: str, k: int = 10, mode: str = 'cosine',
+              mask: Optional[np.ndarray] = None) -> List[Tuple[object, float]]:
+        """Best k documents with a positive score, optionally within a boolean mask"""
+        scores = self.score(query, mode)
+        candidates = np.flatnonzero((scores > 0) if mask is None else (scores > 0) & mask)
+        if not len(candidates) or k <= 0:
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+    def mask(self, kind: Optional[str] = None, programme: Optional[str] = None) -> np.ndarray:
+        """Boolean filter over Outcome documents by kind and programme"""
+        selected = self.outcome_mask.copy()
+        none = np.zeros(self.n_docs, dtype=bool)
+        if kind:
+            selected &= self.kind_masks.get(kind, none)
+        if programme:
+            selected &= self.programme_masks.get(programme, none)
+        return selected
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Domain Term Matching
+Compiled, hot-reloadable matcher for the weighted terms in data/domain_terms.json
+
+Each term has a score multiplier and the programmes it applies to. The file
+is compiled into a word-level phrase index (first word -> candidate phrases),
+so matching a text is one pass over its words. The matcher re-checks the
+file's mtime at most every DOMAIN_TERMS_CHECK_SECONDS and swaps in a freshly
+compiled snapshot when it changed; a file that fails to parse (e.g. mid-edit)
+keeps the previous snapshot.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_DOMAIN_TERMS_PATH = Path(__file__).resolve().parents[2] / 'data' / 'domain_terms.json'
+DOMAIN_TERMS_PATH = Path(os.environ.get('DOMAIN_TERMS_JSON', DEFAULT_DOMAIN_TERMS_PATH))
+DOMAIN_TERMS_CHECK_SECONDS = float(os.environ.get('DOMAIN_TERMS_CHECK_SECONDS', 1.0))
+
+_WORD = re.compile(r'\w+')
+
+class DomainTerm(NamedTuple):
+    term: str
+    multiplier: float
+    programmes: frozenset  # empty: applies to every programme
+
+class CompiledDomainTerms:
+    """Immutable compiled form of one version of the term list"""
+
+    TEXT_CACHE_SIZE = 8192
+
+    def __init__(self, entries: List[Dict], stamp: Tuple[int, int] = (0, 0)):
+        self.stamp = stamp
+        self.terms: Tuple[DomainTerm, ...] = tuple(
+            DomainTerm(str(entry['term']), float(entry.get('multiplier', 1.0)),
+                       frozenset(str(p).lower() for p in entry.get('programmes') or ()))
+            for entry in entries if entry.get('term')
+        )
+
+        # first word -> [(words, term id)], longest phrases first
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], int]]] = {}
+        for term_id, term in enumerate(self.terms):
+            words = tuple(_WORD.findall(term.term.lower()))
+            if words:
+                self._phrases.setdefault(words[0], []).append((words, term_id))
+        for candidates in self._phrases.values():
+            candidates.sort(key=lambda candidate: -len(candidate[0]))
+
+        self._programme_masks: Dict[str, int] = {}
+        for term_id, term in enumerate(self.terms):
+            for programme in term.programmes:
+                self._programme_masks[programme] = self._programme_masks.get(programme, 0) | (1 << term_id)
+        self._global_mask = sum(1 << i for i, term in enumerate(self.terms) if not term.programmes)
+        self._all_mask = (1 << len(self.terms)) - 1
+        self.mask = lru_cache(maxsize=self.TEXT_CACHE_SIZE)(self.mask)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def mask(self, text: str) -> int:
+        """Bitmask of the terms occurring in text (whole words, case-insensitive)"""
+        words = _WORD.findall(text.lower())
+        found = 0
+        for i, word in enumerate(words):
+            for phrase, term_id in self._phrases.get(word, ()):
+                if tuple(words[i:i + len(phrase)]) == phrase:
+                    found |= 1 << term_id
+                    break
+        return found
+
+    def programme_mask(self, programme: Optional[str]) -> int:
+        """Terms that apply to a programme (all terms when none is given)"""
+        if not programme:
+            return self._all_mask
+        return self._programme_masks.get(programme.lower(), 0) | self._global_mask
+
+    def terms_in(self, mask: int) -> List[DomainTerm]:
+        return [term for term_id, term in enumerate(self.terms) if mask >> term_id & 1]
+
+    def match(self, text: str, programme: Optional[str] = None) -> List[DomainTerm]:
+        """Programme terms occurring in text"""
+        return self.terms_in(self.mask(text) & self.programme_mask(programme))
+
+    def alignment(self, text1: str, text2: str, programme: Optional[str] = None) -> Tuple[float, List[str]]:
+        """Multiplier for a pair (largest over terms both texts share, else 1.0) and the shared terms"""
+        shared = self.terms_in(self.mask(text1) & self.mask(text2) & self.programme_mask(programme))
+        if not shared:
+            return 1.0, []
+        return max(term.multiplier for term in shared), [term.term for term in shared]
+
+class DomainTermMatcher:
+    """Keeps the compiled term list current with the file on disk"""
+
+    def __init__(self, path: Optional[str] = None, check_seconds: float = DOMAIN_TERMS_CHECK_SECONDS):
+        self.path = Path(path or DOMAIN_TERMS_PATH)
+        self.check_seconds = check_seconds
+        self.logger = logging.getLogger(__name__)
+        self._compiled = CompiledDomainTerms([])
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.current()
+
+    def _stamp(self) -> Tuple[int, int]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return (0, 0)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def current(self) -> CompiledDomainTerms:
+        """Compiled terms, recompiled first if the file changed"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._compiled
+
+        with self._lock:
+            if now < self._next_check:
+                return self._compiled
+            self._next_check = now + self.check_seconds
+            stamp = self._stamp()
+            if stamp == self._compiled.stamp:
+                return self._compiled
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f).get('domainTerms', [])
+                compiled = CompiledDomainTerms(entries, stamp)
+            except (OSError, ValueError, TypeError, KeyError, AttributeError) as e:
+                if stamp != (0, 0):
+                    self.logger.warning(f"Keeping previous domain terms, could not load {self.path}: {e}")
+                return self._compiled
+            # Readers holding the old snapshot keep using it; new calls see this one
+            self._compiled = compiled
+            self.reloads += 1
+            self.logger.info(f"Loaded {len(compiled)} domain terms from {self.path}")
+            return compiled
+
+    def alignment(self, text1: str, text2: str, programme: Optional[str] = None) -> Tuple[float, List[str]]:
+        return self.current().alignment(text1, text2, programme)
+
+    def stats(self) -> Dict:
+        compiled = self.current()
+        return {
+            'path': str(self.path),
+            'terms': len(compiled),
+            'reloads': self.reloads
+        }
+
+_matcher: Optional[DomainTermMatcher] = None
+_matcher_lock = threading.Lock()
+
+def get_domain_matcher() -> DomainTermMatcher:
+    """Process-wide matcher for DOMAIN_TERMS_JSON"""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = DomainTermMatcher()
+        return _matcher
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Embedding Micro-Batcher
+Coalesces encode calls from concurrent requests into one model batch
+
+Callers block in encode(). A single worker thread takes the first waiting
+request, keeps collecting for up to window_ms or until max_texts texts are
+queued, encodes the distinct texts in one call and hands each caller its rows.
+The worker starts on the first encode() in each process, so a batcher built
+before a fork (gunicorn --preload) gets its own worker in every child.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from metrics import EMBEDDING_BATCH_QUEUE, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WAIT
+
+EMBEDDING_BATCH_WINDOW_MS = float(os.environ.get('EMBEDDING_BATCH_WINDOW_MS', 5))
+EMBEDDING_BATCH_MAX_TEXTS = int(os.environ.get('EMBEDDING_BATCH_MAX_TEXTS', 128))
+# Seconds a caller waits for its batch before encode() raises TimeoutError
+EMBEDDING_BATCH_TIMEOUT = float(os.environ.get('EMBEDDING_BATCH_TIMEOUT', 60))
+
+class _Pending:
+    """One caller's texts waiting for a batch"""
+    __slots__ = ('texts', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.enqueued = time.monotonic()
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+
+class EmbeddingBatcher:
+    """Micro-batching front for a batch encode function"""
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray],
+                 window_ms: float = EMBEDDING_BATCH_WINDOW_MS,
+                 max_texts: int = EMBEDDING_BATCH_MAX_TEXTS, timeout: float = EMBEDDING_BATCH_TIMEOUT):
+        self.encode_fn = encode_fn
+        self.window = window_ms / 1000.0
+        self.max_texts = max(1, max_texts)
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._queue: deque = deque()
+        self._queued_texts = 0
+        self._condition = threading.Condition()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._batch_size = EMBEDDING_BATCH_SIZE.labels()
+        self._queue_wait = EMBEDDING_BATCH_WAIT.labels()
+        EMBEDDING_BATCH_QUEUE.labels().set_function(lambda: self._queued_texts)
+
+        # Metrics
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+        self.encoded_texts = 0
+        self.last_batch_size = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+
+    def start(self):
+        """Start the worker thread (again after a fork, e.g. gunicorn --preload)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Whatever the parent had queued or locked belongs to the parent
+            self._queue = deque()
+            self._queued_texts = 0
+            self._condition = threading.Condition()
+            threading.Thread(target=self._run, name='embedding-batcher', daemon=True).start()
+            self._pid = os.getpid()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embeddings for texts, computed together with other pending callers"""
+        if self._pid != os.getpid():
+            self.start()
+        pending = _Pending(list(texts))
+        with self._condition:
+            self._queue.append(pending)
+            self._queued_texts += len(pending.texts)
+            self.max_queue_depth = max(self.max_queue_depth, self._queued_texts)
+            self._condition.notify()
+
+        if not pending.done.wait(self.timeout):
+            with self._condition:
+                if pending in self._queue:
+                    self._queue.remove(pending)
+                    self._queued_texts -= len(pending.texts)
+            raise TimeoutError(f"Embedding batch not done after {self.timeout:g}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _take_batch(self) -> List[_Pending]:
+        """Wait for work, hold the window open, then drain up to max_texts"""
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+
+            deadline = self._queue[0].enqueued + self.window
+            while self._queued_texts < self.max_texts:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch, size = [], 0
+            # A single oversized request still goes through on its own
+            while self._queue and (not batch or size + len(self._queue[0].texts) <= self.max_texts):
+                pending = self._queue.popleft()
+                batch.append(pending)
+                size += len(pending.texts)
+            self._queued_texts -= size
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            unique_texts = list(dict.fromkeys(text for pending in batch for text in pending.texts))
+            started = time.monotonic()
+
+            try:
+                embeddings = self.encode_fn(unique_texts) if unique_texts else None
+                row_of = {text: i for i, text in enumerate(unique_texts)}
+                for pending in batch:
+                    pending.result = (embeddings[[row_of[text] for text in pending.texts]]
+                                      if pending.texts else np.empty((0, 0), dtype=np.float32))
+            except Exception as e:
+                self.logger.warning(f"Batched encode of {len(unique_texts)} texts failed: {e}")
+                for pending in batch:
+                    pending.error = e
+
+            self.batches += 1
+            self.requests += len(batch)
+            self.texts += sum(len(pending.texts) for pending in batch)
+            self.encoded_texts += len(unique_texts)
+            self.last_batch_size = len(unique_texts)
+            self.total_wait += sum(started - pending.enqueued for pending in batch)
+            self._batch_size.observe(len(unique_texts))
+            for pending in batch:
+                self._queue_wait.observe(started - pending.enqueued)
+
+            for pending in batch:
+                pending.done.set()
+
+    def stats(self) -> Dict:
+        """Batching configuration and counters for status reporting"""
+        with self._condition:
+            queue_depth = self._queued_texts
+            queued_requests = len(self._queue)
+        return {
+            'window_ms': self.window * 1000.0,
+            'max_batch_texts': self.max_texts,
+            'queue_depth': queue_depth,
+            'queued_requests': queued_requests,
+            'max_queue_depth': self.max_queue_depth,
+            'batches': self.batches,
+            'requests': self.requests,
+            'texts': self.texts,
+            'encoded_texts': self.encoded_texts,
+            'last_batch_size': self.last_batch_size,
+            'mean_batch_size': round(self.encoded_texts / self.batches, 2) if self.batches else 0.0,
+            'mean_wait_ms': round(self.total_wait / self.requests * 1000.0, 3) if self.requests else 0.0
+        }
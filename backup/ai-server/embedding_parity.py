@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Embedding Backend Parity Check
+Encodes every learning outcome with two embedding backends and reports cosine
+drift, per-batch latency and the resident memory each backend added.
+
+Usage: python embedding_parity.py [--reference sentence-transformers] [--candidate onnx]
+                                  [--language en] [--batch-size 64]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from programme_data import iter_outcomes
+from semantic_analyzer import EMBEDDING_BACKENDS, EMBEDDING_BATCH_SIZE, create_embedding_backend
+
+def resident_memory_mb() -> float:
+    """Current resident set size (Linux), 0 where unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return 0.0
+
+def run_backend(name: str, texts, batch_size: int):
+    """Load one backend, encode texts batch by batch and time it"""
+    rss_before = resident_memory_mb()
+    started = time.perf_counter()
+    backend = create_embedding_backend(name)
+    if backend is None:
+        raise SystemExit(f"Embedding backend '{name}' is not installed")
+    load_seconds = time.perf_counter() - started
+
+    backend.encode(texts[:batch_size], batch_size=batch_size)  # warm-up run
+    batch_seconds, rows = [], []
+    for start in range(0, len(texts), batch_size):
+        started = time.perf_counter()
+        rows.append(np.asarray(backend.encode(texts[start:start + batch_size], batch_size=batch_size), dtype=np.float32))
+        batch_seconds.append(time.perf_counter() - started)
+
+    embeddings = np.vstack(rows)
+    embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    return embeddings, {
+        'backend': backend.name,
+        'load_seconds': round(load_seconds, 3),
+        'median_batch_ms': round(float(np.median(batch_seconds)) * 1000, 2),
+        'total_seconds': round(sum(batch_seconds), 3),
+        'rss_added_mb': round(resident_memory_mb() - rss_before, 1)
+    }
+
+def compare(reference: np.ndarray, candidate: np.ndarray) -> dict:
+    """Cosine drift per text and how often the nearest neighbour changes"""
+    cosine = (reference * candidate).sum(axis=1)
+    reference_nn = np.argsort(-(reference @ reference.T), axis=1)[:, 1]
+    candidate_nn = np.argsort(-(candidate @ candidate.T), axis=1)[:, 1]
+    return {
+        'texts': len(cosine),
+        'mean_cosine': round(float(cosine.mean()), 5),
+        'min_cosine': round(float(cosine.min()), 5),
+        'p01_cosine': round(float(np.percentile(cosine, 1)), 5),
+        'nearest_neighbour_agreement': round(float((reference_nn == candidate_nn).mean()), 4)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reference', default='sentence-transformers', choices=list(EMBEDDING_BACKENDS))
+    parser.add_argument('--candidate', default='onnx', choices=list(EMBEDDING_BACKENDS))
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--batch-size', type=int, default=EMBEDDING_BATCH_SIZE)
+    args = parser.parse_args()
+
+    texts = list(dict.fromkeys(outcome.text for outcome in iter_outcomes(args.language)))
+    # Candidate first so its memory is not hidden behind torch already being resident
+    candidate, candidate_stats = run_backend(args.candidate, texts, args.batch_size)
+    reference, reference_stats = run_backend(args.reference, texts, args.batch_size)
+
+    print(json.dumps({
+        'reference': reference_stats,
+        'candidate': candidate_stats,
+        'drift': compare(reference, candidate),
+        'speedup': round(reference_stats['median_batch_ms'] / max(candidate_stats['median_batch_ms'], 1e-9), 2)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
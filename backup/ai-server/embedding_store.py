@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Persistent Embedding Store
+Append-only, memory-mapped cache of sentence embeddings keyed by model and text hash
+
+Layout per (model, dtype) in the store directory:
+  <model>.<dtype>.emb   row-major embedding matrix, appended to, never rewritten
+  <model>.<dtype>.idx   one 16-byte text digest per row; its length is the row count
+  <model>.<dtype>.json  model name, dimension and dtype
+
+Writers append the embedding rows first and the index records last, under an
+exclusive file lock, so a row is only visible once it is complete. A writer
+that died mid-append leaves a tail without index records; the next writer
+truncates both files back to the last complete row before appending. Readers
+never lock: they read new index records and re-map the matrix read-only, so
+every worker process shares the same page cache instead of its own copy.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from metrics import cache_lookup
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+DIGEST_SIZE = 16
+
+def text_key(text: str) -> bytes:
+    """Digest of the whitespace-normalized text"""
+    normalized = ' '.join(text.split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+class EmbeddingStore:
+    """On-disk embedding cache shared by all workers on a host"""
+
+    def __init__(self, directory: str, model_name: str, dtype: str = 'float16'):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        self.logger = logging.getLogger(__name__)
+
+        stem = f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)}.{self.dtype.name}"
+        self.data_path = self.directory / f'{stem}.emb'
+        self.index_path = self.directory / f'{stem}.idx'
+        self.meta_path = self.directory / f'{stem}.json'
+
+        self.dim: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        self._matrix = None
+        self._lock = threading.Lock()         # _rows, _matrix, dim and the counters
+        self._write_lock = threading.Lock()   # appends from this process, one at a time
+        self.hits = 0
+        self.misses = 0
+
+        if self.meta_path.exists():
+            self.dim = json.loads(self.meta_path.read_text(encoding='utf-8'))['dim']
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+    def _refresh(self):
+        """Pick up rows appended by this or other processes (caller holds _lock)"""
+        if self.dim is None:
+            if not self.meta_path.exists():
+                return
+            self.dim = json.loads(self.meta_path.read_text(encoding='utf-8'))['dim']
+        if not self.index_path.exists():
+            return
+
+        count = self.index_path.stat().st_size // DIGEST_SIZE
+        known = len(self._rows)
+        if count == known:
+            return
+
+        with open(self.index_path, 'rb') as f:
+            f.seek(known * DIGEST_SIZE)
+            records = f.read((count - known) * DIGEST_SIZE)
+        for row in range(count - known):
+            key = records[row * DIGEST_SIZE:(row + 1) * DIGEST_SIZE]
+            self._rows.setdefault(key, known + row)
+
+        self._matrix = np.memmap(self.data_path, dtype=self.dtype, mode='r', shape=(count, self.dim))
+
+    def get(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached float32 embedding for each text, or None where missing"""
+        keys = [text_key(text) for text in texts]
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                self._refresh()
+            rows = [self._rows.get(key) for key in keys]
+            matrix = self._matrix
+
+        found = [None if row is None else np.asarray(matrix[row], dtype=np.float32) for row in rows]
+        hits = sum(vector is not None for vector in found)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(found) - hits
+        cache_lookup('embedding_store', hits, len(found) - hits)
+        return found
+
+    def put(self, texts: Sequence[str], embeddings: np.ndarray):
+        """Append embeddings for texts not yet in the store"""
+        if not len(texts):
+            return
+        embeddings = np.asarray(embeddings)
+
+        # Writers queue on _write_lock (and the file lock across processes); _lock is
+        # held only for in-memory state, so readers never wait behind the fsync
+        with self._write_lock, open(self.index_path, 'ab') as index_file:
+            if fcntl:
+                fcntl.flock(index_file, fcntl.LOCK_EX)
+            try:
+                with self._lock:
+                    self._refresh()
+                    if self.dim is None:
+                        self.dim = int(embeddings.shape[1])
+                        self.meta_path.write_text(json.dumps({
+                            'model': self.model_name,
+                            'dim': self.dim,
+                            'dtype': self.dtype.name
+                        }), encoding='utf-8')
+                    elif embeddings.shape[1] != self.dim:
+                        raise ValueError(f"Embedding dimension {embeddings.shape[1]} does not match store dimension {self.dim}")
+
+                    new_rows = {}
+                    for text, vector in zip(texts, embeddings):
+                        key = text_key(text)
+                        if key not in self._rows and key not in new_rows:
+                            new_rows[key] = vector
+                self._repair()
+                if not new_rows:
+                    return
+
+                # Rows first, then the index records that make them visible
+                with open(self.data_path, 'ab') as data_file:
+                    np.asarray(list(new_rows.values()), dtype=self.dtype).tofile(data_file)
+                    data_file.flush()
+                    os.fsync(data_file.fileno())
+                index_file.write(b''.join(new_rows))
+                index_file.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(index_file, fcntl.LOCK_UN)
+
+        # Publish the new rows to this instance's index
+        with self._lock:
+            self._refresh()
+
+    def _repair(self):
+        """Drop rows and partial index records a crashed writer left behind (caller holds the file lock)"""
+        count = self.index_path.stat().st_size // DIGEST_SIZE
+        if self.index_path.stat().st_size != count * DIGEST_SIZE:
+            os.truncate(self.index_path, count * DIGEST_SIZE)
+        expected = count * self.dim * self.dtype.itemsize
+        if self.data_path.exists() and self.data_path.stat().st_size > expected:
+            self.logger.warning(f"Truncating {self.data_path} to {count} rows after an interrupted append")
+            os.truncate(self.data_path, expected)
+
+    def stats(self) -> Dict:
+        """Size and hit counts for status reporting"""
+        return {
+            'model': self.model_name,
+            'dtype': self.dtype.name,
+            'dim': self.dim,
+            'rows': len(self),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Persistent Batch Job Queue
+Long-running alignment batches backed by a local SQLite file
+
+A submitted job stores its items and is processed in chunks by worker
+threads. Each chunk's results and the job's progress are committed in one
+transaction, so clients can page through partial results while the job runs
+and a job interrupted by a crash resumes from its last committed chunk.
+
+Workers claim a job with a lease tagged with their own owner token and renew
+it from a heartbeat thread while they work; a job whose lease expired (its
+worker died) is claimed again by any process sharing the database file. A
+chunk is only committed while the worker still owns the lease, so a worker
+that lost its job stops without writing.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.jobs', 'jobs.sqlite3'))
+JOB_CHUNK_SIZE = int(os.environ.get('JOB_CHUNK_SIZE', 50))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 1))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 120))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 2))
+JOB_MAX_ITEMS = int(os.environ.get('JOB_MAX_ITEMS', 200000))
+
+JOB_STATES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    succeeded INTEGER NOT NULL DEFAULT 0,
+    chunk_size INTEGER NOT NULL,
+    lease_until REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (job_id, idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+class JobNotFoundError(LookupError):
+    """Unknown job id"""
+
+class JobQueue:
+    """SQLite-backed job queue with chunked, resumable processing
+
+    Work functions are registered per job kind and take a list of items,
+    returning one JSON-serializable result per item in the same order.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH, chunk_size: int = JOB_CHUNK_SIZE,
+                 workers: int = JOB_WORKERS, lease_seconds: float = JOB_LEASE_SECONDS,
+                 poll_seconds: float = JOB_POLL_SECONDS):
+        self.path = path
+        self.chunk_size = max(1, chunk_size)
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.logger = logging.getLogger(__name__)
+
+        self._handlers: Dict[str, Callable[[List[Dict]], List[Dict]]] = {}
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._threads: List[threading.Thread] = []
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(SCHEMA)
+            columns = {row['name'] for row in db.execute('PRAGMA table_info(jobs)')}
+            if 'lease_owner' not in columns:  # database created before lease owners
+                db.execute('ALTER TABLE jobs ADD COLUMN lease_owner TEXT')
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection; one transaction per `with` block"""
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def register(self, kind: str, work_fn: Callable[[List[Dict]], List[Dict]]):
+        """Set the function that processes a chunk of items of this kind"""
+        self._handlers[kind] = work_fn
+
+    def start(self):
+        """Start the worker threads (again after a fork, e.g. gunicorn --preload)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stopping.clear()
+            self._threads = [threading.Thread(target=self._run, name=f'job-worker-{n}', daemon=True)
+                             for n in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+            self.logger.info(f"Job queue started: {self.workers} workers, chunk size {self.chunk_size}, db {self.path}")
+
+    def stop(self, timeout: Optional[float] = 0):
+        """Let the workers exit after their current chunk, waiting up to timeout seconds (None: until they do)"""
+        with self._lock:
+            self._stopping.set()
+            self._wakeup.set()
+            self._pid = None
+            threads, self._threads = self._threads, []
+        if timeout != 0:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for thread in threads:
+                if thread is not threading.current_thread():
+                    thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+
+    def submit(self, kind: str, items: List[Dict], chunk_size: Optional[int] = None) -> str:
+        """Store a new job and return its id"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        if not isinstance(items, list) or not items:
+            raise ValueError("items must be a non-empty list")
+        if len(items) > JOB_MAX_ITEMS:
+            raise ValueError(f"A job can hold at most {JOB_MAX_ITEMS} items")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                'INSERT INTO jobs (id, kind, status, total, chunk_size, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, kind, 'queued', len(items), max(1, int(chunk_size or self.chunk_size)), now, now)
+            )
+            db.executemany('INSERT INTO job_items (job_id, idx, payload) VALUES (?, ?, ?)',
+                           ((job_id, i, json.dumps(item)) for i, item in enumerate(items)))
+        self.start()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Dict:
+        """Status and progress of a job"""
+        with self._connect() as db:
+            row = db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(f"Job '{job_id}' not found")
+        return {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'total': row['total'],
+            'completed': row['completed'],
+            'succeeded': row['succeeded'],
+            'progress': round(row['completed'] / row['total'], 4) if row['total'] else 1.0,
+            'created': row['created'],
+            'updated': row['updated'],
+            'error': row['error']
+        }
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> Dict:
+        """One page of committed results (available while the job is still running)"""
+        job = self.get(job_id)
+        offset, limit = max(0, offset), max(1, min(limit, 1000))
+        with self._connect() as db:
+            rows = db.execute(
+                'SELECT idx, result FROM job_results WHERE job_id = ? AND idx >= ? ORDER BY idx LIMIT ?',
+                (job_id, offset, limit)
+            ).fetchall()
+        next_offset = offset + len(rows)
+        return {
+            'job': job,
+            'offset': offset,
+            'results': [json.loads(row['result']) for row in rows],
+            'next_offset': next_offset if next_offset < job['total'] else None
+        }
+
+    def cancel(self, job_id: str) -> Dict:
+        """Stop a queued or running job after its current chunk"""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = 'cancelled', updated = ? WHERE id = ? AND status IN ('queued', 'running')",
+                       (time.time(), job_id))
+        return self.get(job_id)
+
+    def stats(self) -> Dict:
+        """Job counts per state for status reporting"""
+        with self._connect() as db:
+            counts = dict(db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        return {state: counts.get(state, 0) for state in JOB_STATES}
+
+    def _claim(self) -> Optional[Tuple[sqlite3.Row, str]]:
+        """Take the oldest queued job, or a running job whose worker stopped renewing its lease
+
+        Returns the job and the owner token its lease was taken with.
+        """
+        now = time.time()
+        owner = uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute('BEGIN IMMEDIATE')
+            kinds = list(self._handlers)
+            row = db.execute(
+                f"""SELECT * FROM jobs
+                    WHERE kind IN ({','.join('?' * len(kinds))})
+                      AND (status = 'queued' OR (status = 'running' AND lease_until < ?))
+                    ORDER BY created LIMIT 1""",
+                (*kinds, now)
+            ).fetchone()
+            if row is None:
+                return None
+            if row['status'] == 'running':
+                self.logger.info(f"Resuming job {row['id']} at item {row['completed']}/{row['total']}")
+            db.execute("UPDATE jobs SET status = 'running', lease_until = ?, lease_owner = ?, updated = ? WHERE id = ?",
+                       (now + self.lease_seconds, owner, now, row['id']))
+            return row, owner
+
+    def _renew(self, job_id: str, owner: str) -> bool:
+        """Extend a lease this worker still holds; False once it is lost or the job stopped"""
+        with self._connect() as db:
+            return db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, job_id, owner)
+            ).rowcount > 0
+
+    def _heartbeat(self, job_id: str, owner: str, done: threading.Event, lost: threading.Event):
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                if not self._renew(job_id, owner):
+                    lost.set()
+                    return
+            except sqlite3.Error as e:
+                self.logger.warning(f"Lease renewal for job {job_id} failed: {e}")
+
+    def _process(self, job: sqlite3.Row, owner: str):
+        done, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job['id'], owner, done, lost),
+                                     name=f"job-heartbeat-{job['id'][:8]}", daemon=True)
+        heartbeat.start()
+        try:
+            self._process_chunks(job, owner, lost)
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def _process_chunks(self, job: sqlite3.Row, owner: str, lost: threading.Event):
+        job_id, work_fn = job['id'], self._handlers[job['kind']]
+        start = job['completed']
+        while start < job['total'] and not lost.is_set():
+            with self._connect() as db:
+                items = [json.loads(row['payload']) for row in db.execute(
+                    'SELECT payload FROM job_items WHERE job_id = ? AND idx >= ? ORDER BY idx LIMIT ?',
+                    (job_id, start, job['chunk_size'])
+                )]
+            results = work_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"Work function returned {len(results)} results for {len(items)} items")
+
+            now = time.time()
+            end = start + len(items)
+            with self._connect() as db:
+                # Only the lease holder commits; a cancelled or re-claimed job stops here
+                claimed = db.execute(
+                    """UPDATE jobs SET completed = ?, succeeded = succeeded + ?, lease_until = ?, updated = ?,
+                       status = CASE WHEN ? >= total THEN 'completed' ELSE status END
+                       WHERE id = ? AND lease_owner = ? AND status = 'running' AND completed = ?""",
+                    (end, sum(1 for r in results if isinstance(r, dict) and r.get('success')),
+                     now + self.lease_seconds, now, end, job_id, owner, start)
+                ).rowcount
+                if not claimed:
+                    self.logger.info(f"Job {job_id} lost its lease or was cancelled; dropping chunk at item {start}")
+                    return
+                db.executemany('INSERT OR REPLACE INTO job_results (job_id, idx, result) VALUES (?, ?, ?)',
+                               ((job_id, start + i, json.dumps(result)) for i, result in enumerate(results)))
+            start = end
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = self._claim()
+            except sqlite3.Error as e:
+                self.logger.warning(f"Job claim failed: {e}")
+                claimed = None
+            if claimed is None:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+                continue
+
+            job, owner = claimed
+            try:
+                self._process(job, owner)
+            except Exception as e:
+                self.logger.error(f"Job {job['id']} failed: {e}", exc_info=True)
+                with self._connect() as db:
+                    db.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ? AND lease_owner = ?",
+                               (str(e), time.time(), job['id'], owner))
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Prometheus Metrics
+Counters, gauges and histograms rendered in the text exposition format
+
+No client library is needed: each metric keeps plain numbers per label set
+behind a lock, so recording a sample is a dict lookup and an addition and is
+cheap enough to leave on in production. instrument_app() adds per-endpoint
+request metrics and a /metrics route to a Flask app; stage() and timed()
+record analysis stage latency.
+"""
+
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; fine-grained at the low end, where most analysis stages sit
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Registry:
+    """Metrics rendered by /metrics, in registration order"""
+
+    def __init__(self):
+        self._metrics: Dict[str, '_Metric'] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: '_Metric') -> '_Metric':
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+class _Metric(ABC):
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values) -> object:
+        """Child metric for one label set (cache it on hot paths)"""
+        values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """Value holder for one label set"""
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Exposition lines for every label set"""
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+class _Value:
+    __slots__ = ('value', 'function', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from function at scrape time"""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}'
+                for values, child in self._items()]
+
+class Gauge(Counter):
+    type = 'gauge'
+
+class _HistogramValue:
+    __slots__ = ('upper_bounds', 'counts', 'sum', '_lock')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for values, child in self._items():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, (('le', _format_value(bound)),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+# Shared metrics; every server process exposes the ones its code paths touch
+REQUESTS = Counter('http_requests_total', 'HTTP requests by endpoint, method and status', ('endpoint', 'method', 'status'))
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Time to produce the response (streaming bodies excluded)', ('endpoint',))
+REQUESTS_IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests currently being handled', ('endpoint',))
+STAGE_LATENCY = Histogram('analysis_stage_duration_seconds', 'Time spent per analysis stage', ('stage',))
+CACHE_LOOKUPS = Counter('cache_lookups_total', 'Cache lookups by cache and result', ('cache', 'result'))
+CACHE_HIT_RATIO = Gauge('cache_hit_ratio', 'Hits over lookups since process start', ('cache',))
+ADMISSION_IN_FLIGHT = Gauge('admission_in_flight', 'Admitted requests running per engine', ('engine',))
+ADMISSION_WAITING = Gauge('admission_waiting', 'Requests waiting for admission per engine', ('engine',))
+ADMISSION_REJECTED = Counter('admission_rejected_total', 'Requests rejected with 429 by engine and reason', ('engine', 'reason'))
+ADMISSION_WAIT = Histogram('admission_queue_wait_seconds', 'Time admitted requests spent queued', ('engine',))
+COLD_START = Gauge('cold_start_to_first_byte_seconds', 'Process start to the first response byte')
+EMBEDDING_BATCH_SIZE = Histogram('embedding_batch_size', 'Distinct texts per batched model call',
+                                 buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
+EMBEDDING_BATCH_WAIT = Histogram('embedding_batch_queue_wait_seconds', 'Time encode callers waited for their batch to start')
+EMBEDDING_BATCH_QUEUE = Gauge('embedding_batch_queue_depth', 'Texts waiting for the embedding batcher')
+
+def cache_lookup(cache: str, hits: int = 0, misses: int = 0):
+    """Count cache hits and misses; the hit ratio gauge follows them"""
+    if hits:
+        CACHE_LOOKUPS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, 'miss').inc(misses)
+    ratio = CACHE_HIT_RATIO.labels(cache)
+    if ratio.function is None:
+        hit_count, miss_count = CACHE_LOOKUPS.labels(cache, 'hit'), CACHE_LOOKUPS.labels(cache, 'miss')
+        ratio.set_function(lambda: hit_count.value / max(hit_count.value + miss_count.value, 1))
+
+class stage:
+    """Context manager timing one analysis stage"""
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, name: str):
+        self.histogram = STAGE_LATENCY.labels(name)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+def timed(name: str):
+    """Decorator timing every call of a function as analysis stage `name`"""
+    histogram = STAGE_LATENCY.labels(name)
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+def render() -> str:
+    return REGISTRY.render()
+
+def instrument_app(app):
+    """Record per-endpoint request metrics on a Flask app and serve /metrics"""
+    from flask import Response, g, request
+
+    def endpoint_label() -> str:
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+        g._metrics_endpoint = endpoint_label()
+        REQUESTS_IN_FLIGHT.labels(g._metrics_endpoint).inc()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get('_metrics_started')
+        if started is not None:
+            endpoint = g._metrics_endpoint
+            REQUEST_LATENCY.labels(endpoint).observe(time.perf_counter() - started)
+            REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+        return response
+
+    @app.teardown_request
+    def _finish_request(exc):
+        if g.get('_metrics_started') is not None:
+            REQUESTS_IN_FLIGHT.labels(g._metrics_endpoint).dec()
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus text exposition of this process's metrics"""
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    return app
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Learning Outcomes
+MinHash signatures with LSH banding to find copy-pasted or lightly edited
+outcomes (by default CLOs) across every course without an all-pairs pass.
+
+Usage: python near_duplicates.py [--threshold 0.8] [--language en] [--kinds clo]
+                                 [--shingle-size 2] [--num-perm 128] [--programme tvtb]
+"""
+
+import argparse
+import hashlib
+import json
+import re
+from typing import Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from programme_data import iter_outcomes
+
+# Prime just above 2**32: (a * x + b) with 32-bit a, b and x stays exact in uint64
+MERSENNE_PRIME = np.uint64(4294967311)
+MAX_HASH = np.uint64(2**32 - 1)
+
+def shingles(text: str, size: int = 2) -> Set[str]:
+    """Word n-grams of the lowercased text (the whole text if shorter than n)"""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _area(y: np.ndarray, x: np.ndarray) -> float:
+    """Trapezoidal integral (np.trapz moved between NumPy versions)"""
+    return float(((y[1:] + y[:-1]) / 2 * np.diff(x)).sum())
+
+def lsh_bands(threshold: float, num_perm: int, false_negative_weight: float = 0.9) -> Tuple[int, int]:
+    """Bands and rows per band minimizing the weighted false positive/negative area
+
+    Misses are weighted higher than extra candidates, since candidates are
+    verified with exact Jaccard anyway.
+    """
+    below = np.linspace(0.0, threshold, 200)
+    above = np.linspace(threshold, 1.0, 200)
+    best, best_error = (1, num_perm), float('inf')
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positive = _area(1 - (1 - below ** rows) ** bands, below)
+            false_negative = _area((1 - above ** rows) ** bands, above)
+            error = (1 - false_negative_weight) * false_positive + false_negative_weight * false_negative
+            if error < best_error:
+                best, best_error = (bands, rows), error
+    return best
+
+class MinHashLSH:
+    """Incremental MinHash/LSH index with exact Jaccard verification"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 2, seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, 2**32, size=num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, 2**32, size=num_perm, dtype=np.uint64)
+
+        self.shingle_sets: Dict[Hashable, Set[str]] = {}
+        self.signatures: Dict[Hashable, np.ndarray] = {}
+        self.buckets: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.signatures
+
+    def signature(self, shingle_set: Set[str]) -> np.ndarray:
+        """MinHash signature of a shingle set"""
+        if not shingle_set:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        hashes = np.array([
+            int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+            for s in shingle_set
+        ], dtype=np.uint64)
+        permuted = (hashes[:, None] * self.a + self.b) % MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: Hashable, text: str) -> List[Tuple[Hashable, float]]:
+        """Index one outcome (replacing an older version) and return its near duplicates"""
+        if key in self.signatures:
+            self.remove(key)
+        shingle_set = shingles(text, self.shingle_size)
+        signature = self.signature(shingle_set)
+
+        matches = self._verified(key, shingle_set, self._candidates(signature))
+        self.shingle_sets[key] = shingle_set
+        self.signatures[key] = signature
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            band.setdefault(band_key, set()).add(key)
+        return matches
+
+    def remove(self, key: Hashable):
+        signature = self.signatures.pop(key)
+        del self.shingle_sets[key]
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            members = band[band_key]
+            members.discard(key)
+            if not members:
+                del band[band_key]
+
+    def _candidates(self, signature: np.ndarray) -> Set[Hashable]:
+        found = set()
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            found.update(band.get(band_key, ()))
+        return found
+
+    def _verified(self, key: Hashable, shingle_set: Set[str], candidates) -> List[Tuple[Hashable, float]]:
+        matches = []
+        for other in candidates:
+            if other == key:
+                continue
+            other_set = self.shingle_sets[other]
+            union = len(shingle_set | other_set)
+            jaccard = len(shingle_set & other_set) / union if union else 1.0
+            if jaccard >= self.threshold:
+                matches.append((other, jaccard))
+        return matches
+
+    def query(self, text: str) -> List[Tuple[Hashable, float]]:
+        """Indexed outcomes at or above the threshold for a text that is not indexed"""
+        shingle_set = shingles(text, self.shingle_size)
+        return sorted(self._verified(None, shingle_set, self._candidates(self.signature(shingle_set))),
+                      key=lambda match: -match[1])
+
+    def clusters(self) -> List[List[Hashable]]:
+        """Connected groups of near duplicates (two or more members)"""
+        parent = {key: key for key in self.signatures}
+
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        checked = set()
+        for band in self.buckets:
+            for members in band.values():
+                if len(members) < 2:
+                    continue
+                members = list(members)
+                for i, key in enumerate(members):
+                    # The same pair can collide in several bands; verify it once
+                    others = [other for other in members[i + 1:] if (key, other) not in checked]
+                    checked.update((key, other) for other in others)
+                    checked.update((other, key) for other in others)
+                    for other, _ in self._verified(key, self.shingle_sets[key], others):
+                        parent[find(other)] = find(key)
+
+        groups: Dict[Hashable, List[Hashable]] = {}
+        for key in self.signatures:
+            groups.setdefault(find(key), []).append(key)
+        return [members for members in groups.values() if len(members) > 1]
+
+def find_near_duplicates(threshold: float = 0.8, language: str = 'en', kinds: Sequence[str] = ('clo',),
+                         programme: Optional[str] = None, shingle_size: int = 2, num_perm: int = 128,
+                         path: Optional[str] = None) -> List[Dict]:
+    """Near-duplicate clusters over the outcomes in programmes.json, largest first"""
+    index = MinHashLSH(threshold, num_perm, shingle_size)
+    outcomes = {}
+    for outcome in iter_outcomes(language, path):
+        if outcome.kind in kinds and (not programme or outcome.programme == programme):
+            key = (outcome.kind, outcome.programme, outcome.course, outcome.code)
+            outcomes[key] = outcome
+            index.add(key, outcome.text)
+
+    result = []
+    for members in index.clusters():
+        members.sort()
+        result.append({
+            'size': len(members),
+            'outcomes': [
+                {
+                    'kind': outcomes[key].kind,
+                    'programme': outcomes[key].programme,
+                    'course': outcomes[key].course,
+                    'code': outcomes[key].code,
+                    'text': outcomes[key].text
+                }
+                for key in members
+            ]
+        })
+    result.sort(key=lambda cluster: -cluster['size'])
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Find near-duplicate learning outcomes with MinHash/LSH')
+    parser.add_argument('--threshold', type=float, default=0.8, help='Minimum Jaccard similarity of shingle sets')
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--kinds', default='clo', help='Comma-separated outcome kinds: plo,mlo,clo')
+    parser.add_argument('--programme', default=None)
+    parser.add_argument('--shingle-size', type=int, default=2)
+    parser.add_argument('--num-perm', type=int, default=128)
+    args = parser.parse_args()
+
+    clusters = find_near_duplicates(args.threshold, args.language, args.kinds.split(','),
+                                    args.programme, args.shingle_size, args.num_perm)
+    print(json.dumps({
+        'threshold': args.threshold,
+        'clusters': len(clusters),
+        'outcomes_in_clusters': sum(c['size'] for c in clusters),
+        'results': clusters
+    }, indent=2, ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
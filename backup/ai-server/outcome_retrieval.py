@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Outcome Retrieval Index
+Top-k lookups such as "which MLOs best support PLO3?" over normalized outcome vectors
+"""
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from programme_data import CurriculumLookupError, get_curriculum_store, iter_outcomes, programmes_version
+
+OUTCOME_KINDS = ('plo', 'mlo', 'clo')
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+class EmbeddingEncoder:
+    """Sentence embeddings from AdvancedSemanticAnalyzer, concept vectors until a model is loaded"""
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.concept_names = list(analyzer.educational_concepts)
+        self.concept_weights = np.array([c.weight for c in analyzer.educational_concepts.values()])
+
+    @property
+    def space(self) -> str:
+        return 'embedding' if self.analyzer.model else 'concepts'
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        if self.analyzer.model:
+            return self.analyzer.encode_texts(list(texts))
+        vectors = np.zeros((len(texts), len(self.concept_names)))
+        for row, text in enumerate(texts):
+            found = self.analyzer._extract_educational_concepts(text)
+            for column, name in enumerate(self.concept_names):
+                vectors[row, column] = found.get(name, 0.0)
+        return _normalize_rows(vectors * self.concept_weights)
+
+class ConceptProfileEncoder:
+    """Weighted concept-confidence vectors from LightweightSemanticAnalyzer profiles"""
+
+    space = 'concepts'
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.concept_weights = np.array(analyzer.concept_graph.weights)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.array(
+            [self.analyzer.get_profile(text).concept_confidences for text in texts],
+            dtype=np.float64
+        ).reshape(len(texts), len(self.concept_weights))
+        return _normalize_rows(vectors * self.concept_weights)
+
+class VectorIndex(ABC):
+    """Interface for nearest-neighbour indexes over normalized vectors
+
+    Implementations keep one row per key and answer inner-product queries,
+    restricted to a subset of rows. An approximate index can replace the
+    exact one as long as it supports the same three operations.
+    """
+
+    @abstractmethod
+    def upsert(self, keys: Sequence, vectors: np.ndarray):
+        """Add or replace the rows for keys"""
+
+    @abstractmethod
+    def remove(self, keys: Sequence):
+        """Drop the rows for keys"""
+
+    @abstractmethod
+    def search(self, query: np.ndarray, k: int, candidates: Sequence) -> List[Tuple[object, float]]:
+        """Best k (key, score) pairs among candidates, highest score first"""
+
+class BruteForceIndex(VectorIndex):
+    """Exact search: one matrix-vector product plus argpartition"""
+
+    def __init__(self):
+        self.keys: List = []
+        self.rows: Dict = {}
+        self.matrix: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def upsert(self, keys: Sequence, vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        new_keys = [key for key in keys if key not in self.rows]
+        if self.matrix is None:
+            self.matrix = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        if self.matrix.shape[1] != vectors.shape[1]:
+            raise ValueError("Vector dimension changed; rebuild the index")
+        if new_keys:
+            start = len(self.keys)
+            self.matrix = np.vstack([self.matrix, np.zeros((len(new_keys), vectors.shape[1]), dtype=np.float32)])
+            for offset, key in enumerate(new_keys):
+                self.rows[key] = start + offset
+                self.keys.append(key)
+        for key, vector in zip(keys, vectors):
+            self.matrix[self.rows[key]] = vector
+
+    def remove(self, keys: Sequence):
+        doomed = sorted((self.rows[key] for key in keys if key in self.rows), reverse=True)
+        if not doomed:
+            return
+        self.matrix = np.delete(self.matrix, doomed, axis=0)
+        for row in doomed:
+            del self.keys[row]
+        self.rows = {key: row for row, key in enumerate(self.keys)}
+
+    def search(self, query: np.ndarray, k: int, candidates: Sequence) -> List[Tuple[object, float]]:
+        rows = np.fromiter((self.rows[key] for key in candidates), dtype=np.intp)
+        if not len(rows) or k <= 0:
+            return []
+        scores = self.matrix[rows] @ np.asarray(query, dtype=np.float32)
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.keys[rows[i]], float(scores[i])) for i in top]
+
+class OutcomeRetrievalIndex:
+    """Top-k PLO/MLO/CLO retrieval over every outcome in programmes.json
+
+    Outcomes are keyed by (kind, programme, course, code). When the data file
+    changes only new or edited texts are re-encoded and upserted; deleted
+    outcomes are removed.
+    """
+
+    def __init__(self, encoder, language: str = 'en', index_factory=BruteForceIndex,
+                 path: Optional[str] = None):
+        self.encoder = encoder
+        self.language = language
+        self.index_factory = index_factory
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self.index = index_factory()
+        self.outcomes: Dict[Tuple, object] = {}
+        self._version = None
+        self._space = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """Sync the index with programmes.json; returns True if anything changed"""
+        with self._lock:
+            version = programmes_version(self.path)
+            space = self.encoder.space
+            if version == self._version and space == self._space:
+                return False
+
+            if space != self._space:
+                # Vectors from different encoders are not comparable
+                self.index = self.index_factory()
+                self.outcomes = {}
+
+            current = {
+                (o.kind, o.programme, o.course, o.code): o
+                for o in iter_outcomes(self.language, self.path)
+            }
+            removed = [key for key in self.outcomes if key not in current]
+            changed = [key for key, o in current.items()
+                       if key not in self.outcomes or self.outcomes[key].text != o.text]
+
+            if removed:
+                self.index.remove(removed)
+            if changed:
+                self.index.upsert(changed, self.encoder.encode([current[key].text for key in changed]))
+
+            self.logger.info(f"Retrieval index refreshed: {len(changed)} encoded, {len(removed)} removed, {len(current)} total")
+            self.outcomes = current
+            self._version = version
+            self._space = space
+            return True
+
+    def _find(self, kind: str, programme: str, code: str, course: str = '') -> Tuple:
+        key = (kind, programme, course if kind == 'clo' else '', code)
+        if key not in self.outcomes:
+            where = f" in course '{course}'" if kind == 'clo' else ''
+            raise CurriculumLookupError(f"Unknown {kind.upper()} '{code}'{where} in programme '{programme}'")
+        return key
+
+    def top_k(self, programme: str, code: str, kind: str = 'plo', target: str = 'mlo',
+              k: int = 5, course: str = '', target_course: str = '') -> List[Dict]:
+        """Best-matching ``target`` outcomes of the same programme for one outcome"""
+        if kind not in OUTCOME_KINDS or target not in OUTCOME_KINDS:
+            raise ValueError(f"kind and target must be one of: {', '.join(OUTCOME_KINDS)}")
+
+        self.refresh()
+        with self._lock:
+            query_key = self._find(kind, programme, code, course)
+            pool = get_curriculum_store(self.path).programme_outcomes(programme, target, self.language, target_course)
+            candidates = [
+                key for key in ((o.kind, o.programme, o.course, o.code) for o in pool)
+                if key != query_key and key in self.outcomes
+            ]
+            query = self.index.matrix[self.index.rows[query_key]]
+            hits = self.index.search(query, k, candidates)
+
+            return [
+                {
+                    'kind': key[0],
+                    'code': key[3],
+                    'course': key[2],
+                    'module': self.outcomes[key].module,
+                    'text': self.outcomes[key].text,
+                    'score': round(score, 4)
+                }
+                for key, score in hits
+            ]
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+On-Demand Request Profiling
+Profile a single request with cProfile plus a stack sampler
+
+Disabled unless REQUEST_PROFILING is set. A request then opts in with the
+X-Profile header or a ?profile= query flag (and X-Profile-Token when
+REQUEST_PROFILING_TOKEN is set). The handler thread is profiled from
+before_request to after_request, and functions decorated with @profiled
+(the analyzers' alignment entry points) are profiled too when they run on an
+executor thread for that request. The JSON response gains a 'profile' key
+with the top functions by cumulative time; the merged pstats and a
+flamegraph-compatible collapsed-stack file are written to PROFILE_DIR.
+
+Work sent to a process pool (ANALYSIS_EXECUTOR=process) is not covered.
+"""
+
+import contextvars
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', 'false').lower() == 'true'
+REQUEST_PROFILING_TOKEN = os.environ.get('REQUEST_PROFILING_TOKEN', '')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.profiles'))
+PROFILE_TOP_N = int(os.environ.get('PROFILE_TOP_N', 25))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 1))
+
+logger = logging.getLogger(__name__)
+
+_session: contextvars.ContextVar[Optional['ProfileSession']] = contextvars.ContextVar('profile_session', default=None)
+
+class ProfileSession:
+    """cProfile data and sampled stacks of every thread working on one request"""
+
+    def __init__(self, sample_interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS):
+        self.id = uuid.uuid4().hex[:12]
+        self.interval = sample_interval_ms / 1000.0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.stacks: Counter = Counter()
+        self._profiles: List[cProfile.Profile] = []
+        self._threads: Dict[int, Optional[cProfile.Profile]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f'profile-sampler-{self.id}', daemon=True)
+        self._sampler.start()
+
+    def enter(self) -> bool:
+        """Start profiling the calling thread; False if it is already profiled"""
+        ident = threading.get_ident()
+        with self._lock:
+            if ident in self._threads or self._stopped.is_set():
+                return False
+            profile = cProfile.Profile()
+            self._threads[ident] = profile
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process; keep sampling this thread
+            self._threads[ident] = None
+        return True
+
+    def exit(self):
+        ident = threading.get_ident()
+        with self._lock:
+            if ident not in self._threads:
+                return
+            profile = self._threads.pop(ident)
+        if profile is not None:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def _sample(self):
+        """Record the current stack of each profiled thread every interval"""
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                idents = list(self._threads)
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.exit()
+        self._stopped.set()
+        self._sampler.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def stats(self) -> Optional[pstats.Stats]:
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def top_functions(self, n: int = PROFILE_TOP_N) -> List[Dict]:
+        """Functions by cumulative time, as JSON-friendly rows"""
+        stats = self.stats()
+        if stats is None:
+            return []
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:n]
+        return [
+            {
+                'function': f'{filename}:{line}({name})',
+                'calls': primitive_calls if primitive_calls == total_calls else f'{total_calls}/{primitive_calls}',
+                'total_time': round(total_time, 6),
+                'cumulative_time': round(cumulative_time, 6)
+            }
+            for (filename, line, name), (primitive_calls, total_calls, total_time, cumulative_time, _) in rows
+        ]
+
+    def collapsed(self) -> str:
+        """Sampled stacks in collapsed format (flamegraph.pl, speedscope)"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def save(self, directory: str = PROFILE_DIR) -> Dict[str, str]:
+        """Write <id>.prof (pstats) and <id>.collapsed; returns their paths"""
+        os.makedirs(directory, exist_ok=True)
+        paths = {'collapsed': os.path.join(directory, f'{self.id}.collapsed')}
+        with open(paths['collapsed'], 'w', encoding='utf-8') as f:
+            f.write(self.collapsed())
+        stats = self.stats()
+        if stats is not None:
+            paths['pstats'] = os.path.join(directory, f'{self.id}.prof')
+            stats.dump_stats(paths['pstats'])
+        return paths
+
+    def report(self, n: int = PROFILE_TOP_N) -> Dict:
+        report = {
+            'id': self.id,
+            'wall_time': round(self.elapsed, 6),
+            'samples': sum(self.stacks.values()),
+            'top_functions': self.top_functions(n)
+        }
+        try:
+            report['files'] = self.save()
+        except OSError as e:
+            logger.warning(f"Could not write profile {self.id}: {e}")
+        return report
+
+def profiled(fn):
+    """Profile fn as part of the active request profile, if any, on whichever thread runs it"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        session = _session.get()
+        if session is None or not session.enter():
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            session.exit()
+    return wrapper
+
+def install_profiling(app, enabled: bool = REQUEST_PROFILING, token: str = REQUEST_PROFILING_TOKEN):
+    """Per-request profiling hooks for a Flask app (no-op unless enabled)"""
+    if not enabled:
+        return app
+    from flask import g, request
+
+    def requested() -> bool:
+        flag = request.headers.get('X-Profile') or request.args.get('profile')
+        if not flag or flag.lower() in ('0', 'false', 'no'):
+            return False
+        return not token or request.headers.get('X-Profile-Token') == token
+
+    @app.before_request
+    def _start_profile():
+        if request.method != 'OPTIONS' and requested():
+            session = ProfileSession()
+            g._profile_session = session
+            g._profile_token = _session.set(session)
+            session.enter()
+
+    def finish() -> Optional[ProfileSession]:
+        session = g.pop('_profile_session', None)
+        if session is not None:
+            session.stop()
+            _session.reset(g.pop('_profile_token'))
+        return session
+
+    @app.after_request
+    def _attach_profile(response):
+        session = finish()
+        if session is None:
+            return response
+        report = session.report()
+        logger.info(f"Profiled {request.path} in {report['wall_time']}s: {report.get('files')}")
+
+        response.headers['X-Profile-Id'] = session.id
+        body = response.get_json(silent=True) if response.is_json and not response.is_streamed else None
+        if isinstance(body, dict):
+            body['profile'] = report
+            response.set_data(app.json.dumps(body))
+        return response
+
+    @app.teardown_request
+    def _discard_profile(exc):
+        finish()  # the handler raised before after_request ran
+
+    logger.warning("Request profiling is enabled (REQUEST_PROFILING=true)")
+    return app
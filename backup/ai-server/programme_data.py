@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Programme Data Access
+Loads programme, module and course learning outcomes from data/programmes.json
+
+Lookups go through a CurriculumStore: tuple-backed records with dict indexes
+by programme, module and course, built once per version of the data file.
+It is filled from the binary snapshot built by programme_snapshot.py when
+that matches the JSON file, and from the parsed JSON otherwise. load_programmes() always returns the parsed JSON.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Location of the curriculum data (override with PROGRAMMES_JSON when deployed standalone)
+DEFAULT_PROGRAMMES_PATH = Path(__file__).resolve().parents[2] / 'data' / 'programmes.json'
+PROGRAMMES_PATH = Path(os.environ.get('PROGRAMMES_JSON', DEFAULT_PROGRAMMES_PATH))
+
+LANGUAGES = ('en', 'et')
+
+# Outcome text fields per language
+PLO_TEXT_FIELDS = {'en': 'plosisuik', 'et': 'plosisuek'}
+MLO_TEXT_FIELDS = {'en': 'mlosisuik', 'et': 'mlosisuek'}
+CLO_FIELDS = {'en': 'cloik', 'et': 'cloek'}
+
+class Outcome(NamedTuple):
+    """A single learning outcome and where it sits in the curriculum"""
+    kind: str          # 'plo', 'mlo' or 'clo'
+    programme: str     # programme code, e.g. 'tvtb'
+    code: str          # plokood, mlokood or clo number ('clo1')
+    text: str
+    module: str = ''   # module code for MLOs and CLOs, e.g. 'e1'
+    course: str = ''   # ainekood for CLOs
+
+class Programme(NamedTuple):
+    code: str
+    name_en: str
+    name_et: str
+
+class Module(NamedTuple):
+    """A module, as named by the MLOs whose mlokood starts with its code"""
+    programme: str
+    code: str          # e.g. 'e1'
+    name_en: str
+    name_et: str
+
+class Course(NamedTuple):
+    programme: str
+    code: str          # ainekood
+    module: str        # moodulikood
+    name_en: str
+    name_et: str
+    fields: Tuple[Tuple[str, object], ...]  # the programmes.json record; CLO dicts as (key, text) pairs
+
+    def record(self) -> Dict:
+        """The course as it appears in programmes.json"""
+        return {key: dict(value) if isinstance(value, tuple) else value for key, value in self.fields}
+
+    @classmethod
+    def from_fields(cls, programme: str, fields: Tuple[Tuple[str, object], ...]) -> 'Course':
+        record = dict(fields)
+        return cls(programme, record.get('ainekood', ''), record.get('moodulikood', ''),
+                   record.get('ainenimetusik', ''), record.get('ainenimetusek', ''), fields)
+
+    @classmethod
+    def from_record(cls, programme: str, record: Dict) -> 'Course':
+        return cls.from_fields(programme, tuple((key, tuple(value.items()) if isinstance(value, dict) else value)
+                                                for key, value in record.items()))
+
+class CurriculumLookupError(LookupError):
+    """Raised when a programme, course or language is not in the data"""
+
+_cache_lock = threading.Lock()
+_cache: Dict[Path, tuple] = {}
+
+def load_programmes(path: Optional[str] = None) -> Dict:
+    """Load programmes.json, re-reading it only when the file changes"""
+    path = Path(path or PROGRAMMES_PATH)
+    stat = path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    with _cache_lock:
+        _cache[path] = (stamp, data)
+    return data
+
+def _snapshot(path: Optional[str] = None):
+    """Fresh binary snapshot of the data file, or None to read the JSON"""
+    from programme_snapshot import open_snapshot
+    return open_snapshot(path)
+
+def programmes_version(path: Optional[str] = None) -> Tuple[int, int]:
+    """Modification stamp of the data file, for caches built from it"""
+    stat = Path(path or PROGRAMMES_PATH).stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _check_language(language: str):
+    if language not in LANGUAGES:
+        raise CurriculumLookupError(f"Unknown language '{language}'. Use one of: {', '.join(LANGUAGES)}")
+
+def mlo_module(mlo_code: str) -> str:
+    """Module code an MLO belongs to ('e1_mlo3' -> 'e1')"""
+    return mlo_code.split('_', 1)[0]
+
+def _course_clos(programme: str, course: Dict, language: str) -> List[Outcome]:
+    field = CLO_FIELDS[language]
+    return [
+        Outcome('clo', programme, 'clo' + key[len(field):], text,
+                module=course.get('moodulikood', ''), course=course.get('ainekood', ''))
+        for key, text in (course.get(field) or {}).items()
+        if text
+    ]
+
+class CurriculumStore:
+    """Read-only curriculum model with O(1) lookups
+
+    Outcome lists are tuples of Outcome records in file order, indexed by
+    (programme, language), (programme, module, language) and
+    (programme, course, language). Course codes are matched case-insensitively.
+    """
+
+    __slots__ = ('programmes', '_plos', '_mlos', '_module_mlos', '_modules', '_courses',
+                 '_module_courses', '_course_index', '_clos', '_programme_clos', '_outcomes')
+
+    def __init__(self):
+        self.programmes: Dict[str, Programme] = {}
+        self._plos: Dict[Tuple[str, str], Tuple[Outcome, ...]] = {}
+        self._mlos: Dict[Tuple[str, str], Tuple[Outcome, ...]] = {}
+        self._module_mlos: Dict[Tuple[str, str, str], Tuple[Outcome, ...]] = {}
+        self._modules: Dict[str, Tuple[Module, ...]] = {}
+        self._courses: Dict[str, Tuple[Course, ...]] = {}
+        self._module_courses: Dict[Tuple[str, str], Tuple[Course, ...]] = {}
+        self._course_index: Dict[Tuple[str, str], Course] = {}
+        self._clos: Dict[Tuple[str, str, str], Tuple[Outcome, ...]] = {}
+        self._programme_clos: Dict[Tuple[str, str], Tuple[Outcome, ...]] = {}
+        self._outcomes: Dict[str, Tuple[Outcome, ...]] = {language: () for language in LANGUAGES}
+
+    @classmethod
+    def from_programmes(cls, data: Dict) -> 'CurriculumStore':
+        """Store over parsed programmes.json"""
+        store = cls()
+        for code, programme in data.items():
+            plos, mlos, clos = {}, {}, {}
+            for language in LANGUAGES:
+                plo_field, mlo_field = PLO_TEXT_FIELDS[language], MLO_TEXT_FIELDS[language]
+                plos[language] = [Outcome('plo', code, plo['plokood'], plo[plo_field])
+                                  for plo in programme.get('plos', []) if plo.get(plo_field)]
+                mlos[language] = [Outcome('mlo', code, mlo['mlokood'], mlo[mlo_field], module=mlo_module(mlo['mlokood']))
+                                  for mlo in programme.get('mlos', []) if mlo.get(mlo_field)]
+            modules = {}
+            for mlo in programme.get('mlos', []):
+                module = mlo_module(mlo['mlokood'])
+                if module not in modules:
+                    modules[module] = Module(code, module, mlo.get('mlonimetusik', ''), mlo.get('mlonimetusek', ''))
+            courses = []
+            for record in programme.get('courses', []):
+                courses.append((Course.from_record(code, record),
+                                {language: _course_clos(code, record, language) for language in LANGUAGES}))
+            store._add(Programme(code, programme.get('kavanimetusik', ''), programme.get('kavanimetusek', '')),
+                       plos, mlos, list(modules.values()), courses)
+        return store
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> 'CurriculumStore':
+        """Store over a programme_snapshot.ProgrammeSnapshot"""
+        store = cls()
+        snapshot.decode_all()
+        for code in snapshot.programme_codes():
+            plos = {language: snapshot.outcomes(code, language, 'plo') for language in LANGUAGES}
+            mlos = {language: snapshot.outcomes(code, language, 'mlo') for language in LANGUAGES}
+            modules = [Module(code, *names) for names in snapshot.modules(code)]
+            courses = [
+                (Course.from_fields(code, snapshot.course_fields(i)),
+                 {language: snapshot.course_clos(i, language) for language in LANGUAGES})
+                for i in snapshot.course_ids(code)
+            ]
+            store._add(Programme(code, *snapshot.programme_names(code)), plos, mlos, modules, courses)
+        return store
+
+    def _add(self, programme: Programme, plos: Dict[str, List[Outcome]], mlos: Dict[str, List[Outcome]],
+             modules: List[Module], courses: List[Tuple[Course, Dict[str, List[Outcome]]]]):
+        code = programme.code
+        self.programmes[code] = programme
+        self._modules[code] = tuple(modules)
+        self._courses[code] = tuple(course for course, _ in courses)
+
+        module_courses: Dict[str, List[Course]] = {}
+        for course, clos in courses:
+            module_courses.setdefault(course.module, []).append(course)
+            self._course_index.setdefault((code, course.code.lower()), course)
+            for language in LANGUAGES:
+                self._clos.setdefault((code, course.code.lower(), language), tuple(clos[language]))
+        for module, members in module_courses.items():
+            self._module_courses[(code, module)] = tuple(members)
+
+        for language in LANGUAGES:
+            self._plos[(code, language)] = tuple(plos[language])
+            self._mlos[(code, language)] = tuple(mlos[language])
+            module_mlos: Dict[str, List[Outcome]] = {}
+            for mlo in mlos[language]:
+                module_mlos.setdefault(mlo.module, []).append(mlo)
+            for module, members in module_mlos.items():
+                self._module_mlos[(code, module, language)] = tuple(members)
+            self._programme_clos[(code, language)] = tuple(clo for _, clos in courses for clo in clos[language])
+            self._outcomes[language] += (self._plos[(code, language)] + self._mlos[(code, language)]
+                                         + self._programme_clos[(code, language)])
+
+    def _check_programme(self, programme: str):
+        if programme not in self.programmes:
+            raise CurriculumLookupError(f"Unknown programme '{programme}'. Available: {', '.join(self.programmes)}")
+
+    def programme_codes(self) -> List[str]:
+        return list(self.programmes)
+
+    def plos(self, programme: str, language: str = 'en') -> Tuple[Outcome, ...]:
+        _check_language(language)
+        self._check_programme(programme)
+        return self._plos[(programme, language)]
+
+    def mlos(self, programme: str, language: str = 'en', module: Optional[str] = None) -> Tuple[Outcome, ...]:
+        _check_language(language)
+        self._check_programme(programme)
+        if module:
+            return self._module_mlos.get((programme, module, language), ())
+        return self._mlos[(programme, language)]
+
+    def modules(self, programme: str) -> Tuple[Module, ...]:
+        self._check_programme(programme)
+        return self._modules[programme]
+
+    def courses(self, programme: str, module: Optional[str] = None) -> Tuple[Course, ...]:
+        """Courses of a programme, optionally only those of one moodulikood"""
+        self._check_programme(programme)
+        if module:
+            return self._module_courses.get((programme, module), ())
+        return self._courses[programme]
+
+    def course(self, programme: str, course_code: str) -> Course:
+        self._check_programme(programme)
+        course = self._course_index.get((programme, course_code.lower()))
+        if course is None:
+            raise CurriculumLookupError(f"Unknown course '{course_code}' in programme '{programme}'")
+        return course
+
+    def clos(self, programme: str, course_code: str, language: str = 'en') -> Tuple[Outcome, ...]:
+        _check_language(language)
+        course = self.course(programme, course_code)
+        return self._clos[(programme, course.code.lower(), language)]
+
+    def programme_outcomes(self, programme: str, kind: str, language: str = 'en',
+                           course: Optional[str] = None) -> Tuple[Outcome, ...]:
+        """PLOs, MLOs or CLOs of a programme; CLOs optionally of one course"""
+        if kind == 'plo':
+            return self.plos(programme, language)
+        if kind == 'mlo':
+            return self.mlos(programme, language)
+        if kind != 'clo':
+            raise CurriculumLookupError(f"Unknown outcome kind '{kind}'")
+        if course:
+            return self.clos(programme, course, language)
+        _check_language(language)
+        self._check_programme(programme)
+        return self._programme_clos[(programme, language)]
+
+    def outcomes(self, language: str = 'en') -> Tuple[Outcome, ...]:
+        """Every PLO, MLO and CLO of every programme"""
+        _check_language(language)
+        return self._outcomes[language]
+
+    def stats(self) -> Dict:
+        return {
+            'programmes': len(self.programmes),
+            'modules': sum(len(modules) for modules in self._modules.values()),
+            'courses': len(self._course_index),
+            'outcomes': {language: len(outcomes) for language, outcomes in self._outcomes.items()}
+        }
+
+# Store per data file, with the snapshot or parsed JSON it was built from
+_stores: Dict[Path, Tuple[object, CurriculumStore]] = {}
+_stores_lock = threading.Lock()
+
+def get_curriculum_store(path: Optional[str] = None) -> CurriculumStore:
+    """Curriculum store for the data file, rebuilt when the file changes"""
+    snapshot = _snapshot(path)
+    source = snapshot if snapshot is not None else load_programmes(path)
+    key = Path(path or PROGRAMMES_PATH)
+    cached = _stores.get(key)
+    if cached and cached[0] is source:
+        return cached[1]
+
+    with _stores_lock:
+        cached = _stores.get(key)
+        if cached and cached[0] is source:
+            return cached[1]
+        store = CurriculumStore.from_snapshot(snapshot) if snapshot is not None else CurriculumStore.from_programmes(source)
+        _stores[key] = (source, store)
+        return store
+
+def preload_programmes(path: Optional[str] = None) -> str:
+    """Build the curriculum store before workers fork; returns the source used"""
+    try:
+        get_curriculum_store(path)
+    except OSError:
+        return 'missing'
+    return 'snapshot' if _snapshot(path) is not None else 'json'
+
+def programme_codes(path: Optional[str] = None) -> List[str]:
+    """Codes of all programmes in the data file"""
+    return get_curriculum_store(path).programme_codes()
+
+def get_plos(programme: str, language: str = 'en', path: Optional[str] = None) -> List[Outcome]:
+    """Programme learning outcomes in file order"""
+    return list(get_curriculum_store(path).plos(programme, language))
+
+def get_mlos(programme: str, language: str = 'en', module: Optional[str] = None,
+             path: Optional[str] = None) -> List[Outcome]:
+    """Module learning outcomes, optionally limited to one module"""
+    return list(get_curriculum_store(path).mlos(programme, language, module))
+
+def get_course(programme: str, course_code: str, path: Optional[str] = None) -> Dict:
+    """Raw course record by ainekood"""
+    return get_curriculum_store(path).course(programme, course_code).record()
+
+def get_clos(programme: str, course_code: str, language: str = 'en',
+             path: Optional[str] = None) -> List[Outcome]:
+    """Course learning outcomes of one course"""
+    return list(get_curriculum_store(path).clos(programme, course_code, language))
+
+def iter_outcomes(language: str = 'en', path: Optional[str] = None) -> Iterator[Outcome]:
+    """Every PLO, MLO and CLO of every programme"""
+    yield from get_curriculum_store(path).outcomes(language)
+
+def iter_tokenized_outcomes(language: str = 'en', path: Optional[str] = None) -> Iterator[Tuple[Outcome, List[str]]]:
+    """iter_outcomes() with each text split by programme_snapshot.tokenize"""
+    from programme_snapshot import tokenize
+    for outcome in iter_outcomes(language, path):
+        yield outcome, tokenize(outcome.text)
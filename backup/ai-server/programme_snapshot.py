@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Programme Data Snapshot
+Compact binary form of data/programmes.json that servers read at startup
+
+The build step interns every string once (outcome texts repeat across PLOs,
+MLOs and CLOs and between programmes) and stores programmes, modules,
+courses and outcomes as flat tables of integer ids, so the file is smaller
+than the JSON and opening it parses no JSON. The integer tables are read in
+place from a read-only memory map; the string table is decoded in one pass
+when the snapshot is opened. The CurriculumStore built from it holds
+ordinary Python objects, so build it before workers fork
+(programme_data.preload_programmes) for them to share it.
+
+The snapshot records the size, mtime and content hash of the JSON it was
+built from. programme_data reads the JSON instead whenever they no longer
+match, so a stale snapshot is never served.
+
+Usage: python programme_snapshot.py [--source data/programmes.json] [--output data/programmes.snapshot]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from programme_data import (CLO_FIELDS, LANGUAGES, MLO_TEXT_FIELDS, PLO_TEXT_FIELDS, PROGRAMMES_PATH,
+                            Outcome, mlo_module)
+
+# Next to the JSON it is built from (override with PROGRAMMES_SNAPSHOT when deployed standalone)
+DEFAULT_SNAPSHOT_PATH = PROGRAMMES_PATH.with_suffix('.snapshot')
+SNAPSHOT_PATH = Path(os.environ.get('PROGRAMMES_SNAPSHOT', DEFAULT_SNAPSHOT_PATH))
+
+MAGIC = b'PROGSNAP'
+FORMAT_VERSION = 3
+BYTE_ORDER_MARK = 0x01020304  # read back differently on a machine with the other byte order
+NO_VALUE = 0xFFFFFFFF         # course field holding a CLO dict rather than a string
+
+KINDS = ('plo', 'mlo', 'clo')
+
+# Table row widths (uint32 columns)
+PROGRAMME_COLUMNS = 3 + 2 * len(LANGUAGES) * len(KINDS) + 4  # code, names, outcome ranges, module and course ranges
+MODULE_COLUMNS = 4    # programme, code, name en, name et
+COURSE_COLUMNS = 2 + 2 * len(LANGUAGES)  # field range, CLO range per language (codes are fields)
+FIELD_COLUMNS = 2     # key, value
+OUTCOME_COLUMNS = 6   # kind, programme, code, text, module, course
+
+# Course row column where the CLO range of a CLO dict field starts
+CLO_COLUMNS = {CLO_FIELDS[language]: 2 + 2 * i for i, language in enumerate(LANGUAGES)}
+
+SECTIONS = ('strings', 'programmes', 'modules', 'courses', 'course_fields', 'outcomes')
+
+# magic, version, byte order mark, source mtime_ns, source size, source hash, then (offset, length) per section
+HEADER = struct.Struct(f'=8sIIqq16s{2 * len(SECTIONS)}Q')
+
+_TOKEN = re.compile(r'\w{3,}')
+
+logger = logging.getLogger(__name__)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words of three or more characters (the corpus index default)"""
+    return _TOKEN.findall(text.lower())
+
+def source_hash(path: Path) -> bytes:
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).digest()
+
+def snapshot_path(source: Optional[str] = None) -> Path:
+    """Snapshot file for a programmes JSON file"""
+    source = Path(source or PROGRAMMES_PATH)
+    return SNAPSHOT_PATH if source == PROGRAMMES_PATH else source.with_suffix('.snapshot')
+
+class SnapshotError(ValueError):
+    """The snapshot file is missing parts, corrupt or from another format version"""
+
+class _Builder:
+    """Interned strings and flat tables for one programmes.json"""
+
+    def __init__(self):
+        self.string_ids: Dict[str, int] = {}
+        self.tables = {name: array('I') for name in SECTIONS if name != 'strings'}
+
+    def sid(self, value: str) -> int:
+        if not isinstance(value, str) or '\0' in value:
+            raise SnapshotError(f"Cannot store {type(value).__name__} value {value!r:.40}")
+        return self.string_ids.setdefault(value, len(self.string_ids))
+
+    def outcome(self, kind: str, programme: int, code: str, text: str, module: str = '', course: str = ''):
+        self.tables['outcomes'].extend((KINDS.index(kind), programme, self.sid(code), self.sid(text),
+                                        self.sid(module), self.sid(course)))
+
+    def n_outcomes(self) -> int:
+        return len(self.tables['outcomes']) // OUTCOME_COLUMNS
+
+    def add_programme(self, index: int, code: str, programme: Dict):
+        courses = programme.get('courses', [])
+        ranges = []
+
+        # Outcomes in iter_outcomes order: per language, PLOs, then MLOs, then CLOs course by course
+        for language in LANGUAGES:
+            start = self.n_outcomes()
+            for plo in programme.get('plos', []):
+                if plo.get(PLO_TEXT_FIELDS[language]):
+                    self.outcome('plo', index, plo['plokood'], plo[PLO_TEXT_FIELDS[language]])
+            ranges += [start, self.n_outcomes()]
+
+            start = self.n_outcomes()
+            for mlo in programme.get('mlos', []):
+                if mlo.get(MLO_TEXT_FIELDS[language]):
+                    self.outcome('mlo', index, mlo['mlokood'], mlo[MLO_TEXT_FIELDS[language]],
+                                 module=mlo_module(mlo['mlokood']))
+            ranges += [start, self.n_outcomes()]
+
+            start = self.n_outcomes()
+            for course in courses:
+                field = CLO_FIELDS[language]
+                for key, text in (course.get(field) or {}).items():
+                    if text:
+                        self.outcome('clo', index, 'clo' + key[len(field):], text,
+                                     module=course.get('moodulikood', ''), course=course.get('ainekood', ''))
+            ranges += [start, self.n_outcomes()]
+
+        modules = self.tables['modules']
+        module_start = len(modules) // MODULE_COLUMNS
+        seen = set()
+        for mlo in programme.get('mlos', []):
+            module = mlo_module(mlo['mlokood'])
+            if module not in seen:
+                seen.add(module)
+                modules.extend((index, self.sid(module), self.sid(mlo.get('mlonimetusik', '')),
+                                self.sid(mlo.get('mlonimetusek', ''))))
+        ranges += [module_start, len(modules) // MODULE_COLUMNS]
+
+        course_table, fields = self.tables['courses'], self.tables['course_fields']
+        course_start = len(course_table) // COURSE_COLUMNS
+        clo_counts = {language: ranges[language_index * 6 + 4] for language_index, language in enumerate(LANGUAGES)}
+        for course in courses:
+            field_start = len(fields) // FIELD_COLUMNS
+            for key, value in course.items():
+                fields.extend((self.sid(key), NO_VALUE if isinstance(value, dict) else self.sid(value)))
+            row = [field_start, len(fields) // FIELD_COLUMNS]
+            for language in LANGUAGES:
+                count = sum(1 for text in (course.get(CLO_FIELDS[language]) or {}).values() if text)
+                row += [clo_counts[language], clo_counts[language] + count]
+                clo_counts[language] += count
+            course_table.extend(row)
+        ranges += [course_start, len(course_table) // COURSE_COLUMNS]
+
+        self.tables['programmes'].extend([self.sid(code), self.sid(programme.get('kavanimetusik', '')),
+                                          self.sid(programme.get('kavanimetusek', ''))] + ranges)
+
+    def sections(self) -> Dict[str, bytes]:
+        # NUL-terminated in id order, so opening splits the whole table in one call
+        sections = {'strings': b''.join(value.encode('utf-8') + b'\0' for value in self.string_ids)}
+        sections.update((name, table.tobytes()) for name, table in self.tables.items())
+        return sections
+
+def build_snapshot(source: Optional[str] = None, output: Optional[str] = None) -> Path:
+    """Write the snapshot for a programmes JSON file; returns its path"""
+    source = Path(source or PROGRAMMES_PATH)
+    output = Path(output) if output else snapshot_path(source)
+    stat = source.stat()
+    with open(source, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw)
+
+    builder = _Builder()
+    builder.sid('')
+    for index, (code, programme) in enumerate(data.items()):
+        builder.add_programme(index, code, programme)
+    sections = builder.sections()
+
+    # Sections start on 8-byte boundaries after the header
+    layout, position = [], HEADER.size
+    for name in SECTIONS:
+        position += -position % 8
+        layout += [position, len(sections[name])]
+        position += len(sections[name])
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER_MARK, stat.st_mtime_ns, stat.st_size,
+                         hashlib.blake2b(raw, digest_size=16).digest(), *layout)
+
+    # Write next to the target and rename, so mapped readers keep the old file
+    temporary = output.with_name(f'.{output.name}.{os.getpid()}.tmp')
+    with open(temporary, 'wb') as f:
+        f.write(header)
+        for name in SECTIONS:
+            f.write(b'\0' * (-f.tell() % 8))
+            f.write(sections[name])
+    os.replace(temporary, output)
+    return output
+
+class ProgrammeSnapshot:
+    """Read-only view of a snapshot file, answering programme_data queries"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except (SnapshotError, struct.error, UnicodeDecodeError) as e:
+            self.close()
+            raise SnapshotError(f"Unreadable snapshot {self.path}: {e}") from e
+
+    def _open(self):
+        # Validate through the mmap itself first: a failed open must leave no views to release
+        if len(self._mmap) < HEADER.size:
+            raise SnapshotError("file is truncated")
+        magic, version, byte_order, mtime_ns, size, digest, *layout = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != FORMAT_VERSION or byte_order != BYTE_ORDER_MARK:
+            raise SnapshotError(f"unsupported format (version {version})")
+        for name, offset, length in zip(SECTIONS, layout[::2], layout[1::2]):
+            if offset + length > len(self._mmap) or (name != 'strings' and length % 4):
+                raise SnapshotError(f"section '{name}' is truncated")
+        self.source_stamp: Tuple[int, int] = (mtime_ns, size)
+        self.source_hash: bytes = digest
+        offset, length = layout[0], layout[1]  # 'strings'
+        self._strings: List[str] = str(self._mmap[offset:offset + length], 'utf-8').split('\0')[:-1]
+
+        buffer = memoryview(self._mmap)
+        sections = {name: buffer[offset:offset + length]
+                    for name, offset, length in zip(SECTIONS[1:], layout[2::2], layout[3::2])}
+        buffer.release()
+        tables = {name: section.cast('I') for name, section in sections.items()}
+        self._programmes = tables['programmes']
+        self._modules = tables['modules']
+        self._courses = tables['courses']
+        self._fields = tables['course_fields']
+        self._outcomes = tables['outcomes']
+        self._decoded_outcomes: List[Optional[Outcome]] = [None] * (len(self._outcomes) // OUTCOME_COLUMNS)
+
+        self.programme_ids: Dict[str, int] = {
+            self.string(self._programmes[i * PROGRAMME_COLUMNS]): i
+            for i in range(len(self._programmes) // PROGRAMME_COLUMNS)
+        }
+
+    def close(self):
+        # Views into the map must go first; callers may still hold decoded strings
+        for name in ('_programmes', '_modules', '_courses', '_fields', '_outcomes'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+
+    def string(self, sid: int) -> str:
+        return self._strings[sid]
+
+    def decode_all(self):
+        """Build every Outcome record in bulk, ahead of reading most of the file"""
+        strings, table = self._strings, self._outcomes.tolist()
+        programmes = [strings[self._programmes[i]] for i in range(0, len(self._programmes), PROGRAMME_COLUMNS)]
+        self._decoded_outcomes = [
+            Outcome(KINDS[table[base]], programmes[table[base + 1]], strings[table[base + 2]],
+                    strings[table[base + 3]], strings[table[base + 4]], strings[table[base + 5]])
+            for base in range(0, len(table), OUTCOME_COLUMNS)
+        ]
+
+    def _row(self, table: memoryview, width: int, index: int) -> memoryview:
+        return table[index * width:(index + 1) * width]
+
+    def outcome(self, index: int) -> Outcome:
+        outcome = self._decoded_outcomes[index]
+        if outcome is None:
+            base, table, string = index * OUTCOME_COLUMNS, self._outcomes, self.string
+            outcome = self._decoded_outcomes[index] = Outcome(
+                KINDS[table[base]], string(self._programmes[table[base + 1] * PROGRAMME_COLUMNS]),
+                string(table[base + 2]), string(table[base + 3]), string(table[base + 4]), string(table[base + 5])
+            )
+        return outcome
+
+    def programme_codes(self) -> List[str]:
+        return list(self.programme_ids)
+
+    def programme_names(self, programme: str) -> Tuple[str, str]:
+        """English and Estonian programme name"""
+        row = self._row(self._programmes, PROGRAMME_COLUMNS, self.programme_ids[programme])
+        return self.string(row[1]), self.string(row[2])
+
+    def outcome_range(self, programme: str, language: str, kind: str) -> range:
+        """Outcome ids of one kind and language of a programme (KeyError if unknown)"""
+        column = 3 + (LANGUAGES.index(language) * len(KINDS) + KINDS.index(kind)) * 2
+        row = self._row(self._programmes, PROGRAMME_COLUMNS, self.programme_ids[programme])
+        return range(row[column], row[column + 1])
+
+    def _outcome_slice(self, start: int, stop: int) -> List[Outcome]:
+        outcomes = self._decoded_outcomes[start:stop]
+        if None in outcomes:
+            outcomes = [self.outcome(i) for i in range(start, stop)]
+        return outcomes
+
+    def outcomes(self, programme: str, language: str, kind: str) -> List[Outcome]:
+        outcomes = self.outcome_range(programme, language, kind)
+        return self._outcome_slice(outcomes.start, outcomes.stop)
+
+    def language_range(self, programme: str, language: str) -> range:
+        return range(self.outcome_range(programme, language, KINDS[0]).start,
+                     self.outcome_range(programme, language, KINDS[-1]).stop)
+
+    def modules(self, programme: str) -> List[Tuple[str, str, str]]:
+        """(code, English name, Estonian name) of each module with MLOs"""
+        row = self._row(self._programmes, PROGRAMME_COLUMNS, self.programme_ids[programme])
+        start, stop = row[-4], row[-3]
+        return [tuple(self.string(sid) for sid in self._row(self._modules, MODULE_COLUMNS, i)[1:])
+                for i in range(start, stop)]
+
+    def course_ids(self, programme: str) -> range:
+        row = self._row(self._programmes, PROGRAMME_COLUMNS, self.programme_ids[programme])
+        return range(row[-2], row[-1])
+
+    def course_fields(self, index: int) -> Tuple[Tuple[str, object], ...]:
+        """(key, value) pairs of the course record in programmes.json; CLO dicts as (key, text) pairs"""
+        row = self._row(self._courses, COURSE_COLUMNS, index).tolist()
+        fields = self._fields[row[0] * FIELD_COLUMNS:row[1] * FIELD_COLUMNS].tolist()
+        strings, record = self._strings, []
+        for key, value in zip(fields[::2], fields[1::2]):
+            key = strings[key]
+            if value != NO_VALUE:
+                record.append((key, strings[value]))
+            else:
+                column = CLO_COLUMNS.get(key)
+                outcomes = self._outcome_slice(row[column], row[column + 1]) if column is not None else []
+                record.append((key, tuple((key + outcome.code[3:], outcome.text) for outcome in outcomes)))
+        return tuple(record)
+
+    def course_clos(self, index: int, language: str) -> List[Outcome]:
+        row = self._row(self._courses, COURSE_COLUMNS, index)
+        column = 2 + 2 * LANGUAGES.index(language)
+        return self._outcome_slice(row[column], row[column + 1])
+
+    def iter_outcomes(self, language: str) -> Iterator[Outcome]:
+        for programme in self.programme_ids:
+            for i in self.language_range(programme, language):
+                yield self.outcome(i)
+
+    def stats(self) -> Dict:
+        return {
+            'path': str(self.path),
+            'bytes': len(self._mmap),
+            'strings': len(self._strings),
+            'programmes': len(self.programme_ids),
+            'modules': len(self._modules) // MODULE_COLUMNS,
+            'courses': len(self._courses) // COURSE_COLUMNS,
+            'outcomes': len(self._outcomes) // OUTCOME_COLUMNS
+        }
+
+# Open snapshots per source JSON: (JSON stamp, snapshot stamp, snapshot or None)
+_snapshots: Dict[Path, Tuple[Tuple[int, int], Tuple[int, int], Optional[ProgrammeSnapshot]]] = {}
+_snapshots_lock = threading.Lock()
+
+def _stamp(path: Path) -> Tuple[int, int]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return (0, 0)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def open_snapshot(source: Optional[str] = None) -> Optional[ProgrammeSnapshot]:
+    """The snapshot for a programmes JSON file, or None when it is missing or stale
+
+    Checked on every call with two stat()s; the JSON is hashed only when its
+    mtime no longer matches the one recorded at build time (e.g. after a
+    fresh checkout).
+    """
+    source = Path(source or PROGRAMMES_PATH)
+    path = snapshot_path(source)
+    source_stamp, stamp = _stamp(source), _stamp(path)
+    cached = _snapshots.get(source)
+    if cached and cached[0] == source_stamp and cached[1] == stamp:
+        return cached[2]
+
+    with _snapshots_lock:
+        cached = _snapshots.get(source)
+        if cached and cached[0] == source_stamp and cached[1] == stamp:
+            return cached[2]
+        # A touched JSON file keeps the mapped snapshot if its content still matches
+        snapshot = cached[2] if cached and cached[1] == stamp else None
+        if snapshot is None and stamp != (0, 0):
+            try:
+                snapshot = ProgrammeSnapshot(path)
+            except (OSError, SnapshotError) as e:
+                logger.warning(f"Ignoring programme snapshot: {e}")
+        if snapshot is not None and source_stamp != (0, 0) and snapshot.source_stamp != source_stamp:
+            try:
+                fresh = snapshot.source_hash == source_hash(source)
+            except OSError:
+                fresh = False
+            if not fresh:
+                logger.warning(f"Programme snapshot {path} is stale, reading {source} "
+                               f"(rebuild with: python programme_snapshot.py)")
+                snapshot = None
+        _snapshots[source] = (source_stamp, stamp, snapshot)
+        # Superseded snapshots are not closed: callers may still be reading them
+        return snapshot
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the binary snapshot of programmes.json')
+    parser.add_argument('--source', default=str(PROGRAMMES_PATH), help='programmes.json to read')
+    parser.add_argument('--output', help='Snapshot file (default: PROGRAMMES_SNAPSHOT or next to the source)')
+    args = parser.parse_args()
+
+    path = build_snapshot(args.source, args.output)
+    snapshot = ProgrammeSnapshot(path)
+    stats = snapshot.stats()
+    snapshot.close()
+    stats['source_bytes'] = os.path.getsize(args.source)
+    print(json.dumps(stats, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -4,23 +4,70 @@ Advanced Semantic Analysis for Learning Outcomes
 Uses sentence transformers for true semantic understanding
 """
 
+import os
 import re
 import logging
+from abc import ABC, abstractmethod
+import threading
+import time
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from enum import Enum
 import json
+import numpy as np
 
 # Try to import advanced NLP libraries
 try:
     from sentence_transformers import SentenceTransformer
-    import numpy as np
     from sklearn.metrics.pairwise import cosine_similarity
     ADVANCED_NLP_AVAILABLE = True
 except ImportError:
     ADVANCED_NLP_AVAILABLE = False
     print("Advanced NLP libraries not available. Install with: pip install sentence-transformers scikit-learn")
 
+# Quantized ONNX embedding backend: onnxruntime + tokenizers, no torch
+try:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+from async_runtime import get_runtime, offload, offload_thread
+from metrics import timed
+from profiling import profiled
+from domain_terms import get_domain_matcher
+
+# Coalesces concurrent encode calls into one model batch (needs NumPy)
+try:
+    from embedding_batcher import EMBEDDING_BATCH_WINDOW_MS, EmbeddingBatcher
+    EMBEDDING_BATCHER_AVAILABLE = True
+except ImportError:
+    EMBEDDING_BATCHER_AVAILABLE = False
+
+# Persistent embedding cache (needs NumPy)
+try:
+    from embedding_store import EmbeddingStore
+    EMBEDDING_STORE_AVAILABLE = True
+except ImportError:
+    EMBEDDING_STORE_AVAILABLE = False
+
+EMBEDDING_MODEL_NAME = os.environ.get('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+
+# Embedding backend: 'sentence-transformers' or 'onnx' (exported, int8-quantized model)
+EMBEDDING_BACKEND = os.environ.get('EMBEDDING_BACKEND', 'sentence-transformers')
+EMBEDDING_ONNX_DIR = os.environ.get('EMBEDDING_ONNX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', EMBEDDING_MODEL_NAME + '-onnx'))
+EMBEDDING_ONNX_THREADS = int(os.environ.get('EMBEDDING_ONNX_THREADS', 0))  # 0 = onnxruntime default
+EMBEDDING_MAX_TOKENS = 256  # all-MiniLM-L6-v2 max_seq_length
+
+# Texts per model.encode call when encoding in batches
+EMBEDDING_BATCH_SIZE = int(os.environ.get('EMBEDDING_BATCH_SIZE', 64))
+
+# Embedding cache location and precision; set EMBEDDING_CACHE_DIR to '' to disable
+EMBEDDING_CACHE_DIR = os.environ.get('EMBEDDING_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.embedding_cache'))
+EMBEDDING_CACHE_DTYPE = os.environ.get('EMBEDDING_CACHE_DTYPE', 'float16')
+
 @dataclass
 class SemanticAnalysisResult:
     """Result of semantic analysis between two learning outcomes"""
@@ -33,6 +80,8 @@ class SemanticAnalysisResult:
     suggestions: List[str]      # Improvement suggestions
     key_concepts: List[str]     # Identified concepts
     missing_concepts: List[str] # Concepts in PLO but not MLO
+    engine: str = 'keyword'     # Similarity engine used: 'embedding' or 'keyword'
+    domain_terms: Tuple[str, ...] = ()  # Weighted domain terms shared by both outcomes
 
 class BloomLevel(Enum):
     """Bloom's Taxonomy cognitive levels"""
@@ -62,27 +111,224 @@ class EducationalConcept:
     synonyms: List[str]
     related_concepts: List[str]
 
+class EmbeddingBackend(ABC):
+    """Turns texts into sentence embeddings (rows need not be normalized)"""
+    
+    name = 'base'
+    
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32) -> 'np.ndarray':
+        """One embedding row per text"""
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Full-precision sentence-transformers model on torch"""
+    
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.name = model_name
+    
+    def encode(self, texts: List[str], batch_size: int = 32) -> 'np.ndarray':
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """Exported transformer run by onnxruntime on CPU, with mean pooling
+    
+    The directory holds tokenizer.json and model_quantized.onnx (or
+    model.onnx). Export and quantize all-MiniLM-L6-v2 with:
+    
+        optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 DIR
+        optimum-cli onnxruntime quantize --avx2 --onnx_model DIR -o DIR
+    """
+    
+    MODEL_FILES = ('model_quantized.onnx', 'model.onnx')
+    
+    def __init__(self, model_dir: str = EMBEDDING_ONNX_DIR, threads: int = EMBEDDING_ONNX_THREADS):
+        model_path = next((os.path.join(model_dir, f) for f in self.MODEL_FILES
+                           if os.path.exists(os.path.join(model_dir, f))), None)
+        if model_path is None:
+            raise FileNotFoundError(f"No {' or '.join(self.MODEL_FILES)} in {model_dir}")
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=EMBEDDING_MAX_TOKENS)
+        self.tokenizer.enable_padding()
+        
+        # Distinct cache namespace: quantized vectors differ from the torch ones
+        self.name = f"{os.path.basename(os.path.normpath(model_dir))}.{os.path.splitext(os.path.basename(model_path))[0]}"
+    
+    def encode(self, texts: List[str], batch_size: int = 32) -> 'np.ndarray':
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if 'token_type_ids' in self.input_names:
+                feeds['token_type_ids'] = np.zeros_like(input_ids)
+            
+            token_embeddings = self.session.run(None, feeds)[0]
+            mask = attention_mask[..., None].astype(np.float32)
+            batches.append((token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9))
+        return np.vstack(batches)
+
+EMBEDDING_BACKENDS = {
+    'sentence-transformers': (lambda: ADVANCED_NLP_AVAILABLE, SentenceTransformerBackend),
+    'onnx': (lambda: ONNX_AVAILABLE, OnnxEmbeddingBackend)
+}
+
+def create_embedding_backend(name: str = EMBEDDING_BACKEND) -> Optional[EmbeddingBackend]:
+    """Instantiate a backend by name; None when its libraries are missing"""
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'. Use one of: {', '.join(EMBEDDING_BACKENDS)}")
+    available, backend_class = EMBEDDING_BACKENDS[name]
+    return backend_class() if available() else None
+
+class ConceptTokenIndex:
+    """Token index over concept names and synonyms for _extract_educational_concepts
+    
+    Normalized text is single-space separated words, so a pattern without
+    spaces occurs in it exactly when it occurs inside one word, and a
+    multi-word pattern occurs when its first part ends one word, its middle
+    parts equal the next words and its last part starts the word after.
+    Per-word lookups are cached, so extraction cost grows with the number of
+    tokens in the text rather than with the size of the knowledge base.
+    """
+    
+    WORD_CACHE_SIZE = 8192
+    
+    def __init__(self, concepts: Dict[str, 'EducationalConcept']):
+        self.names = list(concepts)
+        self.always: Dict[int, float] = {}       # empty patterns match any text
+        self.tokens: Dict[str, list] = {}        # one-word pattern -> [(concept id, confidence)]
+        self.phrases: Dict[str, list] = {}       # first part -> [(concept id, confidence, remaining parts)]
+        self.name_parts: Dict[str, set] = {}     # every substring of a name -> concept ids
+        self.synonym_parts: Dict[str, set] = {}  # every substring of a synonym -> concept ids
+        
+        for concept_id, (name, concept) in enumerate(concepts.items()):
+            for pattern, confidence in [(name, 1.0)] + [(synonym, 0.8) for synonym in concept.synonyms]:
+                if not pattern:
+                    self.always[concept_id] = max(self.always.get(concept_id, 0.0), confidence)
+                elif ' ' in pattern:
+                    first, *rest = pattern.split(' ')
+                    self.phrases.setdefault(first, []).append((concept_id, confidence, rest))
+                else:
+                    self.tokens.setdefault(pattern, []).append((concept_id, confidence))
+            
+            for substring in self._substrings(name, len(name)):
+                self.name_parts.setdefault(substring, set()).add(concept_id)
+            for synonym in concept.synonyms:
+                for substring in self._substrings(synonym, len(synonym)):
+                    self.synonym_parts.setdefault(substring, set()).add(concept_id)
+        
+        self.max_token_length = max(map(len, self.tokens), default=0)
+        self._match_word = lru_cache(maxsize=self.WORD_CACHE_SIZE)(self._match_word)
+    
+    @staticmethod
+    def _substrings(text: str, max_length: int):
+        return {text[i:j] for i in range(len(text)) for j in range(i + 1, min(len(text), i + max_length) + 1)}
+    
+    def _match_word(self, word: str) -> Tuple[tuple, tuple, frozenset, frozenset]:
+        """Patterns inside the word, phrases the word can start, and partial matches"""
+        contained = tuple(match
+                          for substring in self._substrings(word, self.max_token_length)
+                          for match in self.tokens.get(substring, ()))
+        phrase_starts = tuple(phrase
+                              for start in range(len(word) + 1)
+                              for phrase in self.phrases.get(word[start:], ()))
+        return (contained, phrase_starts,
+                frozenset(self.name_parts.get(word, ())),
+                frozenset(self.synonym_parts.get(word, ())))
+    
+    def extract(self, text_lower: str) -> Dict[str, float]:
+        """Concept confidences for normalized text, identical to the pairwise scan"""
+        words = text_lower.split()
+        matches = [self._match_word(word) for word in words]
+        confidence = dict(self.always)
+        
+        for position, (contained, phrase_starts, _, _) in enumerate(matches):
+            for concept_id, score in contained:
+                confidence[concept_id] = max(confidence.get(concept_id, 0.0), score)
+            for concept_id, score, rest in phrase_starts:
+                following = words[position + 1:position + 1 + len(rest)]
+                if (len(following) == len(rest)
+                        and following[:-1] == rest[:-1]
+                        and following[-1].startswith(rest[-1])):
+                    confidence[concept_id] = max(confidence.get(concept_id, 0.0), score)
+        
+        # Partial matches only count for concepts without a direct or synonym match
+        partial = {}
+        for _, _, name_ids, synonym_ids in matches:
+            for concept_id in synonym_ids:
+                partial[concept_id] = max(partial.get(concept_id, 0.0), 0.5)
+            for concept_id in name_ids:
+                partial[concept_id] = 0.6
+        for concept_id, score in partial.items():
+            confidence.setdefault(concept_id, score)
+        
+        return {self.names[concept_id]: confidence[concept_id] for concept_id in sorted(confidence)}
+
 class AdvancedSemanticAnalyzer:
-    """Advanced semantic analyzer using sentence transformers"""
+    """Advanced semantic analyzer using sentence embeddings (see EMBEDDING_BACKENDS)"""
     
-    def __init__(self):
+    def __init__(self, load_model: bool = True):
         self.logger = logging.getLogger(__name__)
-        
-        # Load sentence transformer model if available
-        if ADVANCED_NLP_AVAILABLE:
-            try:
-                # Use a model that's good for educational content
-                self.model = SentenceTransformer('all-MiniLM-L6-v2')
-                self.logger.info("Loaded sentence transformer model successfully")
-            except Exception as e:
-                self.logger.warning(f"Failed to load sentence transformer: {e}")
-                self.model = None
-        else:
-            self.model = None
+        self.model = None
+        self.embedding_store = None
+        self.embedding_batcher = None
             
         # Initialize educational concept knowledge base
         self._init_educational_concepts()
         self._init_bloom_patterns()
+        self.concept_index = ConceptTokenIndex(self.educational_concepts)
+        
+        # Load sentence transformer model now, or later via load_model()
+        if load_model:
+            self.load_model()
+    
+    def load_model(self, backend: str = EMBEDDING_BACKEND) -> bool:
+        """Load the embedding backend; returns True if it is available"""
+        try:
+            # Use a model that's good for educational content
+            model = create_embedding_backend(backend)
+            if model is None:
+                return False
+            self.logger.info(f"Loaded {backend} embedding backend {model.name} successfully")
+        except Exception as e:
+            self.logger.warning(f"Failed to load {backend} embedding backend: {e}")
+            return False
+        
+        # Embeddings persisted across restarts and shared between workers
+        if EMBEDDING_STORE_AVAILABLE and EMBEDDING_CACHE_DIR:
+            try:
+                self.embedding_store = EmbeddingStore(EMBEDDING_CACHE_DIR, model.name, EMBEDDING_CACHE_DTYPE)
+            except Exception as e:
+                self.logger.warning(f"Embedding cache unavailable: {e}")
+        
+        # Concurrent requests share model batches; EMBEDDING_BATCH_WINDOW_MS=0 disables
+        if EMBEDDING_BATCHER_AVAILABLE and EMBEDDING_BATCH_WINDOW_MS > 0:
+            self.embedding_batcher = EmbeddingBatcher(self._encode_batches)
+        
+        # Published last so concurrent requests never see a half-initialized engine
+        self.model = model
+        return True
+    
+    def embedding_stats(self) -> Dict:
+        """Embedding cache and micro-batching metrics"""
+        return {
+            'backend': self.model.name if self.model else None,
+            'cache': self.embedding_store.stats() if self.embedding_store is not None else None,
+            'batcher': self.embedding_batcher.stats() if self.embedding_batcher is not None else None
+        }
+    
+    @property
+    def engine(self) -> str:
+        """Similarity engine currently in use: 'embedding' or 'keyword'"""
+        return 'embedding' if self.model else 'keyword'
         
     def _init_educational_concepts(self):
         """Initialize comprehensive educational concept mappings"""
@@ -220,29 +466,107 @@ class AdvancedSemanticAnalyzer:
             ]
         }
 
+    def encode_texts(self, texts: List[str]) -> 'np.ndarray':
+        """Encode texts into L2-normalized embeddings, one row per input text
+        
+        Duplicates are encoded once, texts already in the embedding store are
+        read from it, and only the rest go to the model.
+        """
+        unique_texts = list(dict.fromkeys(texts))
+        if not unique_texts:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        if self.embedding_store is not None:
+            vectors = self.embedding_store.get(unique_texts)
+        else:
+            vectors = [None] * len(unique_texts)
+        
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = [unique_texts[i] for i in missing]
+            if self.embedding_batcher is not None:
+                encoded = self.embedding_batcher.encode(missing_texts)
+            else:
+                encoded = self._encode_batches(missing_texts)
+            if self.embedding_store is not None:
+                try:
+                    self.embedding_store.put(missing_texts, encoded)
+                except Exception as e:
+                    self.logger.warning(f"Could not persist embeddings: {e}")
+                # Hits come back at the store's precision; round misses the same way
+                encoded = np.asarray(encoded, dtype=self.embedding_store.dtype).astype(np.float32)
+            for position, i in enumerate(missing):
+                vectors[i] = encoded[position]
+        
+        embeddings = np.vstack(vectors).astype(np.float32, copy=False)
+        row_of = {text: i for i, text in enumerate(unique_texts)}
+        return embeddings[[row_of[text] for text in texts]]
+
+    @timed('embedding_encode')
+    def _encode_batches(self, texts: List[str]) -> 'np.ndarray':
+        """Run the model over texts in length-sorted batches and normalize the rows"""
+        by_length = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = None
+        
+        for start in range(0, len(by_length), EMBEDDING_BATCH_SIZE):
+            batch_ids = by_length[start:start + EMBEDDING_BATCH_SIZE]
+            batch = np.asarray(
+                self.model.encode([texts[i] for i in batch_ids], batch_size=len(batch_ids)),
+                dtype=np.float32
+            )
+            if embeddings is None:
+                embeddings = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            embeddings[batch_ids] = batch
+        
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def semantic_similarity_matrix(self, plo_texts: List[str], mlo_texts: List[str]) -> 'np.ndarray':
+        """Semantic similarity of every PLO x MLO pair, clipped to 0-1
+        
+        Each distinct text is embedded once and the whole grid is a single
+        normalized matrix product. Without the embedding model this falls back
+        to keyword similarity; either way the result is a len(plo) x len(mlo) array.
+        """
+        if self.model:
+            try:
+                embeddings = self.encode_texts(list(plo_texts) + list(mlo_texts))
+                plo_embeddings = embeddings[:len(plo_texts)]
+                mlo_embeddings = embeddings[len(plo_texts):]
+                return np.clip(plo_embeddings @ mlo_embeddings.T, 0.0, 1.0)
+            except Exception as e:
+                self.logger.warning(f"Batch semantic similarity failed: {e}")
+        
+        return np.array([[self._fallback_similarity(plo_text, mlo_text) for mlo_text in mlo_texts]
+                         for plo_text in plo_texts], dtype=float).reshape(len(plo_texts), len(mlo_texts))
+
     def analyze_semantic_similarity(self, plo_text: str, mlo_text: str) -> float:
         """Calculate true semantic similarity using sentence embeddings"""
+        return self._semantic_similarity(plo_text, mlo_text)[0]
+    
+    @timed('similarity')
+    def _semantic_similarity(self, plo_text: str, mlo_text: str) -> Tuple[float, str]:
+        """Semantic similarity and the engine that produced it"""
         if not self.model:
             # Fallback to keyword-based similarity
-            return self._fallback_similarity(plo_text, mlo_text)
+            return self._fallback_similarity(plo_text, mlo_text), 'keyword'
             
         try:
-            # Get sentence embeddings
-            plo_embedding = self.model.encode([plo_text])
-            mlo_embedding = self.model.encode([mlo_text])
+            # Get both sentence embeddings in one batch
+            plo_embedding, mlo_embedding = self.encode_texts([plo_text, mlo_text])
             
-            # Calculate cosine similarity
-            similarity = cosine_similarity(plo_embedding, mlo_embedding)[0][0]
+            # Cosine similarity of normalized embeddings
+            similarity = float(plo_embedding @ mlo_embedding)
             
             # Convert to 0-1 range and apply educational context adjustment
             adjusted_similarity = max(0, min(1, similarity))
             
             self.logger.debug(f"Semantic similarity: {adjusted_similarity:.3f}")
-            return adjusted_similarity
+            return adjusted_similarity, 'embedding'
             
         except Exception as e:
             self.logger.warning(f"Semantic similarity calculation failed: {e}")
-            return self._fallback_similarity(plo_text, mlo_text)
+            return self._fallback_similarity(plo_text, mlo_text), 'keyword'
     
     def _fallback_similarity(self, text1: str, text2: str) -> float:
         """Fallback similarity calculation using advanced keyword matching"""
@@ -350,6 +674,7 @@ class AdvancedSemanticAnalyzer:
         
         return coherence, plo_bloom, mlo_bloom
 
+    @timed('bloom_detection')
     def _detect_bloom_level(self, text: str) -> BloomLevel:
         """Detect Bloom's taxonomy level from text"""
         text_lower = text.lower()
@@ -369,37 +694,10 @@ class AdvancedSemanticAnalyzer:
             
         return detected_level
 
+    @timed('concept_extraction')
     def _extract_educational_concepts(self, text: str) -> Dict[str, float]:
         """Extract educational concepts with confidence scores"""
-        text_lower = self._normalize_text(text)
-        found_concepts = {}
-        
-        for concept_name, concept_obj in self.educational_concepts.items():
-            confidence = 0.0
-            
-            # Check for direct concept name
-            if concept_name in text_lower:
-                confidence = 1.0
-            else:
-                # Check synonyms
-                for synonym in concept_obj.synonyms:
-                    if synonym in text_lower:
-                        confidence = max(confidence, 0.8)
-                        
-            # Check for partial matches and context
-            if confidence == 0:
-                words = text_lower.split()
-                for word in words:
-                    if word in concept_name or concept_name in word:
-                        confidence = max(confidence, 0.6)
-                    for synonym in concept_obj.synonyms:
-                        if word in synonym or synonym in word:
-                            confidence = max(confidence, 0.5)
-            
-            if confidence > 0:
-                found_concepts[concept_name] = confidence
-                
-        return found_concepts
+        return self.concept_index.extract(self._normalize_text(text))
 
     def _normalize_text(self, text: str) -> str:
         """Normalize text for analysis"""
@@ -412,6 +710,7 @@ class AdvancedSemanticAnalyzer:
         
         return text.strip()
 
+    @timed('reasoning')
     def generate_enhancement_suggestions(self, plo_text: str, mlo_text: str, 
                                        aligned_concepts: List[str], missing_concepts: List[str],
                                        plo_bloom: BloomLevel, mlo_bloom: BloomLevel) -> List[str]:
@@ -458,12 +757,15 @@ class AdvancedSemanticAnalyzer:
         
         return suggestions[:5]  # Limit to top 5 suggestions
 
+    @profiled
     def analyze_plo_mlo_alignment(self, plo_text: str, mlo_text: str, 
-                                 original_score: float) -> SemanticAnalysisResult:
+                                 original_score: float, programme: Optional[str] = None) -> SemanticAnalysisResult:
         """Comprehensive semantic analysis of PLO-MLO alignment"""
         
         # Perform all analyses
-        semantic_similarity = self.analyze_semantic_similarity(plo_text, mlo_text)
+        semantic_similarity, engine = self._semantic_similarity(plo_text, mlo_text)
+        domain_multiplier, domain_terms = get_domain_matcher().alignment(plo_text, mlo_text, programme)
+        semantic_similarity = min(1.0, semantic_similarity * domain_multiplier)
         conceptual_alignment, aligned_concepts, missing_concepts = self.analyze_conceptual_alignment(plo_text, mlo_text)
         cognitive_coherence, plo_bloom, mlo_bloom = self.analyze_cognitive_coherence(plo_text, mlo_text)
         
@@ -505,9 +807,12 @@ class AdvancedSemanticAnalyzer:
             reasoning=reasoning,
             suggestions=suggestions,
             key_concepts=aligned_concepts,
-            missing_concepts=missing_concepts
+            missing_concepts=missing_concepts,
+            engine=engine,
+            domain_terms=tuple(domain_terms)
         )
 
+    @timed('reasoning')
     def _generate_detailed_reasoning(self, semantic_sim: float, conceptual_align: float, 
                                    cognitive_coh: float, aligned_concepts: List[str],
                                    missing_concepts: List[str], plo_bloom: BloomLevel, 
@@ -553,15 +858,100 @@ class AdvancedSemanticAnalyzer:
 class SemanticAnalysisAPI:
     """Main API for semantic analysis"""
     
-    def __init__(self):
-        self.analyzer = AdvancedSemanticAnalyzer()
+    def __init__(self, warm_up: bool = False):
+        """With warm_up the model loads on a background thread started by
+        start(), and the analyzer serves keyword similarity until it is ready.
+        With ANALYSIS_EXECUTOR=process the pool workers load theirs in the
+        pool initializer, as part of the same warm-up."""
         self.logger = logging.getLogger(__name__)
+        self.analyzer = AdvancedSemanticAnalyzer(load_model=not warm_up)
+        self.ready = threading.Event()
+        self.warmup_started = time.monotonic()
+        self.warmup_seconds: Optional[float] = None
+        self.worker_models: List[bool] = []  # per process-pool worker: model loaded
+        self._lock = threading.Lock()
+        self._pid = None
+        
+        runtime = get_runtime()
+        if runtime.process_pool:
+            runtime.worker_initializer = _init_worker
+        
+        if warm_up:
+            self.state = 'warming'
+        else:
+            self._warm_workers()
+            self._mark_ready()
+            self._pid = os.getpid()
+    
+    def start(self):
+        """Start warm-up in this process (again after a fork, e.g. gunicorn --preload)
+        
+        A forked child has no warm-up thread; it keeps a model the parent
+        finished loading and warms up again otherwise (or to start its own
+        process-pool workers).
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            if self.ready.is_set() and not get_runtime().process_pool:
+                return
+            self.ready = threading.Event()
+            self.state = 'warming'
+            self.warmup_started = time.monotonic()
+            threading.Thread(target=self._warm_up, name='model-warmup', daemon=True).start()
+    
+    def _warm_up(self):
+        try:
+            if self.analyzer.model is None:
+                self.analyzer.load_model()
+            self._warm_workers()
+        finally:
+            self._mark_ready()
+    
+    def _warm_workers(self):
+        """Start the process-pool workers so they load their model now, not in a request"""
+        try:
+            self.worker_models = get_runtime().warm_workers(_worker_has_model)
+        except Exception as e:
+            self.logger.warning(f"Process-pool workers failed to warm up: {e}")
+            self.worker_models = [False]
+    
+    def _mark_ready(self):
+        self.warmup_seconds = time.monotonic() - self.warmup_started
+        # 'degraded': warm-up finished but only the keyword engine is available (here or in a worker)
+        self.state = 'ready' if self.analyzer.model and all(self.worker_models) else 'degraded'
+        self.ready.set()
+        self.logger.info(f"Semantic engine {self.state} after {self.warmup_seconds:.2f}s ({self.analyzer.engine})")
+    
+    def wait_until_ready(self, timeout: float) -> bool:
+        """Block up to timeout seconds for warm-up to finish"""
+        return self.ready.wait(timeout) if timeout > 0 else self.ready.is_set()
+    
+    def status(self) -> Dict:
+        """Warm-up state for health checks"""
+        return {
+            'state': self.state,
+            'engine': self.analyzer.engine,
+            'process_workers': len(self.worker_models),
+            'warmup_seconds': round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None
+        }
         
     async def analyze_alignment(self, plo_text: str, mlo_text: str, 
-                              original_score: float = 0.0) -> Dict:
+                              original_score: float = 0.0, programme: Optional[str] = None) -> Dict:
         """Main API method for alignment analysis"""
         try:
-            result = self.analyzer.analyze_plo_mlo_alignment(plo_text, mlo_text, original_score)
+            # Scoring is CPU-bound: run it in the shared executor, not on the event loop
+            if get_runtime().process_pool and self.ready.is_set():
+                result = await offload(_analyze_in_worker, plo_text, mlo_text, original_score, programme)
+            elif get_runtime().process_pool:
+                # Workers are still loading their model; this process answers meanwhile
+                result = await offload_thread(self.analyzer.analyze_plo_mlo_alignment,
+                                              plo_text, mlo_text, original_score, programme)
+            else:
+                result = await offload(self.analyzer.analyze_plo_mlo_alignment, plo_text, mlo_text, original_score, programme)
             
             return {
                 'success': True,
@@ -574,9 +964,11 @@ class SemanticAnalysisAPI:
                     'conceptual_alignment': round(result.conceptual_alignment, 3),
                     'cognitive_coherence': round(result.cognitive_coherence, 3),
                     'key_concepts': result.key_concepts,
-                    'missing_concepts': result.missing_concepts
+                    'missing_concepts': result.missing_concepts,
+                    'domain_terms': list(result.domain_terms)
                 },
-                'original_score': original_score
+                'original_score': original_score,
+                'engine': result.engine
             }
             
         except Exception as e:
@@ -589,6 +981,24 @@ class SemanticAnalysisAPI:
             }
 
 
+# Analyzer owned by each process-pool worker, loaded by the pool initializer
+_worker_analyzer: Optional[AdvancedSemanticAnalyzer] = None
+
+def _init_worker():
+    global _worker_analyzer
+    _worker_analyzer = AdvancedSemanticAnalyzer()
+
+def _worker_has_model() -> bool:
+    return _worker_analyzer is not None and _worker_analyzer.model is not None
+
+def _analyze_in_worker(plo_text: str, mlo_text: str, original_score: float,
+                       programme: Optional[str] = None) -> SemanticAnalysisResult:
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = AdvancedSemanticAnalyzer()
+    return _worker_analyzer.analyze_plo_mlo_alignment(plo_text, mlo_text, original_score, programme)
+
+
 # Test the analyzer
 if __name__ == "__main__":
     # Test with sample educational content
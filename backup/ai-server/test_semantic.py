@@ -5,11 +5,12 @@ Test script for the lightweight semantic analyzer
 
 import sys
 import os
+import re
 
 # Add the current directory to the path
 sys.path.append(os.path.dirname(__file__))
 
-from app_lightweight_semantic import semantic_analyzer
+from app_lightweight_semantic import app, semantic_analyzer, MATRIX_ROUNDING
 
 def test_semantic_analysis():
     """Test the semantic analysis functionality"""
@@ -94,8 +95,1030 @@ def test_bloom_detection():
         print(f"Text: {text}")
         print(f"  → Bloom Level: {bloom_level.name} (confidence: {confidence:.2f})")
 
+def test_concept_scanner():
+    """Test that the single-pass scanner agrees with per-pattern regex scans"""
+    print("\n" + "=" * 50)
+    print("Testing Concept Scanner")
+    print("=" * 50)
+    
+    scanner = semantic_analyzer.concept_scanner
+    test_texts = [
+        "Break the problem down, then break down the costs and carry out the plan",
+        "Evaluate eco impact of eco-friendly products using LCA and life cycle analysis",
+        "Lead teams, direct indirect costs and work together with partners"
+    ]
+    
+    for text in test_texts:
+        text_lower = text.lower()
+        counts, phrase_hits = scanner.scan(text_lower)
+        for pattern, count in zip(scanner.patterns, counts):
+            assert count == len(re.findall(pattern, text_lower)), pattern
+        for phrase, hit in zip(scanner.phrases, phrase_hits):
+            assert hit == (phrase in text_lower), phrase
+        print(f"Text: {text}")
+        print(f"  → {sum(counts)} pattern hits, {sum(phrase_hits)} phrase hits")
+
+def test_concept_index():
+    """Test that token-indexed concept extraction matches the substring scan it replaced"""
+    import random
+    from semantic_analyzer import AdvancedSemanticAnalyzer, BloomLevel, ConceptTokenIndex, ConceptType, EducationalConcept
+    
+    print("\n" + "=" * 50)
+    print("Testing Concept Token Index")
+    print("=" * 50)
+    
+    def substring_scan(concepts, text_lower):
+        found = {}
+        for concept_name, concept in concepts.items():
+            confidence = 1.0 if concept_name in text_lower else max(
+                [0.8 for synonym in concept.synonyms if synonym in text_lower], default=0.0)
+            if confidence == 0:
+                for word in text_lower.split():
+                    if word in concept_name or concept_name in word:
+                        confidence = max(confidence, 0.6)
+                    for synonym in concept.synonyms:
+                        if word in synonym or synonym in word:
+                            confidence = max(confidence, 0.5)
+            if confidence > 0:
+                found[concept_name] = confidence
+        return found
+    
+    analyzer = AdvancedSemanticAnalyzer(load_model=False)
+    concepts = dict(analyzer.educational_concepts)
+    for name, synonyms in [("data science", ["machine learning", "big data", "ai"]),
+                           ("project_management", ["project management", "scrum master", "pm"]),
+                           ("life cycle costing", ["lcc", "total cost of ownership"])]:
+        concepts[name] = EducationalConcept(name=name, type=ConceptType.SKILL, bloom_level=BloomLevel.APPLY,
+                                            weight=1.0, synonyms=synonyms, related_concepts=[])
+    index = ConceptTokenIndex(concepts)
+    
+    corpus = [
+        "Apply life-cycle analysis (LCA) to eco-friendly products.",
+        "Machine-learning; big data, data-science!",
+        "Co-ordinate, lead & direct: project management...",
+        "Act as scrum master/PM and estimate the total cost of ownership.",
+        "Use lifecycle_assessment and life cycle costing (LCC) models",
+        "Examination—of ecosystems, re-develop novel approaches",
+        "Break-down costs; communicate findings to stake-holders",
+        "ai", "", "   ", "??!"
+    ]
+    rng = random.Random(11)
+    vocabulary = ["life", "cycle", "analysis", "data", "science", "big", "machine", "learning", "project",
+                  "management", "scrum", "master", "cost", "of", "ownership", "lca", "eco", "friendly",
+                  "design", "analyzes", "sustainable", "pm", "ai", "strategic", "total", "lead"]
+    for _ in range(300):
+        corpus.append("".join(rng.choice(vocabulary) + rng.choice([" ", "  ", "-", ", ", ". ", "/", "_", ""])
+                              for _ in range(rng.randint(1, 10))))
+    
+    for text in corpus:
+        text_lower = analyzer._normalize_text(text)
+        assert index.extract(text_lower) == substring_scan(concepts, text_lower), text
+        assert analyzer._extract_educational_concepts(text) == substring_scan(analyzer.educational_concepts, text_lower), text
+    print(f"{len(corpus)} texts agree, e.g. {corpus[3]!r} → {index.extract(analyzer._normalize_text(corpus[3]))}")
+
+def test_text_profiles():
+    """Test that text profiles are built once and shared across pairs"""
+    print("\n" + "=" * 50)
+    print("Testing Text Profiles")
+    print("=" * 50)
+    
+    plo_text = "Analyze and evaluate sustainability strategies to improve environmental impact"
+    mlo_texts = [
+        "Apply lifecycle assessment methods",
+        "Design innovative management processes",
+        "Communicate research results to stakeholders"
+    ]
+    
+    profile = semantic_analyzer.get_profile(plo_text)
+    assert semantic_analyzer.get_profile(plo_text) is profile
+    assert profile.bloom_level == semantic_analyzer.detect_bloom_level(plo_text)[0]
+    assert [c.concept for c in profile.concepts] == [c.concept for c in semantic_analyzer.extract_concepts(plo_text)]
+    
+    for mlo_text in mlo_texts:
+        from_text = semantic_analyzer.analyze_alignment(plo_text, mlo_text, 3.0)
+        from_profiles = semantic_analyzer.analyze_profiles(profile, semantic_analyzer.get_profile(mlo_text), 3.0)
+        assert from_text == from_profiles
+    
+    print(f"Profile: {profile.bloom_level.name}, concepts={sorted(profile.concept_names)}, relationships={list(profile.relationships)}")
+
+def test_alignment_matrix():
+    """Test that matrix mode matches pairwise analysis cell by cell"""
+    print("\n" + "=" * 50)
+    print("Testing Alignment Matrix")
+    print("=" * 50)
+    
+    plo_texts = [
+        "Students will analyze environmental sustainability frameworks and evaluate lifecycle assessment methodologies",
+        "Design innovative management strategies and communicate them to stakeholders",
+        "Remember basic facts about organizations"
+    ]
+    mlo_texts = [
+        "Apply lifecycle assessment tools to evaluate environmental impact of products and processes",
+        "Collaborate in teams to develop a business plan",
+        "Explain the principles of research methodology",
+        "Knows the history of the region"
+    ]
+    
+    matrix = semantic_analyzer.analyze_matrix(plo_texts, mlo_texts, 3.0)
+    for i, plo_text in enumerate(plo_texts):
+        for j, mlo_text in enumerate(mlo_texts):
+            result = semantic_analyzer.analyze_alignment(plo_text, mlo_text, 3.0)
+            cell = {**result['analysis_details'], **result}
+            for name in MATRIX_ROUNDING:
+                assert matrix[name][i][j] == cell[name], (name, i, j)
+    
+    print(f"Enhanced scores: {matrix['enhanced_score']}")
+
+def test_similarity_matrix():
+    """Test that the similarity grid is an array, encodes each distinct text once and matches pairwise scores"""
+    import numpy as np
+    from semantic_analyzer import AdvancedSemanticAnalyzer, EmbeddingBackend
+    
+    print("\n" + "=" * 50)
+    print("Testing semantic similarity matrix")
+    print("=" * 50)
+    
+    class CountingBackend(EmbeddingBackend):
+        name = 'counting'
+        def __init__(self):
+            self.encoded = []
+        def encode(self, texts, batch_size=32):
+            self.encoded.extend(texts)
+            return np.array([[len(text) % 7 + 1.0, text.lower().count('design') + 1.0, text.count(' ') + 1.0]
+                             for text in texts])
+    
+    plo_texts = ["Design sustainable systems", "Analyze energy markets", "Design sustainable systems"]
+    mlo_texts = ["Design network services", "Analyze energy markets", "Write a report"]
+    
+    analyzer = AdvancedSemanticAnalyzer(load_model=False)
+    keyword = analyzer.semantic_similarity_matrix(plo_texts, mlo_texts)
+    assert isinstance(keyword, np.ndarray) and keyword.shape == (3, 3)
+    assert analyzer.semantic_similarity_matrix([], mlo_texts).shape == (0, 3)
+    
+    backend = CountingBackend()
+    analyzer.model = backend
+    matrix = analyzer.semantic_similarity_matrix(plo_texts, mlo_texts)
+    assert isinstance(matrix, np.ndarray) and matrix.shape == (3, 3)
+    assert sorted(backend.encoded) == sorted(set(plo_texts + mlo_texts)), backend.encoded
+    
+    for grid, model in ((matrix, backend), (keyword, None)):
+        analyzer.model = model
+        for i, plo_text in enumerate(plo_texts):
+            for j, mlo_text in enumerate(mlo_texts):
+                assert abs(grid[i, j] - analyzer.analyze_semantic_similarity(plo_text, mlo_text)) < 1e-6, (i, j)
+    print(f"Similarity matrix:\n{np.round(matrix, 3)}")
+
+def test_embedding_backends():
+    """Test the keyword fallback without onnxruntime, the abstract interfaces and the parity report"""
+    import numpy as np
+    import embedding_parity
+    import metrics
+    import semantic_analyzer
+    from outcome_retrieval import VectorIndex
+    from semantic_analyzer import AdvancedSemanticAnalyzer, EmbeddingBackend, create_embedding_backend
+    
+    print("\n" + "=" * 50)
+    print("Testing embedding backends")
+    print("=" * 50)
+    
+    saved = semantic_analyzer.ONNX_AVAILABLE
+    semantic_analyzer.ONNX_AVAILABLE = False  # as when onnxruntime is not installed
+    try:
+        assert create_embedding_backend('onnx') is None
+        analyzer = AdvancedSemanticAnalyzer(load_model=False)
+        assert analyzer.load_model('onnx') is False and analyzer.model is None
+        assert analyzer._semantic_similarity('Design systems', 'Design services')[1] == 'keyword'
+        try:
+            embedding_parity.run_backend('onnx', ['Design systems'], 8)
+            assert False, "run_backend should stop when the backend is missing"
+        except SystemExit as e:
+            assert 'not installed' in str(e)
+    finally:
+        semantic_analyzer.ONNX_AVAILABLE = saved
+    try:
+        create_embedding_backend('torch')
+        assert False, "unknown backends should be rejected"
+    except ValueError:
+        pass
+    
+    class Incomplete(metrics._Metric):
+        def samples(self):
+            return []
+    for abstract in (EmbeddingBackend, VectorIndex, lambda: Incomplete('incomplete', '', registry=None)):
+        try:
+            abstract()
+            assert False, f"{abstract} should not be instantiable"
+        except TypeError:
+            pass
+    
+    def unit(degrees):
+        radians = np.radians(degrees)
+        return np.stack([np.cos(radians), np.sin(radians)], axis=1)
+    reference = unit([0, 10, 90])
+    assert embedding_parity.compare(reference, reference.copy()) == {
+        'texts': 3, 'mean_cosine': 1.0, 'min_cosine': 1.0, 'p01_cosine': 1.0, 'nearest_neighbour_agreement': 1.0}
+    # The second text drifts 70 degrees and its nearest neighbour becomes the third
+    report = embedding_parity.compare(reference, unit([0, 80, 90]))
+    assert report['min_cosine'] == round(float(np.cos(np.radians(70))), 5)
+    assert report['mean_cosine'] == round(float((2 + np.cos(np.radians(70))) / 3), 5)
+    assert report['nearest_neighbour_agreement'] == round(2 / 3, 4)
+    print(f"Parity report: {report}")
+
+def test_analyze_matrix_endpoint():
+    """Test the programme-level matrix endpoint"""
+    print("\n" + "=" * 50)
+    print("Testing /analyze-matrix")
+    print("=" * 50)
+    
+    client = app.test_client()
+    
+    response = client.post('/analyze-matrix', json={'programme': 'makm'})
+    result = response.get_json()
+    assert response.status_code == 200 and result['success']
+    assert len(result['scores']) == len(result['rows'])
+    assert all(len(row) == len(result['columns']) for row in result['scores'])
+    print(f"makm PLO x MLO: {len(result['rows'])} x {len(result['columns'])}")
+    
+    response = client.post('/analyze-matrix', json={'programme': 'tvtb', 'direction': 'clo-mlo', 'course': 'UTT0120', 'details': True})
+    result = response.get_json()
+    assert response.status_code == 200
+    assert all(column['module'] == 'e2' for column in result['columns'])
+    assert result['details'][0][0]['enhanced_score'] == result['scores'][0][0]
+    print(f"UTT0120 CLO x MLO: {len(result['rows'])} x {len(result['columns'])}")
+    
+    assert client.post('/analyze-matrix', json={'programme': 'unknown'}).status_code == 404
+    
+    scores = [[2] * len(result['columns']) for _ in result['rows']]
+    request = {'programme': 'tvtb', 'direction': 'clo-mlo', 'course': 'UTT0120'}
+    assert client.post('/analyze-matrix', json={**request, 'original_scores': scores}).status_code == 200
+    for bad in (scores[:-1], [row[:-1] for row in scores], [['high'] * len(scores[0])] * len(scores), 'high'):
+        response = client.post('/analyze-matrix', json={**request, 'original_scores': bad})
+        assert response.status_code == 400 and 'original_scores' in response.get_json()['error']
+
+def test_top_matches():
+    """Test top-k retrieval and incremental index refresh"""
+    import json, os, tempfile
+    import numpy as np
+    from outcome_retrieval import BruteForceIndex, ConceptProfileEncoder, OutcomeRetrievalIndex
+    
+    print("\n" + "=" * 50)
+    print("Testing /top-matches")
+    print("=" * 50)
+    
+    index = BruteForceIndex()
+    index.upsert(['a', 'b', 'c'], np.eye(3))
+    index.upsert(['b'], [[0.6, 0.8, 0.0]])
+    assert index.search([1.0, 0.0, 0.0], 2, ['a', 'b', 'c']) == [('a', 1.0), ('b', np.float32(0.6))]
+    index.remove(['a'])
+    assert index.search([1.0, 0.0, 0.0], 5, ['b', 'c'])[0][0] == 'b' and len(index) == 2
+    
+    client = app.test_client()
+    response = client.post('/top-matches', json={'programme': 'makm', 'code': 'plo1', 'k': 3})
+    result = response.get_json()
+    assert response.status_code == 200 and result['success'], result
+    assert len(result['matches']) == 3
+    assert [m['score'] for m in result['matches']] == sorted((m['score'] for m in result['matches']), reverse=True)
+    print(f"makm plo1 -> {[m['code'] for m in result['matches']]}")
+    assert client.post('/top-matches', json={'programme': 'makm', 'code': 'nope'}).status_code == 404
+    
+    # Only edited outcomes are re-encoded when the data file changes
+    data = {'p': {'plos': [{'plokood': 'plo1', 'plosisuik': 'Analyze sustainability frameworks'}],
+                  'mlos': [{'mlokood': 'm1_mlo1', 'mlosisuik': 'Evaluate environmental impact'},
+                           {'mlokood': 'm1_mlo2', 'mlosisuik': 'Communicate in teams'}]}}
+    encoded = []
+    class CountingEncoder(ConceptProfileEncoder):
+        def encode(self, texts):
+            encoded.extend(texts)
+            return super().encode(texts)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'programmes.json')
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        retrieval = OutcomeRetrievalIndex(CountingEncoder(semantic_analyzer), path=path)
+        assert retrieval.top_k('p', 'plo1', k=1)[0]['code'] == 'm1_mlo1'
+        assert len(encoded) == 3
+        
+        data['p']['mlos'][1]['mlosisuik'] = 'Analyze sustainability frameworks in teams'
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+        assert retrieval.top_k('p', 'plo1', k=1)[0]['code'] == 'm1_mlo2'
+        assert encoded[3:] == ['Analyze sustainability frameworks in teams']
+
+def test_embedding_batcher():
+    """Test that concurrent encode calls share batches and get their own rows"""
+    import threading
+    import numpy as np
+    from embedding_batcher import EmbeddingBatcher
+    
+    print("\n" + "=" * 50)
+    print("Testing embedding micro-batching")
+    print("=" * 50)
+    
+    batch_sizes = []
+    def encode(texts):
+        batch_sizes.append(len(texts))
+        return np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+    
+    batcher = EmbeddingBatcher(encode, window_ms=20, max_texts=64)
+    results = {}
+    def request(i):
+        results[i] = batcher.encode([f'text {i}', 'shared'])
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert all(results[i][0, 0] == len(f'text {i}') and results[i][1, 0] == len('shared') for i in results)
+    assert sum(batch_sizes) < 40  # 'shared' is encoded once per batch
+    
+    # A child forked after the worker started gets its own worker instead of hanging
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os._exit(0 if batcher.encode(['child'])[0, 0] == len('child') else 1)
+        except BaseException:
+            os._exit(1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    
+    # A stuck model call surfaces as TimeoutError instead of blocking the caller forever
+    stuck = EmbeddingBatcher(lambda texts: threading.Event().wait(1) or encode(texts), window_ms=0, timeout=0.1)
+    try:
+        stuck.encode(['slow'])
+        assert False, "expected TimeoutError"
+    except TimeoutError:
+        pass
+    
+    body = app.test_client().get('/metrics').get_data(as_text=True)
+    assert 'embedding_batch_size_bucket{le="+Inf"}' in body and 'embedding_batch_queue_wait_seconds_count' in body
+    assert 'embedding_batch_queue_depth' in body
+    print(f"Batches: {batch_sizes}, stats: {batcher.stats()}")
+
+def test_embedding_store():
+    """Test the embedding store round-trip, sharing between instances and torn-append recovery"""
+    import tempfile
+    import threading
+    import numpy as np
+    from embedding_store import EmbeddingStore
+    
+    print("\n" + "=" * 50)
+    print("Testing embedding store")
+    print("=" * 50)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmbeddingStore(tmp, 'test-model')
+        store.put(['a', 'b'], np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]))
+        a, b, missing = store.get(['a', 'b', 'c'])
+        assert missing is None and a.dtype == np.float32
+        assert np.array_equal(a, [1, 2, 3]) and np.array_equal(b, [4, 5, 6])
+        
+        try:
+            store.put(['c'], np.ones((1, 4)))
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        
+        # A second instance (another worker) sees rows appended by the first
+        other = EmbeddingStore(tmp, 'test-model')
+        store.put(['c'], np.array([[7.0, 8.0, 9.0]]))
+        assert np.array_equal(other.get(['c'])[0], [7, 8, 9])
+        
+        # A writer that died after appending rows but before their index records
+        with open(store.data_path, 'ab') as f:
+            np.array([[9.0, 9.0, 9.0]], dtype=store.dtype).tofile(f)
+        with open(store.index_path, 'ab') as f:
+            f.write(b'partial')
+        other.put(['d'], np.array([[1.0, 0.0, 1.0]]))
+        assert np.array_equal(store.get(['d'])[0], [1, 0, 1])
+        assert np.array_equal(EmbeddingStore(tmp, 'test-model').get(['b'])[0], [4, 5, 6])
+        assert len(store) == 4
+        
+        # Readers are not held up while a writer waits on fsync
+        import embedding_store
+        fsyncing, release = threading.Event(), threading.Event()
+        fsync = embedding_store.os.fsync
+        def slow_fsync(fd):
+            fsyncing.set()
+            release.wait(5)
+            fsync(fd)
+        embedding_store.os.fsync = slow_fsync
+        try:
+            writer = threading.Thread(target=store.put, args=(['e'], np.array([[0.0, 1.0, 0.0]])))
+            writer.start()
+            assert fsyncing.wait(5)
+            reader = threading.Thread(target=lambda: store.get(['a', 'e']))
+            reader.start()
+            reader.join(1)
+            assert not reader.is_alive(), "get() waited for the writer's fsync"
+        finally:
+            embedding_store.os.fsync = fsync
+            release.set()
+            writer.join(5)
+        assert np.array_equal(store.get(['e'])[0], [0, 1, 0]) and len(store) == 5
+        print(f"Store: {store.stats()}")
+
+def test_job_queue():
+    """Test that a batch job is processed in chunks and paged back in order"""
+    import tempfile
+    import time
+    from app_lightweight_semantic import analyze_pairs
+    from job_queue import JobQueue
+    
+    print("\n" + "=" * 50)
+    print("Testing persistent batch jobs")
+    print("=" * 50)
+    
+    pairs = [{'plo_text': 'Analyze sustainability frameworks', 'mlo_text': f'Apply lifecycle assessment {i}', 'original_score': 2}
+             for i in range(12)] + [{'plo_text': 'missing MLO'}]
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.sqlite3'), chunk_size=5, poll_seconds=0.05)
+        queue.register('alignment', analyze_pairs)
+        
+        job_id = queue.submit('alignment', pairs)
+        for _ in range(100):
+            if queue.get(job_id)['status'] == 'completed':
+                break
+            time.sleep(0.05)
+        queue.stop(timeout=5)
+        
+        job = queue.get(job_id)
+        first = queue.results(job_id, 0, 10)
+        rest = queue.results(job_id, first['next_offset'])
+        assert (job['status'], job['completed'], job['succeeded']) == ('completed', 13, 12)
+        assert len(first['results'] + rest['results']) == 13 and rest['next_offset'] is None
+        assert rest['results'][-1]['success'] is False
+        print(f"Job: {job}")
+
+def test_job_queue_lease():
+    """Test that two workers sharing a database never commit the same job twice"""
+    import tempfile
+    import time
+    from collections import Counter
+    from job_queue import JobQueue
+    
+    print("\n" + "=" * 50)
+    print("Testing job leases across workers")
+    print("=" * 50)
+    
+    calls = Counter()
+    def slow_work(items):
+        time.sleep(0.6)  # longer than the lease; only the heartbeat keeps it
+        calls.update(item['n'] for item in items)
+        return [{'success': True, 'n': item['n']} for item in items]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.sqlite3')
+        queues = [JobQueue(path, chunk_size=5, lease_seconds=0.3, poll_seconds=0.05) for _ in range(2)]
+        for queue in queues:
+            queue.register('slow', slow_work)
+        job_id = queues[0].submit('slow', [{'n': i} for i in range(10)])
+        queues[1].start()
+        for _ in range(100):
+            if queues[0].get(job_id)['status'] == 'completed':
+                break
+            time.sleep(0.05)
+        for queue in queues:
+            queue.stop(timeout=5)
+        
+        job = queues[0].get(job_id)
+        assert (job['status'], job['completed'], job['succeeded']) == ('completed', 10, 10), job
+        assert sorted(calls) == list(range(10)) and set(calls.values()) == {1}, calls
+        assert [r['n'] for r in queues[0].results(job_id)['results']] == list(range(10))
+        
+        # A worker whose lease was taken over drops its chunk instead of committing it
+        queue = JobQueue(os.path.join(tmp, 'stale.sqlite3'), chunk_size=5)
+        queue.register('slow', slow_work)
+        queue.start = lambda: None  # no background workers: this test drives the claim itself
+        job_id = queue.submit('slow', [{'n': i} for i in range(5)])
+        job, owner = queue._claim()
+        with queue._connect() as db:
+            db.execute("UPDATE jobs SET lease_owner = 'other' WHERE id = ?", (job_id,))
+        queue._process(job, owner)
+        assert queue.get(job_id)['completed'] == 0 and queue.results(job_id)['results'] == []
+        print(f"Job: {job_id} calls per item: {dict(calls)}")
+
+def test_stream_batch():
+    """Test streamed batches: chunk order, timeout records and a bounded executor"""
+    import threading
+    import time
+    import async_runtime
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from pytorch_free_backend import AnalysisAPI
+    
+    print("\n" + "=" * 50)
+    print("Testing streamed batch analysis")
+    print("=" * 50)
+    
+    api = AnalysisAPI(api_key='')
+    chunks, active, peak = [], [0], [0]
+    lock = threading.Lock()
+    score = api.analyzer.score_alignment
+    def slow_score(plo_text, *args):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        try:
+            time.sleep(0.2 if 'slow' in plo_text else 0.01)
+            return score(plo_text, *args)
+        finally:
+            with lock:
+                active[0] -= 1
+    chunk_features = api._chunk_features
+    async def recorded_features(chunk):
+        chunks.append([i for i, _ in chunk])
+        return await chunk_features(chunk)
+    api.analyzer.score_alignment = slow_score
+    api._chunk_features = recorded_features
+    
+    pairs = [{'plo_text': f"{'slow' if i % 3 == 0 else 'fast'} design of systems {i}",
+              'mlo_text': 'Design sustainable systems', 'original_score': 2} for i in range(8)] + [{'plo_text': 'no MLO'}]
+    previous = async_runtime._runtime
+    async_runtime._runtime = async_runtime.AsyncRuntime('thread', workers=4, concurrency=2)
+    try:
+        results = list(api.stream_batch(pairs, parallelism=4, chunk_size=3, timeout=0.05))
+        time.sleep(0.3)  # let abandoned calls finish before the runtime goes away
+    finally:
+        async_runtime._runtime.shutdown()
+        async_runtime._runtime = previous
+    
+    by_index = {r['pair_index']: r for r in results}
+    assert chunks == [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+    assert sorted(by_index) == list(range(9)) and len(results) == 9
+    assert all('timed out' in by_index[i]['error'] for i in (0, 3, 6))
+    # Fast pairs may also time out while abandoned slow calls still hold the executor
+    assert by_index[1]['success'] and all(r['success'] or 'timed out' in r['error'] for i, r in by_index.items() if i != 8)
+    assert by_index[8]['error'] == 'Missing plo_text or mlo_text'
+    assert peak[0] <= 2, f"{peak[0]} scoring calls ran at once with concurrency 2"
+    print(f"Chunks: {chunks}, peak concurrent scoring calls: {peak[0]}")
+
+def test_spacy_features():
+    """Test that spaCy features come from one nlp.pipe call per batch and repeated texts hit the cache"""
+    import threading
+    from types import SimpleNamespace
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from pytorch_free_backend import ENGINES, OptionalEngine, SpacyFeatureExtractor
+    
+    print("\n" + "=" * 50)
+    print("Testing spaCy feature extraction")
+    print("=" * 50)
+    
+    class FakeNLP:
+        pipe_names = ['tagger', 'parser', 'ner']
+        def __init__(self):
+            self.calls = []
+        def pipe(self, texts, batch_size, disable=()):
+            self.calls.append((list(texts), batch_size, list(disable)))
+            for text in texts:
+                yield [SimpleNamespace(text=word, lemma_=word.rstrip('s'), is_alpha=word.isalpha(), is_stop=word == 'the',
+                                       pos_='VERB' if word in ('design', 'analyse') else 'NOUN', children=[], dep_='')
+                       for word in text.lower().split()]
+    
+    nlp = FakeNLP()
+    engine = OptionalEngine('spacy', 'json', '')  # any importable module: only the loaded object is used
+    engine._engine, engine._loaded = nlp, True
+    saved = ENGINES['spacy']
+    ENGINES['spacy'] = engine
+    try:
+        extractor = SpacyFeatureExtractor(batch_size=16)
+        texts = ["Design the systems", "Analyse energy markets", "Design the systems", "Write reports"]
+        first = extractor.extract(texts)
+        assert nlp.calls == [(["Design the systems", "Analyse energy markets", "Write reports"], 16, ['ner'])]
+        assert first[0] is first[2] and first[0].lemmas == ('design', 'system') and first[0].verbs == ('design',)
+        
+        second = extractor.extract(texts + ["Lead teams"])
+        assert len(nlp.calls) == 2 and nlp.calls[1][0] == ["Lead teams"]
+        assert second[:4] == first
+        assert extractor.stats()['hits'] == 4 and extractor.stats()['misses'] == 4
+        
+        # Counters stay exact when threads share the extractor
+        threads = [threading.Thread(target=lambda: [extractor.extract(texts) for _ in range(200)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = extractor.stats()
+        assert stats['hits'] == 4 + 8 * 200 * len(texts) and stats['misses'] == 4 and len(nlp.calls) == 2
+    finally:
+        ENGINES['spacy'] = saved
+    print(f"Feature cache: {extractor.stats()}, pipe calls: {len(nlp.calls)}")
+
+def test_backend_imports():
+    """Test that the PyTorch-free backend imports no optional engine and keeps ai-server off sys.path"""
+    import json
+    import subprocess
+    import tempfile
+    
+    print("\n" + "=" * 50)
+    print("Testing PyTorch-free backend imports")
+    print("=" * 50)
+    
+    backup_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ("import json, sys\n"
+            "import pytorch_free_backend as backend\n"
+            "capabilities = backend.AnalysisAPI(api_key='').get_capabilities()\n"
+            "import admission, programme_data\n"
+            "print(json.dumps({'capabilities': capabilities,\n"
+            "                  'imported': [m for m in ('spacy', 'sklearn', 'onnxruntime') if m in sys.modules],\n"
+            "                  'ai_server_on_path': any(p.rstrip('/').endswith('ai-server') for p in sys.path),\n"
+            "                  'programme_data': programme_data.__file__}))")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Installed but poisoned: importing any of them fails the run
+        for package in ('spacy', 'en_core_web_sm', 'sklearn', 'onnxruntime'):
+            os.makedirs(os.path.join(tmp, package))
+            with open(os.path.join(tmp, package, '__init__.py'), 'w') as f:
+                f.write(f"raise ImportError('{package} was imported')\n")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([backup_dir, tmp]))
+        completed = subprocess.run([sys.executable, '-c', code], cwd=tmp, env=env,
+                                   capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    
+    assert report['imported'] == [] and not report['ai_server_on_path']
+    assert report['programme_data'] == os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programme_data.py')
+    spacy = report['capabilities']['engines']['spacy']
+    assert report['capabilities']['spacy_available'] and spacy['installed'] and not spacy['loaded']
+    print(f"Engines: {report['capabilities']['engines']}")
+
+def test_near_duplicates():
+    """Test that MinHash/LSH groups lightly edited outcomes and nothing else"""
+    from near_duplicates import MinHashLSH, shingles
+    
+    print("\n" + "=" * 50)
+    print("Testing near-duplicate outcomes")
+    print("=" * 50)
+    
+    texts = {
+        'a1': 'Students can analyse the environmental impact of products using lifecycle assessment methods and tools',
+        'a2': 'Students can analyse the environmental impact of products using lifecycle assessment methods and tools.',
+        'a3': 'Students can analyse the environmental impact of products using lifecycle assessment methods and software tools',
+        'b1': 'Design and implement a relational database schema for a business application',
+        'b2': 'design and implement a relational database schema for a business application',
+        'c': 'Explain the principles of financial accounting and prepare balance sheets',
+        'd': 'Communicate technical results to stakeholders in written and oral form'
+    }
+    index = MinHashLSH(threshold=0.8)
+    for key, text in texts.items():
+        index.add(key, text)
+    
+    clusters = sorted(sorted(members) for members in index.clusters())
+    assert clusters == [['a1', 'a2', 'a3'], ['b1', 'b2']], clusters
+    assert [key for key, _ in index.query(texts['c'].upper())] == ['c']
+    assert index.query('Negotiate supplier contracts in international trade') == []
+    
+    # Signatures depend only on the text and the seed, not on insertion or process state
+    again = MinHashLSH(threshold=0.8)
+    assert all((again.signature(shingles(text)) == index.signatures[key]).all() for key, text in texts.items())
+    assert not (MinHashLSH(threshold=0.8, seed=2).signature(shingles(texts['c'])) == index.signatures['c']).all()
+    print(f"Clusters: {clusters}, bands x rows: {index.bands} x {index.rows}")
+
+def test_corpus_index():
+    """Test TF-IDF and BM25 scores against values worked out by hand"""
+    import math
+    import numpy as np
+    from corpus_index import CorpusIndex
+    from programme_data import Outcome
+    
+    print("\n" + "=" * 50)
+    print("Testing corpus index ranking")
+    print("=" * 50)
+    
+    documents = [Outcome('plo', 'p1', 'a', 'apple banana'),
+                 Outcome('mlo', 'p1', 'b', 'apple apple cherry'),
+                 Outcome('mlo', 'p2', 'c', 'banana cherry date date')]
+    index = CorpusIndex([d.text for d in documents], tokenizer=str.split, documents=documents)
+    
+    # BM25 with k1=1.5, b=0.75: df(apple)=2 of 3 docs, lengths 2/3/4 with mean 3
+    idf = math.log((3 - 2 + 0.5) / (2 + 0.5) + 1)
+    expected = [idf * 1 * 2.5 / (1 + 1.5 * (0.25 + 0.75 * 2 / 3)), idf * 2 * 2.5 / (2 + 1.5), 0.0]
+    assert np.allclose(index.score('apple', 'bm25'), expected)
+    
+    # TF-IDF cosine with smoothed idf: ln((1 + n) / (1 + df)) + 1
+    common, rare = math.log(4 / 3) + 1, math.log(2) + 1
+    assert np.allclose(index.score('apple', 'cosine'), [1 / math.sqrt(2), 2 / math.sqrt(5), 0.0])
+    assert np.allclose(index.score('date', 'cosine'), [0, 0, 2 * rare / math.sqrt(2 * common ** 2 + 4 * rare ** 2)])
+    assert np.allclose(index.score('unknown words'), 0)
+    
+    assert [d.code for d, _ in index.top_k('apple', mode='bm25')] == ['b', 'a']
+    assert [d.code for d, _ in index.top_k('apple', mask=index.mask(kind='plo'))] == ['a']
+    assert index.mask(programme='p2').tolist() == [False, False, True]
+    assert not index.mask(kind='clo').any() and index.mask().all()
+    print(f"BM25 'apple': {index.score('apple', 'bm25').round(4).tolist()}")
+
+def test_model_warm_up():
+    """Test that warm-up starts per process and hands over from keyword answers to the model"""
+    import threading
+    import numpy as np
+    import semantic_analyzer
+    from async_runtime import run_sync
+    from semantic_analyzer import EmbeddingBackend, SemanticAnalysisAPI
+    
+    print("\n" + "=" * 50)
+    print("Testing model warm-up")
+    print("=" * 50)
+    
+    class StubBackend(EmbeddingBackend):
+        name = 'stub'
+        def encode(self, texts, batch_size=32):
+            return np.array([[text.lower().count('design') + 1.0, 1.0] for text in texts])
+    
+    release = threading.Event()
+    def create_backend(name=None):
+        release.wait(5)
+        return StubBackend()
+    
+    saved = semantic_analyzer.create_embedding_backend, semantic_analyzer.EMBEDDING_CACHE_DIR
+    semantic_analyzer.create_embedding_backend, semantic_analyzer.EMBEDDING_CACHE_DIR = create_backend, ''
+    try:
+        # Started before a fork: the child has no warm-up thread and must run its own
+        forked = SemanticAnalysisAPI(warm_up=True)
+        forked.start()
+        pid = os.fork()
+        if pid == 0:
+            forked.start()
+            release.set()
+            os._exit(0 if forked.wait_until_ready(5) and forked.state == 'ready' else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        
+        api = SemanticAnalysisAPI(warm_up=True)
+        assert api.state == 'warming' and not api.wait_until_ready(0.05)  # nothing runs before start()
+        api.start()
+        api.start()  # no-op in the same process
+        result = run_sync(api.analyze_alignment('Design a network', 'Design network services', 2))
+        assert result['success'] and result['engine'] == 'keyword' and api.status()['state'] == 'warming'
+        
+        release.set()
+        assert api.wait_until_ready(5) and api.status()['state'] == 'ready'
+        result = run_sync(api.analyze_alignment('Design a network', 'Design network services', 2))
+        assert result['success'] and result['engine'] == 'embedding'
+    finally:
+        semantic_analyzer.create_embedding_backend, semantic_analyzer.EMBEDDING_CACHE_DIR = saved
+
+    # While process workers warm up, this process answers on threads within the same concurrency limit
+    import asyncio
+    import time
+    import async_runtime
+    warming = SemanticAnalysisAPI(warm_up=True)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+    analyze = warming.analyzer.analyze_plo_mlo_alignment
+    def slow_analyze(*args):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        try:
+            time.sleep(0.05)
+            return analyze(*args)
+        finally:
+            with lock:
+                active[0] -= 1
+    warming.analyzer.analyze_plo_mlo_alignment = slow_analyze
+    async def analyze_many():
+        return await asyncio.gather(*(warming.analyze_alignment('Design a network', 'Design services', 2) for _ in range(8)))
+    previous = async_runtime._runtime
+    async_runtime._runtime = async_runtime.AsyncRuntime('process', workers=4, concurrency=2)
+    try:
+        results = run_sync(analyze_many())
+    finally:
+        async_runtime._runtime.shutdown()
+        async_runtime._runtime = previous
+    assert all(r['success'] and r['engine'] == 'keyword' for r in results)
+    assert peak[0] <= 2, f"{peak[0]} warming fallbacks ran at once with concurrency 2"
+
+    import app_semantic
+    client = app_semantic.app.test_client()
+    client.get('/status')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert re.search(r'^cold_start_to_first_byte_seconds \d', body, re.M)
+    print(f"Warm-up: {api.status()}")
+
+def test_admission_control():
+    """Test that saturated servers answer 429 with Retry-After instead of queueing forever"""
+    import threading
+    from admission import AdmissionController, Overloaded
+    from app_lightweight_semantic import admission
+    
+    print("\n" + "=" * 50)
+    print("Testing admission control")
+    print("=" * 50)
+    
+    controller = AdmissionController('test', max_in_flight=1, max_queue=1, queue_timeout=0.05)
+    controller.acquire()
+    outcomes = []
+    def queued():
+        try:
+            outcomes.append(controller.acquire())
+        except Overloaded as e:
+            outcomes.append(e.reason)
+    waiter = threading.Thread(target=queued)
+    waiter.start()
+    waiter.join()
+    assert outcomes == ['queue timeout']
+    
+    # A released slot goes to the waiting request
+    waiter = threading.Thread(target=queued)
+    waiter.start()
+    controller.release(0.01)
+    waiter.join()
+    assert isinstance(outcomes[-1], float) and controller.stats()['in_flight'] == 1
+    
+    timeout = admission.queue_timeout
+    admission.queue_timeout = 0.0
+    for _ in range(admission.max_in_flight):
+        admission.acquire()
+    try:
+        response = app.test_client().post('/analyze', json={'plo_text': 'Analyze data', 'mlo_text': 'Apply methods'})
+        assert response.status_code == 429 and int(response.headers['Retry-After']) >= 1
+    finally:
+        admission.queue_timeout = timeout
+        for _ in range(admission.max_in_flight):
+            admission.release()
+    assert app.test_client().post('/analyze', json={'plo_text': 'Analyze data', 'mlo_text': 'Apply methods'}).status_code == 200
+    print(f"Admission: {admission.stats()}")
+
+def test_metrics_endpoint():
+    """Test that /metrics exposes request, stage and cache metrics"""
+    print("\n" + "=" * 50)
+    print("Testing /metrics")
+    print("=" * 50)
+    
+    client = app.test_client()
+    client.post('/analyze', json={'plo_text': 'Evaluate research methods', 'mlo_text': 'Apply research methods'})
+    body = client.get('/metrics').get_data(as_text=True)
+    
+    assert 'http_requests_total{endpoint="/analyze",method="POST",status="200"}' in body
+    assert 'analysis_stage_duration_seconds_bucket{stage="similarity",le="+Inf"}' in body
+    assert 'cache_hit_ratio{cache="text_profile"}' in body
+    print('\n'.join(line for line in body.splitlines() if line.startswith('cache_')))
+
+def test_request_profiling():
+    """Test that a profile session follows analysis onto executor threads"""
+    import tempfile
+    import profiling
+    from async_runtime import offload, run_sync
+    
+    print("\n" + "=" * 50)
+    print("Testing request profiling")
+    print("=" * 50)
+    
+    async def analyze():
+        return await offload(semantic_analyzer.analyze_alignment, 'Evaluate sustainability reports', 'Apply lifecycle methods', 2.0)
+    
+    session = profiling.ProfileSession(sample_interval_ms=0.5)
+    token = profiling._session.set(session)
+    try:
+        result = run_sync(analyze())
+    finally:
+        session.stop()
+        profiling._session.reset(token)
+    
+    assert result['success']
+    assert any('(analyze_alignment)' in row['function'] for row in session.top_functions(50))
+    with tempfile.TemporaryDirectory() as tmp:
+        files = session.save(tmp)
+        with open(files['collapsed']) as f:
+            assert all(line.rsplit(' ', 1)[1].strip().isdigit() for line in f)
+    print(f"Top functions: {session.top_functions(3)}")
+
+def test_domain_terms():
+    """Test domain term weighting and reload after the file changes"""
+    import json
+    import tempfile
+    from domain_terms import DomainTermMatcher
+    
+    print("\n" + "=" * 50)
+    print("Testing domain terms")
+    print("=" * 50)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'domain_terms.json')
+        def write(terms):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'domainTerms': terms}, f)
+        write([{'term': 'corporate governance', 'multiplier': 1.1, 'programmes': ['makm']},
+               {'term': 'sustainability', 'multiplier': 1.5, 'programmes': []}])
+        matcher = DomainTermMatcher(path, check_seconds=0)
+        
+        plo, mlo = 'Evaluate corporate governance and sustainability', 'Sustainability in corporate governance'
+        assert matcher.alignment(plo, mlo, 'makm') == (1.5, ['corporate governance', 'sustainability'])
+        assert matcher.alignment(plo, mlo, 'tvtb') == (1.5, ['sustainability'])
+        assert matcher.alignment('Apply statistics', mlo) == (1.0, [])
+        
+        write([{'term': 'sustainability', 'multiplier': 1.2}])
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+        assert matcher.alignment(plo, mlo, 'makm') == (1.2, ['sustainability'])
+        assert matcher.reloads == 2
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"domainTerms": [')
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2 * 10 ** 9))
+        assert matcher.alignment(plo, mlo)[0] == 1.2  # a broken file keeps the last good terms
+    
+    matrix = semantic_analyzer.analyze_matrix([plo], [mlo, 'Apply statistics'], programme='makm')
+    single = semantic_analyzer.analyze_alignment(plo, mlo, programme='makm')
+    assert matrix['semantic_similarity'][0][0] == single['analysis_details']['semantic_similarity']
+    print(f"Shared terms: {single['analysis_details']['domain_terms']}")
+
+def test_programme_snapshot():
+    """Test that the binary snapshot answers like programmes.json and is dropped when stale"""
+    import json
+    import shutil
+    import tempfile
+    import programme_data
+    import programme_snapshot
+    
+    print("\n" + "=" * 50)
+    print("Testing programme snapshot")
+    print("=" * 50)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'programmes.json')
+        shutil.copy(programme_data.PROGRAMMES_PATH, source)
+        expected = list(programme_data.iter_outcomes('et', path=source))
+        course = programme_data.load_programmes(source)['tvtb']['courses'][0]
+        
+        path = programme_snapshot.build_snapshot(source)
+        snapshot = programme_snapshot.open_snapshot(source)
+        assert snapshot is not None and os.path.getsize(path) < os.path.getsize(source)
+        assert list(programme_data.iter_outcomes('et', path=source)) == expected
+        assert programme_data.get_course('tvtb', course['ainekood'].lower(), path=source) == course
+        assert all(tokens == programme_snapshot.tokenize(outcome.text)
+                   for outcome, tokens in programme_data.iter_tokenized_outcomes('en', path=source))
+        
+        # A touched file with the same content keeps the snapshot; an edited one falls back to JSON
+        os.utime(source, ns=(0, os.stat(source).st_mtime_ns + 10 ** 9))
+        assert programme_snapshot.open_snapshot(source) is snapshot
+        with open(source, encoding='utf-8') as f:
+            data = json.load(f)
+        data['tvtb']['plos'][0]['plosisuik'] = 'Edited outcome'
+        with open(source, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        assert programme_snapshot.open_snapshot(source) is None
+        assert programme_data.get_plos('tvtb', path=source)[0].text == 'Edited outcome'
+    print(f"Snapshot: {snapshot.stats()}")
+
+def test_curriculum_store():
+    """Test the indexed curriculum store against the raw programmes.json tree"""
+    from programme_data import CurriculumLookupError, CurriculumStore, get_curriculum_store, load_programmes
+    
+    print("\n" + "=" * 50)
+    print("Testing curriculum store")
+    print("=" * 50)
+    
+    data = load_programmes()
+    store = CurriculumStore.from_programmes(data)
+    assert not hasattr(store, '__dict__')
+    assert store.outcomes('en') == get_curriculum_store().outcomes('en')  # snapshot or JSON, same records
+    
+    programme = data['tvtb']
+    assert [plo.code for plo in store.plos('tvtb')] == [plo['plokood'] for plo in programme['plos']]
+    for module in store.modules('tvtb'):
+        mlos = store.mlos('tvtb', 'et', module=module.code)
+        assert mlos and all(mlo.code.startswith(module.code + '_') for mlo in mlos)
+        assert all(course.module == module.code for course in store.courses('tvtb', module=module.code))
+    
+    record = programme['courses'][0]
+    course = store.course('tvtb', record['ainekood'].lower())
+    assert course.record() == record
+    assert [clo.text for clo in store.clos('tvtb', course.code, 'et')] == [t for t in record['cloek'].values() if t]
+    
+    for lookup in (lambda: store.plos('xx'), lambda: store.course('tvtb', 'XXX0000'), lambda: store.mlos('tvtb', 'fr')):
+        try:
+            lookup()
+            assert False, "expected CurriculumLookupError"
+        except CurriculumLookupError:
+            pass
+    print(f"Store: {store.stats()}")
+
 if __name__ == "__main__":
     test_semantic_analysis()
     test_concept_extraction()
     test_bloom_detection()
+    test_concept_scanner()
+    test_concept_index()
+    test_text_profiles()
+    test_alignment_matrix()
+    test_similarity_matrix()
+    test_embedding_backends()
+    test_analyze_matrix_endpoint()
+    test_top_matches()
+    test_embedding_batcher()
+    test_embedding_store()
+    test_job_queue()
+    test_job_queue_lease()
+    test_stream_batch()
+    test_backend_imports()
+    test_spacy_features()
+    test_near_duplicates()
+    test_corpus_index()
+    test_model_warm_up()
+    test_admission_control()
+    test_metrics_endpoint()
+    test_request_profiling()
+    test_domain_terms()
+    test_programme_snapshot()
+    test_curriculum_store()
     print("\n🎉 Testing complete!")
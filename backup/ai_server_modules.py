@@ -0,0 +1,44 @@
+"""
+Shared AI Server Modules
+The PyTorch-free backend and server reuse infrastructure modules from ai-server/,
+a directory that cannot be imported as a package. install() makes exactly the
+modules listed in SHARED_MODULES importable by name; ai-server/ itself stays off
+sys.path, so its app.py and other entry points cannot shadow anything.
+"""
+
+import importlib.machinery
+import os
+import sys
+import threading
+
+AI_SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai-server')
+
+# Modules the backend and server import, plus the ones those import in turn
+SHARED_MODULES = frozenset({
+    'admission', 'async_runtime', 'domain_terms', 'job_queue',
+    'metrics', 'profiling', 'programme_data', 'programme_snapshot'
+})
+
+class SharedModuleFinder:
+    """Meta path finder that resolves SHARED_MODULES from AI_SERVER_DIR"""
+
+    def __init__(self, directory: str = AI_SERVER_DIR, modules=SHARED_MODULES):
+        self.directory = directory
+        self.modules = frozenset(modules)
+
+    def find_spec(self, name, path=None, target=None):
+        if path is not None or name not in self.modules:
+            return None
+        return importlib.machinery.PathFinder.find_spec(name, [self.directory])
+
+_finder: SharedModuleFinder = None
+_lock = threading.Lock()
+
+def install() -> SharedModuleFinder:
+    """Register the finder once; modules found on sys.path still take precedence"""
+    global _finder
+    with _lock:
+        if _finder is None:
+            _finder = SharedModuleFinder()
+            sys.meta_path.append(_finder)
+        return _finder
@@ -5,48 +5,190 @@ Provides AI-powered curriculum analysis without PyTorch dependencies
 
 import asyncio
 import json
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+import os
+from typing import Dict, Iterator, List, Tuple, Optional
+from dataclasses import dataclass, field
 from enum import Enum
 import re
 import math
 
-# Import secure configuration
-try:
-    from secure_config import get_api_key, config
-    SECURE_CONFIG_AVAILABLE = True
-except ImportError:
-    SECURE_CONFIG_AVAILABLE = False
-    print("Secure config not available. API key management will be limited.")
-
-# LangExtract for structured information extraction
-try:
-    import langextract as lx
-    LANGEXTRACT_AVAILABLE = True
-except ImportError:
-    LANGEXTRACT_AVAILABLE = False
-    print("LangExtract not installed. Run: pip install langextract")
+# Shared infrastructure lives with the AI server; domain_terms and programme_data
+# are imported where they are first used so they stay off the import path
+import ai_server_modules
+ai_server_modules.install()
+from async_runtime import ANALYSIS_CONCURRENCY, get_runtime, offload, run_sync
+from metrics import cache_lookup, timed
+from profiling import profiled
 
 # Basic text processing (no PyTorch dependency)
 import re
-from collections import Counter
-import urllib.request
-import urllib.parse
+import hashlib
+import importlib
+import importlib.util
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+# Streaming batch analysis: pairs in flight at once, pairs per spaCy feature pass,
+# and seconds before a single pair is reported as timed out
+BATCH_PARALLELISM = int(os.environ.get('BATCH_PARALLELISM', ANALYSIS_CONCURRENCY))
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', 256))
+BATCH_PAIR_TIMEOUT = float(os.environ.get('BATCH_PAIR_TIMEOUT', 30))
 
-# spaCy for NLP (optional)
-try:
-    import spacy
-    SPACY_AVAILABLE = True
-    # Try to load English model
-    try:
-        nlp = spacy.load("en_core_web_sm")
-    except OSError:
-        print("spaCy English model not found. Run: python -m spacy download en_core_web_sm")
-        nlp = None
-except ImportError:
-    SPACY_AVAILABLE = False
-    nlp = None
-    print("spaCy not installed. Run: pip install spacy")
+class OptionalEngine:
+    """Optional dependency that is imported on first use, not at module import"""
+    
+    def __init__(self, name: str, module: str, install_hint: str, loader=None, requires: Tuple[str, ...] = ()):
+        self.name = name
+        self.module = module
+        self.install_hint = install_hint
+        self.loader = loader          # turns the imported module into the engine object
+        self.requires = requires      # extra modules that must be installed (e.g. a spaCy model)
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._engine = None
+        self._loaded = False
+        self._lock = threading.Lock()
+    
+    @property
+    def installed(self) -> bool:
+        """Whether the package can be imported, checked without importing it"""
+        return all(importlib.util.find_spec(m) is not None for m in (self.module,) + self.requires)
+    
+    @property
+    def loaded(self) -> bool:
+        return self._loaded and self._engine is not None
+    
+    def get(self):
+        """Import and initialize once; None if unavailable"""
+        if self._loaded:
+            return self._engine
+        with self._lock:
+            if not self._loaded:
+                started = time.perf_counter()
+                try:
+                    module = importlib.import_module(self.module)
+                    self._engine = self.loader(module) if self.loader else module
+                except Exception as e:
+                    self.error = str(e)
+                    print(f"{self.name} not available ({e}). {self.install_hint}")
+                self.load_seconds = time.perf_counter() - started
+                self._loaded = True
+        return self._engine
+    
+    def status(self) -> Dict:
+        return {
+            'installed': self.installed,
+            'loaded': self.loaded,
+            'load_seconds': round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            'error': self.error
+        }
+
+def _load_spacy_model(spacy):
+    return spacy.load("en_core_web_sm")
+
+# Registry of optional engines; nothing here is imported until get() is called
+ENGINES = {
+    # Secure configuration (reads .env and domain_terms.json)
+    'secure_config': OptionalEngine('secure_config', 'secure_config',
+                                    'API key management will be limited.'),
+    # LangExtract for structured information extraction
+    'langextract': OptionalEngine('langextract', 'langextract', 'Run: pip install langextract'),
+    # spaCy for NLP, with the English model
+    'spacy': OptionalEngine('spacy', 'spacy',
+                            'Run: pip install spacy && python -m spacy download en_core_web_sm',
+                            loader=_load_spacy_model, requires=('en_core_web_sm',))
+}
+
+# Environment variables secure_config reads the LangExtract key from (it also reads .env)
+API_KEY_ENV_VARS = ('LANGEXTRACT_API_KEY', 'GEMINI_API_KEY')
+
+def get_engine(name: str):
+    """Loaded engine object (module or model), or None when unavailable"""
+    return ENGINES[name].get()
+
+# spaCy pipeline settings for feature extraction
+SPACY_BATCH_SIZE = int(os.environ.get('SPACY_BATCH_SIZE', 64))
+SPACY_FEATURE_CACHE_SIZE = int(os.environ.get('SPACY_FEATURE_CACHE_SIZE', 20000))
+SPACY_DISABLED_PIPES = ('ner', 'textcat', 'entity_linker', 'entity_ruler')  # not needed for lemmas/verbs
+
+@dataclass(frozen=True)
+class LinguisticFeatures:
+    """spaCy features of one outcome text"""
+    lemmas: Tuple[str, ...]        # content-word lemmas, lowercase, in text order
+    verbs: Tuple[str, ...]         # verb lemmas (Bloom action verbs)
+    verb_phrases: Tuple[str, ...]  # verb lemma plus its direct object, e.g. 'design system'
+
+class SpacyFeatureExtractor:
+    """Lemma and verb-phrase extraction through nlp.pipe, cached per text hash"""
+    
+    def __init__(self, batch_size: int = SPACY_BATCH_SIZE, cache_size: int = SPACY_FEATURE_CACHE_SIZE):
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[bytes, LinguisticFeatures]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def available(self) -> bool:
+        return ENGINES['spacy'].installed and get_engine('spacy') is not None
+    
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    
+    def _features(self, doc) -> LinguisticFeatures:
+        lemmas = tuple(t.lemma_.lower() for t in doc
+                       if t.is_alpha and not t.is_stop and len(t.text) > 2)
+        verbs = tuple(t.lemma_.lower() for t in doc if t.pos_ == 'VERB')
+        verb_phrases = tuple(
+            f"{t.lemma_.lower()} {child.lemma_.lower()}"
+            for t in doc if t.pos_ == 'VERB'
+            for child in t.children if child.dep_ in ('dobj', 'obj')
+        )
+        return LinguisticFeatures(lemmas, verbs, verb_phrases)
+    
+    def extract(self, texts: List[str]) -> List[Optional[LinguisticFeatures]]:
+        """Features per text (None for all when spaCy is unavailable)"""
+        if not self.available:
+            return [None] * len(texts)
+        
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            found = {key: self._cache[key] for key in keys if key in self._cache}
+            missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in found))
+            self.hits += len(texts) - sum(key not in found for key in keys)
+            self.misses += len(missing)
+        cache_lookup('spacy_features', len(texts) - len(missing), len(missing))
+        
+        if missing:
+            nlp = get_engine('spacy')
+            disabled = [name for name in SPACY_DISABLED_PIPES if name in nlp.pipe_names]
+            computed = {
+                self._key(text): self._features(doc)
+                for text, doc in zip(missing, nlp.pipe(missing, batch_size=self.batch_size, disable=disabled))
+            }
+            found.update(computed)
+            with self._lock:
+                self._cache.update(computed)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        
+        return [found[key] for key in keys]
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'cached_texts': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'batch_size': self.batch_size
+            }
 
 @dataclass
 class AnalysisResult:
@@ -61,6 +203,7 @@ class AnalysisResult:
     suggestions: List[str]
     keywords: List[str]
     concepts: List[str]
+    domain_terms: List[str] = field(default_factory=list)
 
 class BloomLevel(Enum):
     """Bloom's Taxonomy levels"""
@@ -122,7 +265,50 @@ class BasicSemanticAnalyzer:
             BloomLevel.EVALUATE: ['evaluate', 'assess', 'critique', 'judge', 'justify'],
             BloomLevel.CREATE: ['create', 'design', 'develop', 'generate', 'produce', 'construct']
         }
+        
+        # Corpus indexes over programmes.json per language, rebuilt when the file changes
+        self._corpus_indexes: Dict[str, Tuple[Tuple[int, int], 'CorpusIndex']] = {}
+        self._corpus_lock = threading.Lock()
+    
+    def tokenize(self, text: str) -> List[str]:
+        """Lowercase keywords as used by calculate_similarity"""
+        return [word.lower() for word in self._extract_keywords(self._normalize_text(text))]
     
+    def corpus_index(self, language: str = 'en') -> 'CorpusIndex':
+        """IDF/BM25 index over every PLO, MLO and CLO text"""
+        from corpus_index import CorpusIndex  # NumPy only when search is used
+        from programme_data import programmes_version
+        version = programmes_version()
+        cached = self._corpus_indexes.get(language)
+        if cached is None or cached[0] != version:
+            # Concurrent first requests wait for one build instead of each building
+            with self._corpus_lock:
+                cached = self._corpus_indexes.get(language)
+                if cached is None or cached[0] != version:
+                    index = CorpusIndex.from_programmes(language, tokenizer=self.tokenize,
+                                                        term_weights=self.educational_keywords)
+                    self._corpus_indexes[language] = cached = (version, index)
+        return cached[1]
+    
+    def rank_outcomes(self, query: str, k: int = 10, mode: str = 'bm25', kind: Optional[str] = None,
+                      programme: Optional[str] = None, language: str = 'en') -> List[Dict]:
+        """Score one text against the whole corpus and return the best outcomes"""
+        index = self.corpus_index(language)
+        mask = index.mask(kind, programme) if kind or programme else None
+        return [
+            {
+                'kind': outcome.kind,
+                'programme': outcome.programme,
+                'code': outcome.code,
+                'course': outcome.course,
+                'module': outcome.module,
+                'text': outcome.text,
+                'score': round(score, 4)
+            }
+            for outcome, score in index.top_k(query, k, mode, mask)
+        ]
+    
+    @timed('similarity')
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """Calculate basic semantic similarity using keyword overlap"""
         # Normalize texts
@@ -140,9 +326,11 @@ class BasicSemanticAnalyzer:
         overlap_score = 0.0
         total_weight = 0.0
         
+        keyword_set1 = set(keywords1)
+        keyword_set2 = set(keywords2)
         for word in set(keywords1 + keywords2):
             weight = self.educational_keywords.get(word.lower(), 0.5)
-            if word in keywords1 and word in keywords2:
+            if word in keyword_set1 and word in keyword_set2:
                 overlap_score += weight
             total_weight += weight
         
@@ -203,8 +391,39 @@ class BasicSemanticAnalyzer:
             return len(common_phrases) / total_phrases
         return 0.0
     
-    def get_bloom_level(self, text: str) -> Tuple[BloomLevel, float]:
-        """Determine Bloom's taxonomy level from text"""
+    @timed('similarity')
+    def calculate_lemma_similarity(self, text1: str, text2: str,
+                                   features1: 'LinguisticFeatures', features2: 'LinguisticFeatures') -> float:
+        """calculate_similarity on spaCy lemmas, so inflected forms still match"""
+        lemmas1 = set(features1.lemmas)
+        lemmas2 = set(features2.lemmas)
+        if not lemmas1 or not lemmas2:
+            return 0.0
+        
+        overlap_score = 0.0
+        total_weight = 0.0
+        for lemma in lemmas1 | lemmas2:
+            weight = self.educational_keywords.get(lemma, 0.5)
+            if lemma in lemmas1 and lemma in lemmas2:
+                overlap_score += weight
+            total_weight += weight
+        
+        similarity = overlap_score / total_weight if total_weight > 0 else 0.0
+        similarity += self._phrase_similarity(self._normalize_text(text1), self._normalize_text(text2)) * 0.3
+        return min(similarity, 1.0)
+    
+    @timed('bloom_detection')
+    def get_bloom_level(self, text: str, features: Optional['LinguisticFeatures'] = None) -> Tuple[BloomLevel, float]:
+        """Determine Bloom's taxonomy level from text, or from its verb lemmas when available"""
+        if features is not None and features.verbs:
+            verbs = Counter(features.verbs)
+            level_scores = {level: sum(verbs[keyword] for keyword in keywords)
+                            for level, keywords in self.bloom_keywords.items()}
+            total = sum(level_scores.values())
+            if total:
+                best_level = max(level_scores.items(), key=lambda x: x[1])
+                return best_level[0], best_level[1] / total
+        
         text_lower = text.lower()
         level_scores = {level: 0 for level in BloomLevel}
         
@@ -226,18 +445,46 @@ class EnhancedPLOMLOAnalyzer:
     """Enhanced analyzer without PyTorch dependencies"""
     
     def __init__(self):
+        from domain_terms import get_domain_matcher
         self.semantic_analyzer = BasicSemanticAnalyzer()
+        self.domain_terms = get_domain_matcher()
         
     async def analyze_alignment(self, plo_text: str, mlo_text: str, 
-                              original_score: float) -> AnalysisResult:
+                              original_score: float,
+                              plo_features: Optional[LinguisticFeatures] = None,
+                              mlo_features: Optional[LinguisticFeatures] = None,
+                              programme: Optional[str] = None) -> AnalysisResult:
         """Perform enhanced analysis of PLO-MLO alignment"""
+        # CPU-bound: run in the shared executor so the event loop stays free
+        if get_runtime().process_pool:
+            return await offload(_score_in_worker, plo_text, mlo_text, original_score, plo_features, mlo_features, programme)
+        return await offload(self.score_alignment, plo_text, mlo_text, original_score, plo_features, mlo_features, programme)
+    
+    @profiled
+    def score_alignment(self, plo_text: str, mlo_text: str, 
+                        original_score: float,
+                        plo_features: Optional[LinguisticFeatures] = None,
+                        mlo_features: Optional[LinguisticFeatures] = None,
+                        programme: Optional[str] = None) -> AnalysisResult:
+        """Synchronous PLO-MLO scoring behind analyze_alignment
+        
+        With spaCy features for both texts, similarity compares lemmas and
+        Bloom levels come from verb lemmas. Similarity is then weighted by the
+        programme's domain terms that both texts mention.
+        """
+        use_features = plo_features is not None and mlo_features is not None
         
         # Basic semantic similarity
-        semantic_score = self.semantic_analyzer.calculate_similarity(plo_text, mlo_text)
+        if use_features:
+            semantic_score = self.semantic_analyzer.calculate_lemma_similarity(plo_text, mlo_text, plo_features, mlo_features)
+        else:
+            semantic_score = self.semantic_analyzer.calculate_similarity(plo_text, mlo_text)
+        domain_multiplier, domain_terms = self.domain_terms.alignment(plo_text, mlo_text, programme)
+        semantic_score = min(1.0, semantic_score * domain_multiplier)
         
         # Bloom's taxonomy analysis
-        plo_bloom, plo_bloom_conf = self.semantic_analyzer.get_bloom_level(plo_text)
-        mlo_bloom, mlo_bloom_conf = self.semantic_analyzer.get_bloom_level(mlo_text)
+        plo_bloom, plo_bloom_conf = self.semantic_analyzer.get_bloom_level(plo_text, plo_features)
+        mlo_bloom, mlo_bloom_conf = self.semantic_analyzer.get_bloom_level(mlo_text, mlo_features)
         
         # Calculate bloom alignment bonus
         bloom_alignment = self._calculate_bloom_alignment(plo_bloom, mlo_bloom)
@@ -268,11 +515,12 @@ class EnhancedPLOMLOAnalyzer:
             original_score=original_score,
             enhanced_score=enhanced_score,
             confidence=confidence,
-            method="basic_semantic_bloom",
+            method="spacy_enhanced" if use_features else "basic_semantic_bloom",
             reasoning=reasoning,
             suggestions=suggestions,
             keywords=keywords,
-            concepts=concepts
+            concepts=concepts,
+            domain_terms=domain_terms
         )
     
     def _calculate_bloom_alignment(self, plo_bloom: BloomLevel, mlo_bloom: BloomLevel) -> float:
@@ -312,6 +560,7 @@ class EnhancedPLOMLOAnalyzer:
         common_keywords = plo_keywords.intersection(mlo_keywords)
         return list(common_keywords)[:10]  # Limit to top 10
     
+    @timed('concept_extraction')
     def _extract_concepts(self, plo_text: str, mlo_text: str) -> List[str]:
         """Extract educational concepts from texts"""
         all_text = f"{plo_text} {mlo_text}".lower()
@@ -333,6 +582,7 @@ class EnhancedPLOMLOAnalyzer:
         
         return list(set(concepts))[:8]  # Limit and deduplicate
     
+    @timed('reasoning')
     def _generate_reasoning(self, original: float, semantic: float, bloom: float,
                           plo_bloom: BloomLevel, mlo_bloom: BloomLevel, plo_text: str, mlo_text: str) -> str:
         """Generate context-specific reasoning for the score"""
@@ -412,6 +662,7 @@ class EnhancedPLOMLOAnalyzer:
         
         return ". ".join(reasons)
     
+    @timed('reasoning')
     def _generate_suggestions(self, enhanced_score: float, plo_text: str, mlo_text: str,
                             plo_bloom: BloomLevel, mlo_bloom: BloomLevel) -> List[str]:
         """Generate context-specific improvement suggestions"""
@@ -561,28 +812,75 @@ class EnhancedPLOMLOAnalyzer:
         
         return confidence
 
+# Analyzer owned by each process-pool worker
+_worker_analyzer: Optional[EnhancedPLOMLOAnalyzer] = None
+
+_worker_features: Optional[SpacyFeatureExtractor] = None
+
+def _score_in_worker(plo_text: str, mlo_text: str, original_score: float,
+                     plo_features: Optional[LinguisticFeatures] = None,
+                     mlo_features: Optional[LinguisticFeatures] = None,
+                     programme: Optional[str] = None) -> AnalysisResult:
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = EnhancedPLOMLOAnalyzer()
+    return _worker_analyzer.score_alignment(plo_text, mlo_text, original_score, plo_features, mlo_features, programme)
+
+def _extract_in_worker(texts: List[str]) -> List[Optional[LinguisticFeatures]]:
+    global _worker_features
+    if _worker_features is None:
+        _worker_features = SpacyFeatureExtractor()
+    return _worker_features.extract(texts)
+
 class AnalysisAPI:
     """Main API class for enhanced analysis"""
     
     def __init__(self, api_key: str = None):
-        self.api_key = api_key or (get_api_key() if SECURE_CONFIG_AVAILABLE else None)
+        self._api_key = api_key
         self.analyzer = EnhancedPLOMLOAnalyzer()
+        self.features = SpacyFeatureExtractor()
+    
+    @property
+    def api_key(self) -> Optional[str]:
+        """API key, read from secure configuration on first access"""
+        if self._api_key is None:
+            secure_config = get_engine('secure_config')
+            self._api_key = (secure_config.get_api_key() if secure_config else None) or ''
+        return self._api_key or None
+    
+    @property
+    def api_key_configured(self) -> Optional[bool]:
+        """Whether an API key is set, without importing secure_config
         
-        # Initialize available methods
-        self.available_methods = ['basic_semantic']
-        
-        if LANGEXTRACT_AVAILABLE and self.api_key:
-            self.available_methods.append('langextract')
-        
-        if SPACY_AVAILABLE and nlp:
-            self.available_methods.append('spacy_enhanced')
+        None while secure_config is not loaded and the environment has no key,
+        since only its .env file could tell.
+        """
+        if self._api_key is not None or ENGINES['secure_config'].loaded:
+            return bool(self.api_key)
+        if any(os.environ.get(var) for var in API_KEY_ENV_VARS):
+            return True
+        return None
+    
+    @property
+    def available_methods(self) -> List[str]:
+        """Methods whose dependencies are installed (without importing them)"""
+        methods = ['basic_semantic']
+        if ENGINES['langextract'].installed and self.api_key_configured:
+            methods.append('langextract')
+        if ENGINES['spacy'].installed:
+            methods.append('spacy_enhanced')
+        return methods
     
     async def analyze_plo_mlo_alignment(self, plo_text: str, mlo_text: str, 
-                                      original_score: float = 0.0) -> Dict:
+                                      original_score: float = 0.0,
+                                      plo_features: Optional[LinguisticFeatures] = None,
+                                      mlo_features: Optional[LinguisticFeatures] = None,
+                                      programme: Optional[str] = None) -> Dict:
         """Main analysis method"""
         try:
             # Perform enhanced analysis
-            result = await self.analyzer.analyze_alignment(plo_text, mlo_text, original_score)
+            result = await self.analyzer.analyze_alignment(plo_text, mlo_text, original_score,
+                                                           plo_features, mlo_features, programme)
             
             return {
                 'success': True,
@@ -594,6 +892,7 @@ class AnalysisAPI:
                 'suggestions': result.suggestions,
                 'keywords': result.keywords,
                 'concepts': result.concepts,
+                'domain_terms': result.domain_terms,
                 'available_methods': self.available_methods
             }
             
@@ -611,14 +910,112 @@ class AnalysisAPI:
                 'concepts': []
             }
     
+    async def extract_features(self, texts: List[str]) -> Dict[str, Optional[LinguisticFeatures]]:
+        """spaCy features for every distinct text in one nlp.pipe pass"""
+        unique_texts = list(dict.fromkeys(texts))
+        if not unique_texts or not ENGINES['spacy'].installed:
+            return {}
+        try:
+            if get_runtime().process_pool:
+                features = await offload(_extract_in_worker, unique_texts)
+            else:
+                features = await offload(self.features.extract, unique_texts)
+        except Exception as e:
+            logger.warning(f"spaCy feature extraction failed, using keyword analysis: {e}")
+            return {}
+        return dict(zip(unique_texts, features))
+    
+    @staticmethod
+    def _is_valid_pair(pair) -> bool:
+        return isinstance(pair, dict) and bool(pair.get('plo_text')) and bool(pair.get('mlo_text'))
+    
+    async def _analyze_pair(self, i: int, pair, features: Dict[str, Optional[LinguisticFeatures]],
+                            timeout: Optional[float] = None) -> Dict:
+        """One batch entry as a result dict tagged with pair_index (never raises)"""
+        if not self._is_valid_pair(pair):
+            return {'pair_index': i, 'success': False, 'error': 'Missing plo_text or mlo_text'}
+        try:
+            result = await asyncio.wait_for(self.analyze_plo_mlo_alignment(
+                pair['plo_text'], pair['mlo_text'], float(pair.get('original_score', 0.0)),
+                features.get(pair['plo_text']), features.get(pair['mlo_text']), pair.get('programme')
+            ), timeout)
+        except asyncio.TimeoutError:
+            result = {'success': False, 'error': f'Analysis timed out after {timeout:g}s'}
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        result['pair_index'] = i
+        return result
+    
+    async def _chunk_features(self, chunk: List[Tuple[int, Dict]]) -> Dict[str, Optional[LinguisticFeatures]]:
+        return await self.extract_features(
+            [text for _, pair in chunk if self._is_valid_pair(pair) for text in (pair['plo_text'], pair['mlo_text'])]
+        )
+    
+    async def analyze_batch(self, pairs: List[Dict]) -> List[Dict]:
+        """Analyze many PLO-MLO pairs; linguistic features are extracted once for all texts"""
+        indexed = list(enumerate(pairs))
+        features = await self._chunk_features(indexed)
+        return list(await asyncio.gather(*(self._analyze_pair(i, pair, features) for i, pair in indexed)))
+    
+    def stream_batch(self, pairs: List[Dict], parallelism: int = BATCH_PARALLELISM,
+                     chunk_size: int = BATCH_CHUNK_SIZE,
+                     timeout: Optional[float] = BATCH_PAIR_TIMEOUT) -> Iterator[Dict]:
+        """Yield pair results in completion order from synchronous code
+        
+        At most `parallelism` pairs are in flight on the shared loop, so memory
+        stays bounded however long the batch is, and a slow pair only holds
+        its own slot. A pair that times out is reported at once, but its
+        scoring call keeps its executor slot until it returns, so abandoned
+        work never adds to the runtime's concurrency. Features are extracted
+        one chunk of pairs at a time.
+        Closing the generator (client disconnect) cancels outstanding pairs.
+        """
+        loop = get_runtime().start()
+        parallelism = max(1, parallelism)
+        in_flight = set()
+        try:
+            for start in range(0, len(pairs), max(1, chunk_size)):
+                chunk = list(enumerate(pairs[start:start + chunk_size], start))
+                features = run_sync(self._chunk_features(chunk))
+                for i, pair in chunk:
+                    while len(in_flight) >= parallelism:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                    in_flight.add(asyncio.run_coroutine_threadsafe(
+                        self._analyze_pair(i, pair, features, timeout), loop))
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+    
+    def search_outcomes(self, query: str, k: int = 10, mode: str = 'bm25', kind: Optional[str] = None,
+                        programme: Optional[str] = None, language: str = 'en') -> Dict:
+        """Rank all programme outcomes against a query text"""
+        from corpus_index import SCORING_MODES
+        if mode not in SCORING_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(SCORING_MODES)}")
+        matches = self.analyzer.semantic_analyzer.rank_outcomes(query, k, mode, kind, programme, language)
+        return {
+            'success': True,
+            'mode': mode,
+            'matches': matches
+        }
+    
     def get_capabilities(self) -> Dict:
         """Get current capabilities"""
         return {
-            'langextract_available': LANGEXTRACT_AVAILABLE,
-            'spacy_available': SPACY_AVAILABLE,
-            'secure_config_available': SECURE_CONFIG_AVAILABLE,
-            'api_key_configured': bool(self.api_key),
+            'langextract_available': ENGINES['langextract'].installed,
+            'spacy_available': ENGINES['spacy'].installed,
+            'secure_config_available': ENGINES['secure_config'].installed,
+            'api_key_configured': self.api_key_configured,
             'available_methods': self.available_methods,
+            'engines': {name: engine.status() for name, engine in ENGINES.items()},
+            'spacy_features': self.features.stats(),
+            'corpus_search_modes': ['cosine', 'bm25'],
             'pytorch_required': False  # This version doesn't need PyTorch
         }
 
@@ -3,10 +3,11 @@ PyTorch-Free Flask API Server for Enhanced PLO-MLO Analysis
 Provides REST endpoints for AI-powered curriculum analysis without PyTorch dependencies
 """
 
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, render_template_string, stream_with_context
 from flask_cors import CORS
-import asyncio
+import json
 import logging
+import time
 from threading import Thread
 import os
 from datetime import datetime
@@ -14,12 +15,22 @@ from datetime import datetime
 # Import secure configuration
 from secure_config import get_api_key, validate_setup, config
 
-# Import our PyTorch-free analysis backend
+# Import our PyTorch-free analysis backend and the AI server infrastructure it shares
+import ai_server_modules
+ai_server_modules.install()
 from pytorch_free_backend import AnalysisAPI, EnhancedPLOMLOAnalyzer
+from async_runtime import get_runtime, run_sync
+from job_queue import JobNotFoundError, JobQueue
+from admission import AdmissionController, Overloaded, admitted, overloaded_response
+from metrics import instrument_app
+from profiling import install_profiling
+from programme_data import preload_programmes
 
 # Setup Flask app
 app = Flask(__name__)
 CORS(app)
+instrument_app(app)
+install_profiling(app)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -28,24 +39,38 @@ logger = logging.getLogger(__name__)
 # Global analysis API instance
 analysis_api = None
 
+# Batch job queue, started with the server
+job_queue = None
+
+# Admission control: single analyses and batches have separate limits, since a
+# streaming batch holds its slot until the last line is sent
+analysis_admission = AdmissionController.from_env('analysis')
+batch_admission = AdmissionController.from_env('batch', max_in_flight=2, max_queue=4)
+
+# Build the curriculum store (from the snapshot or the JSON) once, before any worker fork
+logger.info(f"Programme data source: {preload_programmes()}")
+
 def setup_event_loop():
-    """Setup event loop for async operations"""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_closed():
-            asyncio.set_event_loop(asyncio.new_event_loop())
-    except RuntimeError:
-        asyncio.set_event_loop(asyncio.new_event_loop())
+    """Start the shared event loop and analysis executor"""
+    get_runtime().start()
 
 def run_async(coro):
-    """Helper to run async functions in sync context"""
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    return loop.run_until_complete(coro)
+    """Helper to run async functions in sync context on the shared loop"""
+    return run_sync(coro)
+
+def analyze_pairs(pairs):
+    """Job work function: one analysis result per PLO-MLO pair of a chunk"""
+    results = run_async(analysis_api.analyze_batch(pairs))
+    for result in results:
+        result.pop('pair_index', None)  # chunk-relative; the job keeps its own order
+    return results
+
+def setup_job_queue():
+    """Open the job database and resume jobs interrupted by a previous run"""
+    global job_queue
+    job_queue = JobQueue()
+    job_queue.register('alignment', analyze_pairs)
+    job_queue.start()
 
 @app.route('/')
 def index():
@@ -91,8 +116,11 @@ def index():
         <h3>GET /status</h3>
         <p>Get API capabilities and status</p>
 
+        <h3>GET /metrics</h3>
+        <p>Prometheus metrics: per-endpoint and per-stage latency histograms, cache hit ratios, in-flight gauges</p>
+
         <h3>POST /batch-analyze</h3>
-        <p>Batch analyze multiple PLO-MLO pairs</p>
+        <p>Batch analyze multiple PLO-MLO pairs; results stream back as NDJSON lines (tagged with <code>pair_index</code>) as they complete, followed by a summary line. Add <code>"stream": false</code> for one JSON body.</p>
         <pre><code>{
     "pairs": [
         {
@@ -103,6 +131,19 @@ def index():
     ]
 }</code></pre>
 
+        <h3>POST /jobs</h3>
+        <p>Queue a large batch (same <code>pairs</code> body as /batch-analyze) and get a job id. Poll <code>GET /jobs/&lt;id&gt;</code>, page through <code>GET /jobs/&lt;id&gt;/results?offset=0&amp;limit=100</code>, cancel with <code>DELETE /jobs/&lt;id&gt;</code>.</p>
+
+        <h3>POST /search</h3>
+        <p>Rank all PLO/MLO/CLO texts against a query (BM25 or TF-IDF cosine)</p>
+        <pre><code>{
+    "query": "lifecycle assessment of products",
+    "mode": "bm25",
+    "kind": "mlo",
+    "programme": "tvtb",
+    "k": 10
+}</code></pre>
+
         <h2>🧪 Quick Test</h2>
         <p>Test the API with a sample request:</p>
         <pre><code>curl -X POST http://localhost:5000/analyze \\
@@ -126,6 +167,8 @@ def index():
     
     if capabilities.get('api_key_configured'):
         status_items.append("✅ API Key: Configured")
+    elif capabilities.get('api_key_configured') is None and analysis_api:
+        status_items.append("❔ API Key: Not checked yet (secure configuration not loaded)")
     else:
         status_items.append("⚠️ API Key: Not configured")
         status_class = "warning"
@@ -156,6 +199,7 @@ def index():
                                 status_items=status_items)
 
 @app.route('/analyze', methods=['POST'])
+@admitted(analysis_admission)
 def analyze():
     """Analyze PLO-MLO alignment"""
     try:
@@ -172,7 +216,9 @@ def analyze():
             return jsonify({'error': 'Both plo_text and mlo_text are required'}), 400
         
         # Perform async analysis
-        result = run_async(analysis_api.analyze_plo_mlo_alignment(plo_text, mlo_text, original_score))
+        result = run_async(analysis_api.analyze_plo_mlo_alignment(
+            plo_text, mlo_text, original_score, programme=data.get('programme')
+        ))
         
         return jsonify(result)
         
@@ -182,7 +228,11 @@ def analyze():
 
 @app.route('/batch-analyze', methods=['POST'])
 def batch_analyze():
-    """Batch analyze multiple PLO-MLO pairs"""
+    """Batch analyze multiple PLO-MLO pairs
+    
+    Streams NDJSON: one line per pair (tagged with pair_index) as it
+    completes, then a summary line. Send "stream": false for a single JSON body.
+    """
     try:
         data = request.get_json()
         
@@ -190,40 +240,121 @@ def batch_analyze():
             return jsonify({'error': 'No pairs data provided'}), 400
         
         pairs = data['pairs']
-        results = []
         
-        for i, pair in enumerate(pairs):
+        try:
+            batch_admission.acquire()
+        except Overloaded as e:
+            return overloaded_response(e)
+        started = time.monotonic()
+        
+        def release():
+            batch_admission.release(time.monotonic() - started)
+        
+        if not data.get('stream', True):
             try:
-                plo_text = pair.get('plo_text', '')
-                mlo_text = pair.get('mlo_text', '')
-                original_score = float(pair.get('original_score', 0.0))
-                
-                if plo_text and mlo_text:
-                    result = run_async(analysis_api.analyze_plo_mlo_alignment(plo_text, mlo_text, original_score))
-                    result['pair_index'] = i
-                    results.append(result)
-                else:
-                    results.append({
-                        'pair_index': i,
-                        'success': False,
-                        'error': 'Missing plo_text or mlo_text'
-                    })
+                # Linguistic features for all texts are extracted in one batch first
+                results = run_async(analysis_api.analyze_batch(pairs))
+            finally:
+                release()
+            return jsonify({
+                'success': True,
+                'results': results,
+                'total_pairs': len(pairs),
+                'successful_analyses': len([r for r in results if r.get('success')])
+            })
+        
+        def generate():
+            successful = 0
+            try:
+                for result in analysis_api.stream_batch(pairs):
+                    successful += bool(result.get('success'))
+                    yield json.dumps(result) + '\n'
             except Exception as e:
-                results.append({
-                    'pair_index': i,
-                    'success': False,
-                    'error': str(e)
-                })
+                logger.error(f"Batch analysis stream error: {e}")
+                yield json.dumps({'success': False, 'error': str(e)}) + '\n'
+                return
+            yield json.dumps({
+                'done': True,
+                'total_pairs': len(pairs),
+                'successful_analyses': successful
+            }) + '\n'
+        
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        response.call_on_close(release)  # the slot is held until the stream ends
+        return response
+        
+    except Exception as e:
+        logger.error(f"Batch analysis error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a large batch of PLO-MLO pairs for background analysis"""
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('pairs'):
+            return jsonify({'error': 'No pairs data provided'}), 400
+        
+        job_id = job_queue.submit('alignment', data['pairs'], data.get('chunk_size'))
         
         return jsonify({
             'success': True,
-            'results': results,
-            'total_pairs': len(pairs),
-            'successful_analyses': len([r for r in results if r.get('success')])
-        })
+            'job_id': job_id,
+            'status_url': f'/jobs/{job_id}',
+            'results_url': f'/jobs/{job_id}/results'
+        }), 202
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Batch analysis error: {e}")
+        logger.error(f"Job submission error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """Progress of a batch job; DELETE cancels it"""
+    try:
+        job = job_queue.cancel(job_id) if request.method == 'DELETE' else job_queue.get(job_id)
+        return jsonify({'success': True, **job})
+    except JobNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """Page through the committed results of a batch job"""
+    try:
+        page = job_queue.results(job_id, request.args.get('offset', 0, type=int),
+                                 request.args.get('limit', 100, type=int))
+        return jsonify({'success': True, **page})
+    except JobNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/search', methods=['POST'])
+@admitted(analysis_admission)
+def search():
+    """Rank every PLO/MLO/CLO in programmes.json against a query text"""
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('query'):
+            return jsonify({'error': 'query is required'}), 400
+        
+        result = analysis_api.search_outcomes(
+            data['query'],
+            k=int(data.get('k', 10)),
+            mode=data.get('mode', 'bm25'),
+            kind=data.get('kind'),
+            programme=data.get('programme'),
+            language=data.get('language', 'en')
+        )
+        
+        return jsonify(result)
+        
+    except (ValueError, LookupError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Search error: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/status')
@@ -236,7 +367,11 @@ def status():
             'status': 'healthy',
             'version': '1.0.0-pytorch-free',
             'timestamp': datetime.now().isoformat(),
-            'capabilities': capabilities
+            'capabilities': capabilities,
+            'admission': {
+                'analysis': analysis_admission.stats(),
+                'batch': batch_admission.stats()
+            }
         })
         
     except Exception as e:
@@ -274,6 +409,7 @@ if __name__ == '__main__':
     
     # Create analysis API instance with secure configuration
     analysis_api = AnalysisAPI(api_key=api_key)
+    setup_job_queue()
     
     # Get configuration from environment
     host = os.getenv('FLASK_HOST', '127.0.0.1')
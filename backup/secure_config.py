@@ -22,13 +22,15 @@ class SecureConfig:
         self.project_root = Path(project_root) if project_root else Path(__file__).parent
         self.config = {}
         self.domain_terms = None
+        self._domain_terms_mtime = None
         self.load_configuration()
         self.load_domain_terms()
     def load_domain_terms(self):
         """Load domain terms from domain_terms.json"""
-        domain_terms_path = self.project_root.parent / "data" / "domain_terms.json"
+        domain_terms_path = self._domain_terms_path()
         if domain_terms_path.exists():
             try:
+                self._domain_terms_mtime = domain_terms_path.stat().st_mtime_ns
                 with open(domain_terms_path, "r", encoding="utf-8") as f:
                     data = json.load(f)
                     self.domain_terms = data.get("domainTerms", [])
@@ -40,9 +42,16 @@ class SecureConfig:
             print("Warning: domain_terms.json not found")
             self.domain_terms = []
 
+    def _domain_terms_path(self):
+        return self.project_root.parent / "data" / "domain_terms.json"
+
     def get_domain_terms(self):
-        """Get loaded domain terms as a list of dicts"""
-        if self.domain_terms is None:
+        """Get loaded domain terms as a list of dicts (reloaded when the file changes)"""
+        try:
+            mtime = self._domain_terms_path().stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if self.domain_terms is None or (mtime is not None and mtime != self._domain_terms_mtime):
             self.load_domain_terms()
         return self.domain_terms
     
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Measures worker boot cost: wall time to import a module in a fresh interpreter,
+per-module import times from `python -X importtime`, and optionally the time to
+load each optional engine of pytorch_free_backend.
+
+Usage: python startup_benchmark.py [--module pytorch_free_backend] [--repeat 5]
+                                   [--top 15] [--load-engines]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def run_python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, '-c', code], cwd=HERE,
+                          capture_output=True, text=True, check=True)
+
+def wall_time(module: str, repeat: int) -> list:
+    """Seconds to start an interpreter and import the module, per run"""
+    code = ("import time; t = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - t)")
+    return [float(run_python(code).stdout.strip().splitlines()[-1]) for _ in range(repeat)]
+
+def import_times(module: str) -> list:
+    """Per-module self and cumulative import time in milliseconds"""
+    result = run_python(f'import {module}', '-X', 'importtime')
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append({
+                'module': name,
+                'depth': len(indent) // 2,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000
+            })
+    return rows
+
+def engine_load_times() -> dict:
+    """Load every optional engine in a fresh interpreter and report its status"""
+    code = ("import json, pytorch_free_backend as b\n"
+            "for engine in b.ENGINES.values(): engine.get()\n"
+            "print(json.dumps({n: e.status() for n, e in b.ENGINES.items()}))")
+    return json.loads(run_python(code).stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure module import and engine load time')
+    parser.add_argument('--module', default='pytorch_free_backend')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--load-engines', action='store_true')
+    args = parser.parse_args()
+
+    runs = wall_time(args.module, args.repeat)
+    rows = import_times(args.module)
+    report = {
+        'module': args.module,
+        'python': sys.version.split()[0],
+        'import_seconds': {
+            'median': round(statistics.median(runs), 4),
+            'min': round(min(runs), 4),
+            'max': round(max(runs), 4)
+        },
+        'slowest_imports': sorted(rows, key=lambda r: -r['cumulative_ms'])[:args.top]
+    }
+    if args.load_engines:
+        report['engines'] = engine_load_times()
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()